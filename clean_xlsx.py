@@ -14,13 +14,18 @@ import time
 import random
 from urllib.parse import urlparse
 
+from scrapers.ratelimit import TokenBucket
+from scrapers.retry import RETRYABLE_STATUSES, RetryBudget, RetryLater, backoff_delay, parse_retry_after, run_with_retries
+from scrapers.workbooks import WorkbookCache
+
 
 class LinkCleaner:
     """Třída pro ověření a čištění odkazů."""
 
-    def __init__(self, verbose: bool = True, delay_range: tuple = (1, 2)):
+    def __init__(self, verbose: bool = True, requests_per_second: float = 1.0, burst: int = 3):
         self.verbose = verbose
-        self.delay_range = delay_range
+        self.limiter = TokenBucket(requests_per_second, burst)
+        self.retry_budget = RetryBudget()
         self.session = requests.Session()
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -36,11 +41,6 @@ class LinkCleaner:
             'Referer': 'https://www.sreality.cz/',
         }
 
-    def _delay(self):
-        """Přidá náhodné zpoždění mezi requesty."""
-        delay = random.uniform(*self.delay_range)
-        time.sleep(delay)
-
     def check_url(self, url: str, retries: int = 2) -> bool:
         """
         Zkontroluje, zda URL vede na aktivní stránku.
@@ -52,6 +52,34 @@ class LinkCleaner:
         Returns:
             True pokud je URL aktivní, False pokud ne
         """
+        for attempt in range(retries):
+            try:
+                return self._check_once(url)
+            except RetryLater as e:
+                if attempt == retries - 1:
+                    return False
+                wait_time = backoff_delay(attempt, e.retry_after)
+                if self.verbose and e.reason == "Rate limit":
+                    print(f"      ⚠️  Rate limit! Čekám {wait_time:.0f}s...")
+                time.sleep(wait_time)
+
+        return False
+
+    def check_urls(self, urls: List[str], retries: int = 2) -> List[bool]:
+        """
+        Zkontroluje více URL najednou.
+
+        Dočasně nedostupné odkazy (429, 5xx, timeout) se vrací do fronty se
+        zpožděním podle Retry-After a mezitím se kontrolují ostatní.
+
+        Returns:
+            Seznam výsledků ve stejném pořadí jako ``urls``
+        """
+        results = run_with_retries(self._check_once, urls, attempts=retries)
+        return [bool(result) for result in results]
+
+    def _check_once(self, url: str) -> bool:
+        """Jeden pokus o kontrolu URL; při dočasné chybě vyhodí RetryLater."""
         if not url or url == 'N/A':
             return False
 
@@ -63,54 +91,44 @@ class LinkCleaner:
         except Exception:
             return False
 
-        for attempt in range(retries):
-            try:
-                headers = self._get_headers()
-                # Použij HEAD request pro rychlejší kontrolu
-                response = self.session.head(url, headers=headers, timeout=10, allow_redirects=True)
-
-                # Pokud HEAD nefunguje, zkus GET
-                if response.status_code == 405:  # Method Not Allowed
-                    response = self.session.get(url, headers=headers, timeout=10, allow_redirects=True)
-
-                # Kontrola status kódu
-                if response.status_code == 200:
-                    return True
-                elif response.status_code == 404:
-                    # Inzerát byl smazán
-                    return False
-                elif response.status_code == 410:  # Gone
-                    return False
-                elif response.status_code == 429:  # Rate limit
-                    wait_time = (2 ** attempt) * 5
-                    if self.verbose:
-                        print(f"      ⚠️  Rate limit! Čekám {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    # Jiné chyby - zkus znovu
-                    if attempt < retries - 1:
-                        time.sleep(2 ** attempt)
-                        continue
-                    return False
-
-            except requests.exceptions.Timeout:
-                if attempt < retries - 1:
-                    time.sleep(2)
-                    continue
-                return False
-            except Exception as e:
-                if self.verbose and attempt == retries - 1:
-                    print(f"      ❌ Chyba: {str(e)[:50]}")
-                if attempt < retries - 1:
-                    time.sleep(2)
-                    continue
-                return False
-
+        try:
+            headers = self._get_headers()
+            # Použij HEAD request pro rychlejší kontrolu
+            self.limiter.acquire()
+            self.retry_budget.record_request()
+            response = self.session.head(url, headers=headers, timeout=10, allow_redirects=True)
+
+            # Pokud HEAD nefunguje, zkus GET
+            if response.status_code == 405:  # Method Not Allowed
+                self.limiter.acquire()
+                self.retry_budget.record_request()
+                response = self.session.get(url, headers=headers, timeout=10, allow_redirects=True)
+        except requests.exceptions.RequestException as e:
+            if self.verbose:
+                print(f"      ❌ Chyba: {str(e)[:50]}")
+            return self._retry_or_give_up(None, "Chyba sítě")
+
+        # Kontrola status kódu
+        if response.status_code == 200:
+            return True
+        if response.status_code in RETRYABLE_STATUSES:
+            reason = "Rate limit" if response.status_code == 429 else f"HTTP {response.status_code}"
+            return self._retry_or_give_up(parse_retry_after(response.headers.get('Retry-After')), reason)
+        # 404/410 - inzerát byl smazán, ostatní kódy bereme jako neaktivní
         return False
 
+    def _retry_or_give_up(self, retry_after: Optional[float], reason: str) -> bool:
+        if not self.retry_budget.try_spend():
+            return False
+        raise RetryLater(retry_after, reason)
+
 
-def clean_xlsx_file(input_file: Path, output_dir: Path, check_links: bool = True) -> str:
+def clean_xlsx_file(
+    input_file: Path,
+    output_dir: Path,
+    check_links: bool = True,
+    cache: Optional[WorkbookCache] = None,
+) -> str:
     """
     Očistí XLSX soubor od neaktivních inzerátů.
 
@@ -118,6 +136,7 @@ def clean_xlsx_file(input_file: Path, output_dir: Path, check_links: bool = True
         input_file: Cesta ke vstupnímu XLSX souboru
         output_dir: Složka pro výstupní soubor
         check_links: Pokud True, zkontroluje každý odkaz (pomalé!)
+        cache: Mezipaměť načtených souborů (None = vždy načíst znovu)
 
     Returns:
         Cesta k výstupnímu souboru
@@ -135,7 +154,10 @@ def clean_xlsx_file(input_file: Path, output_dir: Path, check_links: bool = True
 
     # Načti Excel
     try:
-        df = pd.read_excel(input_file)
+        if cache is not None:
+            df = cache.read(input_file, pd.read_excel, kind="clean")[0]
+        else:
+            df = pd.read_excel(input_file)
     except Exception as e:
         print(f"❌ Chyba při načítání souboru: {e}")
         return ""
@@ -200,11 +222,11 @@ def clean_xlsx_file(input_file: Path, output_dir: Path, check_links: bool = True
         # Pokud je zapnutá kontrola odkazů
         if check_links and cleaner:
             active_links = set()
+            sorted_links = sorted(links)
+            results = cleaner.check_urls(sorted_links)
 
-            for link_idx, link in enumerate(sorted(links), 1):
-                print(f"   🔗 [{link_idx}/{len(links)}] Kontroluji: {link[:60]}...", end=' ')
-
-                is_active = cleaner.check_url(link)
+            for link_idx, (link, is_active) in enumerate(zip(sorted_links, results), 1):
+                print(f"   🔗 [{link_idx}/{len(links)}] {link[:60]}...", end=' ')
                 stats['checked_links'] += 1
 
                 if is_active:
@@ -215,10 +237,6 @@ def clean_xlsx_file(input_file: Path, output_dir: Path, check_links: bool = True
                     stats['inactive_links'] += 1
                     print("✗ Neaktivní")
 
-                # Přidej zpoždění mezi requesty
-                if link_idx < len(links):
-                    cleaner._delay()
-
             links = active_links
             stats['total_links_after'] += len(active_links)
             print(f"   ✓ Počet odkazů po čištění: {len(active_links)}")
@@ -407,7 +425,7 @@ def main():
     input("\nStiskni ENTER pro start... (nebo Ctrl+C pro zrušení)")
 
     # Spusť čištění
-    result = clean_xlsx_file(input_file, output_dir, check_links=check_links)
+    result = clean_xlsx_file(input_file, output_dir, check_links=check_links, cache=WorkbookCache())
 
     if result:
         print("\n✨ Hotovo!")
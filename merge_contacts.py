@@ -1,17 +1,21 @@
 #!/usr/bin/env python3
-"""Combine multiple Excel exports of agents into a deduplicated table."""
+"""Combine multiple exports of agents (xlsx, Parquet, CSV, JSONL) into a deduplicated table."""
 
 from __future__ import annotations
 
 import argparse
+import functools
 import re
 import sys
 import unicodedata
 from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable, List, Optional
 
 import pandas as pd
 
+from scrapers.export import FORMATS, output_format, read_table, with_format, write_table
+from scrapers.workbooks import WorkbookCache, map_files
+
 SCHEMA = [
     "zdroj",
     "jmeno_maklere",
@@ -28,7 +32,7 @@ SCHEMA = [
 
 def _read_excel(path: Path) -> pd.DataFrame:
     try:
-        df = pd.read_excel(path)
+        df = read_table(path)
     except Exception as exc:
         raise SystemExit(f"Nelze načíst '{path}': {exc}")
     missing = [col for col in SCHEMA if col not in df.columns]
@@ -84,29 +88,76 @@ def _merge_group(group: pd.DataFrame) -> pd.Series:
     return pd.Series(merged)
 
 
-def merge_excels(paths: Iterable[Path]) -> pd.DataFrame:
-    frames = [_read_excel(path) for path in paths]
-    if not frames:
+def _partial_merge(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per identifier that :func:`_merge_group` merges like the original rows.
+
+    Each column keeps its first non-empty text (else its first value as is),
+    ``odkazy`` keeps all its texts joined by ``|``. Vectorised, so that the
+    per-group merge only runs once, over the partials of all files.
+    """
+    ids = df["_id"]
+    index = pd.Index(ids.unique(), name="_id")
+    merged = {}
+    for column in SCHEMA:
+        values = df[column].astype(object)
+        is_text = values.map(lambda value: isinstance(value, str) and bool(value.strip())).astype(bool)
+        texts = values[is_text].groupby(ids[is_text], sort=False)
+        texts = texts.agg(" | ".join) if column == "odkazy" else texts.first()
+        firsts = values.groupby(ids, sort=False).first().astype(object)
+        texts = texts.reindex(index)
+        merged[column] = texts.where(texts.notna(), firsts.reindex(index))
+    return pd.DataFrame(merged, index=index).reset_index()
+
+
+def read_partial(path: Path, cache: Optional[WorkbookCache] = None) -> pd.DataFrame:
+    """One file's contacts, pre-merged per identifier (run in a worker process)."""
+    df = cache.read(path, _read_excel, kind="contacts")[0] if cache is not None else _read_excel(path)
+    df["_id"] = df.apply(_build_identifier, axis=1) if not df.empty else pd.Series(dtype=object)
+    return _partial_merge(df)
+
+
+def merge_excels(
+    paths: Iterable[Path], workers: Optional[int] = None, cache: Optional[WorkbookCache] = None
+) -> pd.DataFrame:
+    """Merge the files; each is parsed (or taken from ``cache``) and pre-merged in a worker process."""
+    read = functools.partial(read_partial, cache=cache)
+    partials = [partial for _, partial in map_files(read, paths, workers=workers)]
+    if not partials:
         return pd.DataFrame(columns=SCHEMA)
-    combined = pd.concat(frames, ignore_index=True)
-    combined["_id"] = combined.apply(_build_identifier, axis=1)
+    combined = pd.concat(partials, ignore_index=True)
     merged = combined.groupby("_id", dropna=False).apply(_merge_group).reset_index(drop=True)
     return merged
 
 
 def _parse_args(argv: List[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("files", nargs="+", type=Path, help="Excel soubory k sloučení")
-    parser.add_argument("--output", "-o", type=Path, required=True, help="Výstupní Excel soubor")
-    return parser.parse_args(argv)
+    parser.add_argument("files", nargs="+", type=Path, help="Soubory k sloučení (xlsx, parquet, csv, jsonl)")
+    parser.add_argument("--output", "-o", type=Path, required=True, help="Výstupní soubor")
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Formát výstupu - xlsx pro čtení, parquet/csv/jsonl pro další zpracování (výchozí podle přípony --output)",
+    )
+    parser.add_argument("--workers", type=int, help="Počet procesů pro čtení souborů (výchozí podle počtu jader)")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Nepoužívat mezipaměť načtených souborů ({WorkbookCache.dirname}/ vedle každého souboru)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        args.format = output_format(args.output, args.format)
+    except ValueError as exc:
+        parser.error(str(exc))
+    return args
 
 
 def main(argv: List[str] | None = None) -> int:
     args = _parse_args(argv or sys.argv[1:])
-    merged = merge_excels(args.files)
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    merged.to_excel(args.output, index=False)
-    print(f"Uloženo {len(merged)} unikátních záznamů do {args.output}")
+    merged = merge_excels(args.files, workers=args.workers, cache=None if args.no_cache else WorkbookCache())
+    output = with_format(args.output, args.format)
+    write_table(output, merged.to_dict("records"), args.format, columns=list(merged.columns))
+    print(f"Uloženo {len(merged)} unikátních záznamů do {output}")
     return 0
 
 
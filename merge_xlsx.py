@@ -4,20 +4,170 @@ Sloučí více XLSX souborů z různých běhů scraperu.
 Deduplikuje inzeráty podle URL, protože jeden inzerát může být ve více skupinách.
 """
 
+import argparse
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import List, NamedTuple, Optional, Tuple
 from datetime import datetime
 import pandas as pd
 from openpyxl.styles import Alignment, Font
 
-
-def merge_xlsx_files(input_dir: Path, output_dir: Path) -> str:
+from scrapers.export import FORMATS, output_format, read_table, write_table
+from scrapers.workbooks import WorkbookCache, map_files
+
+
+# Klíč makléře: (jméno, telefon, realitní kancelář)
+AGENT_KEY = ['jmeno_maklere', 'telefon', 'realitni_kancelar']
+
+# Očekávané sloupce (může být česky nebo anglicky)
+COLUMN_NAMES = {
+    'jmeno_maklere': ['Jméno makléře', 'jmeno_maklere', 'Jmeno maklere'],
+    'telefon': ['Telefon', 'telefon'],
+    'email': ['Email', 'email'],
+    'realitni_kancelar': ['Realitní kancelář', 'realitni_kancelar', 'Realitni kancelar'],
+    'kraj': ['Kraj', 'kraj'],
+    'mesto': ['Město', 'mesto', 'Mesto'],
+    'typy_nemovitosti': ['Typy nemovitostí', 'typy_nemovitosti', 'Typy nemovitosti'],
+    # Priorita: "Všechny odkazy" obsahuje kompletní seznam, "Odkazy" jen zobrazené
+    'vsechny_odkazy': ['Všechny odkazy', 'vsechny_odkazy'],
+    'odkazy': ['Odkazy', 'odkazy', 'inzeraty_odkazy'],
+    'inzeraty': ['Inzeráty', 'inzeraty', 'Inzeraty'],
+}
+
+
+class AgentTables(NamedTuple):
+    """Makléři a jejich odkazy/inzeráty/typy jako tabulky (jeden řádek na hodnotu)."""
+    agents: pd.DataFrame
+    odkazy: pd.DataFrame
+    inzeraty: pd.DataFrame
+    typy: pd.DataFrame
+
+
+def find_column(df, possible_names):
+    for name in possible_names:
+        if name in df.columns:
+            return name
+    return None
+
+
+def _text(df, column):
+    """Hodnoty sloupce jako text, chybějící (i celý sloupec) jako "N/A"."""
+    if column is None:
+        return pd.Series("N/A", index=df.index, dtype=object)
+    values = df[column]
+    return values.map(str).where(values.notna(), "N/A")
+
+
+def _split(values, separator):
+    """Rozdělí texty na části (jeden řádek na část, index = řádek vstupu)."""
+    parts = values.map(str).str.split(separator, regex=False).explode().str.strip()
+    return parts[parts.ne('') & parts.ne('N/A')]
+
+
+def _values_table(keys, parts):
+    """Unikátní dvojice (makléř, hodnota) z částí s indexem řádku."""
+    table = keys.loc[parts.index].assign(value=parts.to_numpy())
+    return table.drop_duplicates(ignore_index=True)
+
+
+def agent_tables(df):
+    """Makléři jednoho souboru bez procházení řádků (None bez sloupce se jménem)."""
+    columns = {name: find_column(df, options) for name, options in COLUMN_NAMES.items()}
+    if not columns['jmeno_maklere']:
+        return None
+
+    df = df.reset_index(drop=True)
+    agents = pd.DataFrame({
+        name: _text(df, columns[name])
+        for name in AGENT_KEY + ['email', 'kraj', 'mesto']
+    })
+    keys = agents[AGENT_KEY]
+
+    # Odkazy: "Všechny odkazy" (oddělené |), jinak "Odkazy" (oddělené \n, bez "... (celkem N)")
+    all_links = df[columns['vsechny_odkazy']] if columns['vsechny_odkazy'] else pd.Series(index=df.index, dtype=object)
+    links = _split(all_links.dropna(), '|')
+    if columns['odkazy']:
+        old_links = df[columns['odkazy']][all_links.isna()].dropna()
+        old_links = _split(old_links, '\n')
+        links = pd.concat([links, old_links[~old_links.str.startswith('...')]])
+
+    listings = pd.Series(dtype=object)
+    if columns['inzeraty']:
+        listings = _split(df[columns['inzeraty']].dropna(), '\n')
+        listings = listings[listings.ne('...')]
+
+    types = pd.Series(dtype=object)
+    if columns['typy_nemovitosti']:
+        types = _split(df[columns['typy_nemovitosti']].dropna(), ',')
+
+    return AgentTables(
+        agents=agents.drop_duplicates(AGENT_KEY, ignore_index=True),
+        odkazy=_values_table(keys, links),
+        inzeraty=_values_table(keys, listings),
+        typy=_values_table(keys, types),
+    )
+
+
+def combine_tables(parts):
+    """Spojí tabulky z více souborů - první výskyt makléře určuje jeho údaje."""
+    return AgentTables(*(
+        pd.concat(tables, ignore_index=True).drop_duplicates(
+            AGENT_KEY if field == 'agents' else None, ignore_index=True
+        )
+        for field, tables in zip(AgentTables._fields, zip(*parts))
+    ))
+
+
+def _sorted_values(table):
+    """Seřazené unikátní hodnoty každého makléře: {klíč: [hodnoty]}."""
+    if table.empty:
+        return {}
+    grouped = table.sort_values('value').groupby(AGENT_KEY, sort=False)['value'].agg(list)
+    return grouped.to_dict()
+
+
+def read_normalised(path: Path) -> pd.DataFrame:
+    """Načte soubor jen se známými sloupci pod jednotnými názvy (klíče COLUMN_NAMES)."""
+    df = read_table(path)
+    columns = {find_column(df, options): name for name, options in COLUMN_NAMES.items()}
+    columns.pop(None, None)
+    return df[list(columns)].rename(columns=columns)
+
+
+def read_agent_tables(
+    path: Path, cache: Optional[WorkbookCache] = None
+) -> Tuple[Optional[AgentTables], int, Optional[str], bool]:
+    """Načte jeden soubor v pracovním procesu: (tabulky, počet řádků, chyba, z mezipaměti)."""
+    try:
+        if cache is not None:
+            df, cached = cache.read(path, read_normalised, kind="merge")
+        else:
+            df, cached = read_normalised(path), False
+        return agent_tables(df), len(df), None, cached
+    except Exception as e:
+        return None, 0, str(e), False
+
+
+def merge_xlsx_files(
+    input_dir: Path,
+    output_dir: Path,
+    fmt: str = "xlsx",
+    workers: Optional[int] = None,
+    cache: Optional[WorkbookCache] = None,
+    fold_every: int = 16,
+) -> str:
     """
     Sloučí všechny XLSX soubory ze zadané složky.
 
+    Čtou se i exporty ve formátech parquet, csv a jsonl.
+
     Args:
-        input_dir: Složka se vstupními XLSX soubory
+        input_dir: Složka se vstupními soubory
         output_dir: Složka pro výstupní soubor
+        fmt: Formát výstupu (xlsx, parquet, csv, jsonl)
+        workers: Počet procesů pro čtení souborů (výchozí podle počtu jader)
+        cache: Mezipaměť načtených souborů (None = vždy načíst znovu)
+        fold_every: Po kolika souborech se tabulky přičtou k průběžnému výsledku
 
     Returns:
         Cesta k výstupnímu souboru
@@ -26,142 +176,72 @@ def merge_xlsx_files(input_dir: Path, output_dir: Path) -> str:
     print(f"SLOUČENÍ XLSX SOUBORŮ - MAKLÉŘI")
     print(f"{'='*60}\n")
 
-    # Najdi všechny XLSX soubory
-    xlsx_files = list(input_dir.glob("*.xlsx"))
+    # Najdi všechny exporty (XLSX i parquet/csv/jsonl)
+    xlsx_files = [f for suffix in FORMATS for f in input_dir.glob(f"*.{suffix}")]
 
     if not xlsx_files:
         print(f"❌ Ve složce {input_dir} nebyly nalezeny žádné XLSX soubory!")
         return ""
 
-    print(f"📂 Nalezeno {len(xlsx_files)} XLSX souborů:")
+    print(f"📂 Nalezeno {len(xlsx_files)} souborů:")
     for f in xlsx_files:
         print(f"   - {f.name}")
     print()
 
-    # Slovník pro ukládání dat makléřů
-    # Klíč: (jméno, telefon, realitní kancelář) - unikátní identifikace makléře
-    agents: Dict[tuple, Dict] = {}
-
-    # Procházej všechny soubory
-    for xlsx_file in xlsx_files:
-        print(f"📖 Načítám: {xlsx_file.name}...", end=" ")
-
-        try:
-            df = pd.read_excel(xlsx_file)
-
-            # Očekávané sloupce (může být česky nebo anglicky)
-            name_cols = ['Jméno makléře', 'jmeno_maklere', 'Jmeno maklere']
-            phone_cols = ['Telefon', 'telefon']
-            email_cols = ['Email', 'email']
-            company_cols = ['Realitní kancelář', 'realitni_kancelar', 'Realitni kancelar']
-            region_cols = ['Kraj', 'kraj']
-            city_cols = ['Město', 'mesto', 'Mesto']
-            count_cols = ['Počet inzerátů', 'pocet_inzeratu', 'Pocet inzeratu']
-            types_cols = ['Typy nemovitostí', 'typy_nemovitosti', 'Typy nemovitosti']
-            # Priorita: "Všechny odkazy" obsahuje kompletní seznam, "Odkazy" jen zobrazené
-            all_links_cols = ['Všechny odkazy', 'vsechny_odkazy']
-            links_cols = ['Odkazy', 'odkazy', 'inzeraty_odkazy']
-            listings_cols = ['Inzeráty', 'inzeraty', 'Inzeraty']
-
-            # Najdi správné názvy sloupců
-            def find_column(df, possible_names):
-                for name in possible_names:
-                    if name in df.columns:
-                        return name
-                return None
-
-            name_col = find_column(df, name_cols)
-            phone_col = find_column(df, phone_cols)
-            email_col = find_column(df, email_cols)
-            company_col = find_column(df, company_cols)
-            region_col = find_column(df, region_cols)
-            city_col = find_column(df, city_cols)
-            types_col = find_column(df, types_cols)
-            all_links_col = find_column(df, all_links_cols)  # Nový sloupec s VŠEMI odkazy
-            links_col = find_column(df, links_cols)
-            listings_col = find_column(df, listings_cols)
-
-            if not name_col:
-                print(f"⚠️  Přeskakuji - chybí sloupec s jménem makléře")
-                continue
-
-            # Projdi všechny řádky
-            for _, row in df.iterrows():
-                # Vytvoř unikátní klíč pro makléře
-                agent_name = str(row[name_col]) if name_col and pd.notna(row[name_col]) else "N/A"
-                agent_phone = str(row[phone_col]) if phone_col and pd.notna(row[phone_col]) else "N/A"
-                agent_company = str(row[company_col]) if company_col and pd.notna(row[company_col]) else "N/A"
-
-                agent_key = (agent_name, agent_phone, agent_company)
-
-                # Pokud makléř ještě není v slovníku, přidej ho
-                if agent_key not in agents:
-                    agents[agent_key] = {
-                        'jmeno_maklere': agent_name,
-                        'telefon': agent_phone,
-                        'email': str(row[email_col]) if email_col and pd.notna(row[email_col]) else "N/A",
-                        'realitni_kancelar': agent_company,
-                        'kraj': str(row[region_col]) if region_col and pd.notna(row[region_col]) else "N/A",
-                        'mesto': str(row[city_col]) if city_col and pd.notna(row[city_col]) else "N/A",
-                        'typy_nemovitosti': set(),
-                        'odkazy': set(),  # Použij set pro automatickou deduplikaci
-                        'inzeraty': set(),  # Použij set pro automatickou deduplikaci
-                    }
-
-                agent = agents[agent_key]
-
-                # Přidej odkazy (deduplikace pomocí set)
-                # Prioritizuj "Všechny odkazy" (oddělené |), pak fallback na "Odkazy" (oddělené \n)
-                if all_links_col and pd.notna(row[all_links_col]):
-                    links_str = str(row[all_links_col])
-                    # Rozdělí podle | (nový formát)
-                    links = [link.strip() for link in links_str.split('|') if link.strip() and link.strip() != 'N/A']
-                    agent['odkazy'].update(links)
-                elif links_col and pd.notna(row[links_col]):
-                    links_str = str(row[links_col])
-                    # Rozdělí podle nového řádku (starý formát)
-                    links = [link.strip() for link in links_str.split('\n')
-                            if link.strip() and link.strip() != 'N/A' and not link.strip().startswith('...')]
-                    agent['odkazy'].update(links)
-
-                # Přidej inzeráty
-                if listings_col and pd.notna(row[listings_col]):
-                    listings_str = str(row[listings_col])
-                    listings = [listing.strip() for listing in listings_str.split('\n')
-                               if listing.strip() and listing.strip() != 'N/A' and listing.strip() != '...']
-                    agent['inzeraty'].update(listings)
-
-                # Přidej typy nemovitostí
-                if types_col and pd.notna(row[types_col]):
-                    types_str = str(row[types_col])
-                    types = [t.strip() for t in types_str.split(',') if t.strip() and t.strip() != 'N/A']
-                    agent['typy_nemovitosti'].update(types)
-
-            print(f"✓ {len(df)} řádků")
-
-        except Exception as e:
-            print(f"❌ Chyba: {str(e)}")
+    # Soubory se čtou paralelně po procesech; každý vrací jen své tabulky
+    # makléřů (ne celý soubor). Po fold_every souborech se přičtou
+    # k průběžnému výsledku, takže paměť neroste s počtem souborů.
+    merged: Optional[AgentTables] = None
+    batch: List[AgentTables] = []
+
+    def fold():
+        nonlocal merged, batch
+        merged = combine_tables([merged, *batch] if merged is not None else batch)
+        batch = []
+
+    read = partial(read_agent_tables, cache=cache)
+    for xlsx_file, (tables, rows, error, cached) in map_files(read, xlsx_files, workers=workers):
+        print(f"📖 Načteno: {xlsx_file.name}{' (mezipaměť)' if cached else ''}...", end=" ")
+
+        if error is not None:
+            print(f"❌ Chyba: {error}")
+            continue
+
+        if tables is None:
+            print(f"⚠️  Přeskakuji - chybí sloupec s jménem makléře")
             continue
 
-    if not agents:
+        batch.append(tables)
+        print(f"✓ {rows} řádků")
+        if len(batch) >= fold_every:
+            fold()
+
+    if batch:
+        fold()
+
+    if merged is None or merged.agents.empty:
         print("\n❌ Nebyly nalezeny žádné validní data!")
         return ""
 
+    odkazy = _sorted_values(merged.odkazy)
+    inzeraty = _sorted_values(merged.inzeraty)
+    typy = _sorted_values(merged.typy)
+    agents = {
+        tuple(row[:3]): dict(zip(AGENT_KEY + ['email', 'kraj', 'mesto'], row))
+        for row in merged.agents[AGENT_KEY + ['email', 'kraj', 'mesto']].itertuples(index=False, name=None)
+    }
+
     print(f"\n✓ Celkem nalezeno {len(agents)} unikátních makléřů")
 
     # Vytvoř výstupní data
     results = []
     for agent_key, agent in agents.items():
-        # Spočítej unikátní inzeráty podle odkazů
-        unique_listings_count = len(agent['odkazy']) if agent['odkazy'] else 0
+        # Odkazy a inzeráty jsou už seřazené pro konzistentní výstup
+        sorted_odkazy = odkazy.get(agent_key, [])
+        sorted_inzeraty = inzeraty.get(agent_key, [])
 
-        # Pokud nejsou odkazy, použij počet unikátních názvů inzerátů
-        if unique_listings_count == 0:
-            unique_listings_count = len(agent['inzeraty'])
-
-        # Seřaď odkazy pro konzistentní výstup
-        sorted_odkazy = sorted(agent['odkazy']) if agent['odkazy'] else []
-        sorted_inzeraty = sorted(agent['inzeraty']) if agent['inzeraty'] else []
+        # Spočítej unikátní inzeráty podle odkazů, bez odkazů podle názvů inzerátů
+        unique_listings_count = len(sorted_odkazy) or len(sorted_inzeraty)
 
         # Pro Excel zobrazíme prvních 20 odkazů + info o celkovém počtu
         odkazy_display = '\n'.join(sorted_odkazy[:20])
@@ -180,7 +260,7 @@ def merge_xlsx_files(input_dir: Path, output_dir: Path) -> str:
             'Kraj': agent['kraj'],
             'Město': agent['mesto'],
             'Počet unikátních inzerátů': unique_listings_count,
-            'Typy nemovitostí': ', '.join(sorted(agent['typy_nemovitosti'])) if agent['typy_nemovitosti'] else 'N/A',
+            'Typy nemovitostí': ', '.join(typy[agent_key]) if agent_key in typy else 'N/A',
             'Odkazy': odkazy_display if odkazy_display else 'N/A',
             'Inzeráty': inzeraty_display if inzeraty_display else 'N/A',
             # Nový sloupec s VŠEMI odkazy pro případný další merge
@@ -196,59 +276,63 @@ def merge_xlsx_files(input_dir: Path, output_dir: Path) -> str:
     # Vytvoř výstupní soubor
     output_dir.mkdir(parents=True, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = output_dir / f"merged_agents_{timestamp}.xlsx"
-
-    # Ulož do Excel
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Makléři')
-
-        worksheet = writer.sheets['Makléři']
-
-        # Najdi index sloupce "Odkazy"
-        odkazy_col_idx = None
-        for idx, col in enumerate(df.columns):
-            if col == 'Odkazy':
-                odkazy_col_idx = idx
-                break
-
-        # Nastav šířky sloupců
-        for idx, col in enumerate(df.columns):
-            max_length = max(
-                df[col].astype(str).apply(lambda x: len(str(x).split('\n')[0])).max(),
-                len(col)
-            ) + 2
-
-            if col == 'Odkazy':
-                max_length = min(max_length, 80)
-            elif col == 'Inzeráty':
-                max_length = min(max_length, 60)
-            elif col == 'Email':
-                max_length = min(max_length, 35)
-            else:
-                max_length = min(max_length, 30)
-
-            worksheet.column_dimensions[chr(65 + idx)].width = max_length
-
-        # Formátování buněk
-        for row_idx, row in enumerate(worksheet.iter_rows(min_row=2), start=2):
-            for cell_idx, cell in enumerate(row):
-                cell.alignment = Alignment(wrap_text=True, vertical='top')
-
-                # Pokud je to sloupec "Odkazy" a obsahuje URL
-                if odkazy_col_idx is not None and cell_idx == odkazy_col_idx:
-                    cell_value = str(cell.value) if cell.value else ""
-                    if cell_value and cell_value != 'N/A':
-                        urls = [url.strip() for url in cell_value.split('\n') if url.strip()]
-                        if urls:
-                            first_url = urls[0]
-                            if first_url.startswith('http'):
-                                cell.hyperlink = first_url
-                                cell.value = first_url
-                                cell.font = Font(color="0563C1", underline="single")
-
-                            if len(urls) > 1:
-                                all_urls_text = '\n'.join(urls)
-                                cell.value = all_urls_text
+    output_file = output_dir / f"merged_agents_{timestamp}.{fmt}"
+
+    if fmt == "xlsx":
+        # Ulož do Excel
+        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False, sheet_name='Makléři')
+
+            worksheet = writer.sheets['Makléři']
+
+            # Najdi index sloupce "Odkazy"
+            odkazy_col_idx = None
+            for idx, col in enumerate(df.columns):
+                if col == 'Odkazy':
+                    odkazy_col_idx = idx
+                    break
+
+            # Nastav šířky sloupců
+            for idx, col in enumerate(df.columns):
+                max_length = max(
+                    df[col].astype(str).apply(lambda x: len(str(x).split('\n')[0])).max(),
+                    len(col)
+                ) + 2
+
+                if col == 'Odkazy':
+                    max_length = min(max_length, 80)
+                elif col == 'Inzeráty':
+                    max_length = min(max_length, 60)
+                elif col == 'Email':
+                    max_length = min(max_length, 35)
+                else:
+                    max_length = min(max_length, 30)
+
+                worksheet.column_dimensions[chr(65 + idx)].width = max_length
+
+            # Formátování buněk
+            for row_idx, row in enumerate(worksheet.iter_rows(min_row=2), start=2):
+                for cell_idx, cell in enumerate(row):
+                    cell.alignment = Alignment(wrap_text=True, vertical='top')
+
+                    # Pokud je to sloupec "Odkazy" a obsahuje URL
+                    if odkazy_col_idx is not None and cell_idx == odkazy_col_idx:
+                        cell_value = str(cell.value) if cell.value else ""
+                        if cell_value and cell_value != 'N/A':
+                            urls = [url.strip() for url in cell_value.split('\n') if url.strip()]
+                            if urls:
+                                first_url = urls[0]
+                                if first_url.startswith('http'):
+                                    cell.hyperlink = first_url
+                                    cell.value = first_url
+                                    cell.font = Font(color="0563C1", underline="single")
+
+                                if len(urls) > 1:
+                                    all_urls_text = '\n'.join(urls)
+                                    cell.value = all_urls_text
+    else:
+        # Pro další zpracování bez formátování Excelu
+        write_table(output_file, results, fmt)
 
     print(f"\n💾 Uloženo: {output_file}")
     print(f"📊 Počet makléřů: {len(results)}")
@@ -260,6 +344,19 @@ def merge_xlsx_files(input_dir: Path, output_dir: Path) -> str:
 
 def main():
     """Hlavní funkce pro sloučení XLSX souborů."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=FORMATS, default="xlsx",
+                        help="Formát výstupu - xlsx pro čtení, parquet/csv/jsonl pro další zpracování [xlsx]")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Počet procesů pro čtení souborů [počet jader]")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Nepoužívat mezipaměť načtených souborů ({WorkbookCache.dirname}/ ve vstupní složce)")
+    args = parser.parse_args()
+    try:
+        fmt = output_format(None, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
     # Cesty
     base_dir = Path(__file__).parent
     input_dir = base_dir / "data_merge"
@@ -281,7 +378,8 @@ def main():
         return
 
     # Spusť sloučení
-    result = merge_xlsx_files(input_dir, output_dir)
+    cache = None if args.no_cache else WorkbookCache()
+    result = merge_xlsx_files(input_dir, output_dir, fmt, workers=args.workers, cache=cache)
 
     if result:
         print("✨ Hotovo!")
@@ -10,15 +10,14 @@ Výsledek: Aktivní makléři s přesným počtem inzerátů a správnými URL p
 """
 
 import argparse
+import functools
 import sys
 from datetime import datetime
-from pathlib import Path
-
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font
-from openpyxl.utils import get_column_letter
 
+from scrapers.cache import ResponseCache, parse_ttl_overrides
+from scrapers.checkpoint import Checkpoint, section_key
+from scrapers.export import FORMATS, PROFILE_LABEL, link, output_format, with_format, write_table
+from scrapers.sharding import ShardSettings, run_shards
 from scrapers.sreality import SrealityScraper
 
 
@@ -169,72 +168,75 @@ def prompt_for_params() -> dict:
     }
 
 
-def save_to_excel_with_formatting(records: list, output_path: str) -> None:
-    """Uloží data do Excelu s hyperlinky a formátováním."""
+def save_to_excel_with_formatting(records: list, output_path: str, fmt: str = "xlsx") -> None:
+    """Uloží data do Excelu s hyperlinky a formátováním (nebo do parquet/csv/jsonl)."""
     if not records:
         print("⚠️  Žádné záznamy k uložení.")
         return
 
-    # Vytvoř složku
-    output_dir = Path(output_path).parent
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Převeď na DataFrame a seřaď
-    df = pd.DataFrame(records)
-    if "pocet_inzeratu" in df.columns:
-        df = df.sort_values(by="pocet_inzeratu", ascending=False)
-
-    # Ulož do Excelu
-    df.to_excel(output_path, index=False, engine="openpyxl")
-
-    # Přidej hyperlinky a formátování
-    wb = load_workbook(output_path)
-    ws = wb.active
-
-    # Najdi sloupce s linky
-    headers = [cell.value for cell in ws[1]]
-    link_columns = []
-
-    for idx, header in enumerate(headers, 1):
-        if header in ["profil_url"]:
-            link_columns.append((idx, header))
-
-    # Přidej hyperlinky
-    for row_idx in range(2, ws.max_row + 1):
-        for col_idx, col_name in link_columns:
-            cell = ws.cell(row=row_idx, column=col_idx)
-            url = cell.value
-
-            if url and isinstance(url, str) and url.startswith("http"):
-                cell.hyperlink = url
-                cell.value = "Profil makléře"
-                cell.font = Font(color="0000FF", underline="single")
+    # Seřaď podle počtu inzerátů
+    has_counts = any("pocet_inzeratu" in record for record in records)
+    if has_counts:
+        records = sorted(records, key=lambda record: record.get("pocet_inzeratu") or 0, reverse=True)
 
-    # Automatická šířka sloupců
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
+    write_table(output_path, records, fmt, links={"profil_url": link(PROFILE_LABEL)})
 
-        for cell in column:
-            try:
-                if cell.value:
-                    cell_length = len(str(cell.value))
-                    if cell_length > max_length:
-                        max_length = cell_length
-            except:
-                pass
+    print(f"\n✅ Data uložena do: {output_path}")
+    print(f"📊 Celkem makléřů: {len(records)}")
 
-        adjusted_width = min(max_length + 2, 60)
-        ws.column_dimensions[column_letter].width = adjusted_width
+    if has_counts:
+        total_listings = sum(record.get("pocet_inzeratu") or 0 for record in records)
+        print(f"🏠 Celkem inzerátů: {total_listings}")
 
-    wb.save(output_path)
 
-    print(f"\n✅ Data uložena do: {output_path}")
-    print(f"📊 Celkem makléřů: {len(df)}")
+def scrape_shard(shard, settings, options):
+    """Jedna kombinace ve worker procesu s vlastním scraperem."""
+    category_main, category_type, locality = shard
+    with settings.scraper() as scraper:
+        return scraper.scrape_active_agents_full_profiles(
+            category_main=category_main,
+            category_type=category_type,
+            locality_region_id=locality,
+            **options,
+        )
+
+
+def scrape_sharded(combinations: list, params: dict, settings: ShardSettings, checkpoint: Checkpoint) -> tuple:
+    """Rozdělí kombinace mezi procesy a vrátí (záznamy v pořadí kombinací, zda doběhly všechny bez chyb).
+
+    Kraje se tu na shardy nedělí: profil makléře obsahuje všechny jeho
+    inzeráty, takže by se stejný makléř stahoval v každém kraji znovu.
+    """
+    results = {}
+    for shard in combinations:
+        state = checkpoint.section(section_key("aktivni-shard", *shard))
+        if "records" in state:
+            results[shard] = state["records"]
+    todo = [shard for shard in combinations if shard not in results]
+
+    print(f"🧩 {len(combinations)} kombinací, {min(settings.workers, len(todo) or 1)} procesů")
+
+    options = {
+        "max_pages": params["max_pages"],
+        "full_scan": params["full_scan"],
+        "fetch_details": params["fetch_details"],
+        "lazy_details": params.get("lazy_details", False),
+        "count_probe": params.get("count_probe", False),
+    }
+    task = functools.partial(scrape_shard, options=options)
+    complete = True
+    for position, (shard, result) in enumerate(run_shards(task, todo, settings), 1):
+        print(f"   ✓ Kombinace {position}/{len(todo)} {shard}: {len(result.records)} makléřů")
+        for error in result.errors:
+            print(f"   ⚠️  {error}")
+        results[shard] = result.records
+        if result.errors:
+            complete = False
+        else:
+            checkpoint.section(section_key("aktivni-shard", *shard))["records"] = result.records
+            checkpoint.flush()
 
-    if "pocet_inzeratu" in df.columns:
-        total_listings = df["pocet_inzeratu"].sum()
-        print(f"🏠 Celkem inzerátů: {total_listings}")
+    return [record for shard in combinations for record in results[shard]], complete
 
 
 def main():
@@ -283,9 +285,73 @@ def main():
         help="Nestahovat detaily inzerátů (rychlejší, ale méně přesné kontakty)",
     )
 
+    parser.add_argument(
+        "--lazy-details",
+        action="store_true",
+        help="Počty inzerátů brát z výpisu a detaily stahovat jen do nalezení telefonu a emailu",
+    )
+
+    parser.add_argument(
+        "--count-probe",
+        action="store_true",
+        help="Počty inzerátů makléře zjistit max. 15 dotazy per_page=1 místo procházení všech stránek",
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Počet souběžných požadavků na API [výchozí: 4]",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Počet procesů - kombinace se rozdělí mezi ně, každý má díl rychlosti požadavků; "
+             "zrychlí jen práci na CPU, celková rychlost požadavků zůstává stejná [výchozí: 1]",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        default="data/cache",
+        help="Složka s cache odpovědí API [výchozí: data/cache]",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Nepoužívat cache odpovědí API",
+    )
+
+    parser.add_argument(
+        "--cache-ttl",
+        action="append",
+        metavar="TYP=SEKUNDY",
+        help="TTL cache pro typ endpointu (listing, estate, company), lze opakovat",
+    )
+
+    parser.add_argument(
+        "--checkpoint-dir",
+        default="data/checkpoints",
+        help="Složka s průběžně ukládaným stavem běhů, po úspěšném dokončení se stav smaže [výchozí: data/checkpoints]",
+    )
+
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Pokračovat v přerušeném běhu od posledního checkpointu",
+    )
+
     parser.add_argument(
         "-o", "--output",
-        help="Cesta k výstupnímu souboru [výchozí: data/active_agents_TIMESTAMP.xlsx]",
+        help="Cesta k výstupnímu souboru [výchozí: data/active_agents_TIMESTAMP.FORMAT]",
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Formát výstupu - xlsx pro čtení, parquet/csv/jsonl pro další zpracování [podle přípony -o, jinak xlsx]",
     )
 
     parser.add_argument(
@@ -296,6 +362,32 @@ def main():
 
     args = parser.parse_args()
 
+    try:
+        fmt = output_format(args.output, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = ResponseCache(args.cache_dir, ttls=parse_ttl_overrides(args.cache_ttl))
+        except ValueError as e:
+            parser.error(str(e))
+
+    settings = ShardSettings(
+        workers=args.workers,
+        concurrency=args.concurrency,
+        cache_dir=None if cache is None else args.cache_dir,
+        cache_ttls=dict(cache.ttls) if cache is not None else {},
+    )
+
+    checkpoint = None
+    if args.resume:
+        try:
+            checkpoint = Checkpoint.resume(args.checkpoint_dir, args.resume)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+
     print("="*80)
     print("🎯 SCRAPER AKTIVNÍCH MAKLÉŘŮ S KOMPLETNÍMI PROFILY")
     print("="*80)
@@ -315,24 +407,35 @@ def main():
         22: "Zlínský", 23: "Moravskoslezský"
     }
 
-    # Interaktivní mód nebo parametry z příkazové řádky?
-    if args.prompt:
+    # Pokračování, interaktivní mód nebo parametry z příkazové řádky?
+    if checkpoint is not None:
+        params = checkpoint.params
+        print(f"♻️  Pokračuji v běhu {checkpoint.run_id} s jeho původními parametry")
+    elif args.prompt:
         params = prompt_for_params()
-        category_main_list = params["category_main_list"]
-        category_type_list = params["category_type_list"]
-        locality_list = params["locality_list"]
-        max_pages = params["max_pages"]
-        full_scan = params["full_scan"]
-        fetch_details = params["fetch_details"]
     else:
         # Jednoduchý režim - z argumentů
-        category_main_list = [args.category_main]
-        category_type_list = [args.category_type]
-        locality_list = [args.locality]
-        max_pages = args.max_pages
-        full_scan = args.full_scan
-        fetch_details = not args.no_details
-
+        params = {
+            "category_main_list": [args.category_main],
+            "category_type_list": [args.category_type],
+            "locality_list": [args.locality],
+            "max_pages": args.max_pages,
+            "full_scan": args.full_scan,
+            "fetch_details": not args.no_details,
+        }
+
+    if checkpoint is None:
+        params.update(lazy_details=args.lazy_details, count_probe=args.count_probe)
+        checkpoint = Checkpoint.create(args.checkpoint_dir, params=params)
+
+    category_main_list = params["category_main_list"]
+    category_type_list = params["category_type_list"]
+    locality_list = params["locality_list"]
+    max_pages = params["max_pages"]
+    full_scan = params["full_scan"]
+    fetch_details = params["fetch_details"]
+
+    if not args.prompt and not args.resume:
         print("📋 Parametry:")
         print(f"   • Typ nemovitosti: {category_names.get(args.category_main, 'Neznámý')}")
         print(f"   • Typ inzerátu: {type_names.get(args.category_type, 'Neznámý')}")
@@ -341,49 +444,66 @@ def main():
         print(f"   • Detaily: {'Ano' if fetch_details else 'Ne'}")
         print()
 
+    print(f"💾 Checkpoint: {checkpoint.run_id} (při přerušení pokračuj pomocí --resume {checkpoint.run_id})")
     print("\n⏳ Spouštím scraping...")
     print("   Fáze 1: Najdu aktivní makléře podle kategorie")
     print("   Fáze 2: Pro každého získám všechny inzeráty a profil")
     print()
 
+    complete = True
     try:
-        scraper = SrealityScraper()
+        scraper = SrealityScraper(concurrency=args.concurrency, cache=cache)
         all_records = []
 
         total_combinations = len(category_main_list) * len(category_type_list) * len(locality_list)
         current_combo = 0
 
-        # Projdi všechny kombinace
-        for category_main in category_main_list:
-            for category_type in category_type_list:
-                for locality in locality_list:
-                    current_combo += 1
-
-                    if total_combinations > 1:
-                        print(f"\n{'='*60}")
-                        print(f"Kombinace {current_combo}/{total_combinations}")
-                        print(f"  • Typ: {category_names.get(category_main, 'Neznámý')}")
-                        print(f"  • Inzerát: {type_names.get(category_type, 'Neznámý')}")
-                        print(f"  • Kraj: {region_names.get(locality, 'Celá ČR')}")
-                        print('='*60)
-
-                    result = scraper.scrape_active_agents_full_profiles(
-                        category_main=category_main,
-                        category_type=category_type,
-                        locality_region_id=locality,
-                        max_pages=max_pages,
-                        full_scan=full_scan,
-                        fetch_details=fetch_details,
-                    )
-
-                    if result.errors:
-                        print("\n⚠️  Chyby:")
-                        for error in result.errors:
-                            print(f"   • {error}")
-
-                    if result.records:
-                        print(f"✅ Získáno {len(result.records)} makléřů z této kombinace")
-                        all_records.extend(result.records)
+        if args.workers > 1:
+            combinations = [
+                (category_main, category_type, locality)
+                for category_main in category_main_list
+                for category_type in category_type_list
+                for locality in locality_list
+            ]
+            records, complete = scrape_sharded(combinations, params, settings, checkpoint)
+            all_records.extend(records)
+
+        else:
+            # Projdi všechny kombinace
+            for category_main in category_main_list:
+                for category_type in category_type_list:
+                    for locality in locality_list:
+                        current_combo += 1
+
+                        if total_combinations > 1:
+                            print(f"\n{'='*60}")
+                            print(f"Kombinace {current_combo}/{total_combinations}")
+                            print(f"  • Typ: {category_names.get(category_main, 'Neznámý')}")
+                            print(f"  • Inzerát: {type_names.get(category_type, 'Neznámý')}")
+                            print(f"  • Kraj: {region_names.get(locality, 'Celá ČR')}")
+                            print('='*60)
+
+                        result = scraper.scrape_active_agents_full_profiles(
+                            category_main=category_main,
+                            category_type=category_type,
+                            locality_region_id=locality,
+                            max_pages=max_pages,
+                            full_scan=full_scan,
+                            fetch_details=fetch_details,
+                            lazy_details=params.get("lazy_details", False),
+                            count_probe=params.get("count_probe", False),
+                            checkpoint=checkpoint,
+                        )
+
+                        if result.errors:
+                            complete = False
+                            print("\n⚠️  Chyby:")
+                            for error in result.errors:
+                                print(f"   • {error}")
+
+                        if result.records:
+                            print(f"✅ Získáno {len(result.records)} makléřů z této kombinace")
+                            all_records.extend(result.records)
 
         # Slouč a deduplikuj makléře
         if all_records:
@@ -469,12 +589,12 @@ def main():
 
             # Výstupní soubor
             if args.output:
-                output_path = args.output
+                output_path = with_format(args.output, fmt)
             else:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_path = f"data/active_agents_{timestamp}.xlsx"
+                output_path = f"data/active_agents_{timestamp}.{fmt}"
 
-            save_to_excel_with_formatting(final_records, output_path)
+            save_to_excel_with_formatting(final_records, output_path, fmt)
 
         else:
             print("\n⚠️  Nepodařilo se získat žádná data.")
@@ -487,6 +607,17 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        checkpoint.flush()
+
+    # Doběhnutý běh už není co obnovovat - checkpoint zůstává jen po chybách
+    if complete:
+        checkpoint.discard()
+    else:
+        print(f"\n💾 Některé kombinace skončily s chybou, checkpoint zůstává: --resume {checkpoint.run_id}")
+
+    if cache is not None:
+        print(f"\n💾 Cache odpovědí: {cache.stats()}")
 
     print("\n" + "="*80)
     print("✅ Hotovo!")
@@ -7,13 +7,12 @@ na základě jejich profilových URL nebo user_id.
 """
 
 import argparse
-import os
 import sys
 from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
-
+from scrapers.cache import ResponseCache, parse_ttl_overrides
+from scrapers.export import FORMATS, PROFILE_LABEL, link, listing_links, output_format, with_format, write_table
 from scrapers.sreality import SrealityScraper
 
 
@@ -47,100 +46,41 @@ def read_agent_urls_from_file(file_path: str) -> list[str]:
         sys.exit(1)
 
 
-def save_to_excel(records: list, output_path: str) -> None:
+def save_to_excel(records: list, output_path: str, fmt: str = "xlsx") -> None:
     """
     Uloží záznamy do Excel souboru.
 
     Args:
         records: Seznam záznamů (dict)
         output_path: Cesta k výstupnímu souboru
+        fmt: Formát souboru (xlsx, parquet, csv, jsonl); mimo xlsx bez formátování
     """
     if not records:
         print("⚠️  Žádné záznamy k uložení.")
         return
 
-    # Vytvoř složku, pokud neexistuje
-    output_dir = os.path.dirname(output_path)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-
-    # Převeď na DataFrame
-    df = pd.DataFrame(records)
-
     # Seřaď podle počtu inzerátů
-    if "pocet_inzeratu" in df.columns:
-        df = df.sort_values(by="pocet_inzeratu", ascending=False)
-
-    # Ulož do Excelu
-    df.to_excel(output_path, index=False, engine="openpyxl")
-
-    # Přidej hyperlinky a formátování
-    from openpyxl import load_workbook
-    from openpyxl.styles import Font
-    from openpyxl.utils import get_column_letter
-
-    wb = load_workbook(output_path)
-    ws = wb.active
-
-    # Najdi sloupce s linky
-    headers = [cell.value for cell in ws[1]]
-    link_columns = []
-
-    for idx, header in enumerate(headers, 1):
-        if header in ["profil_maklere", "odkazy", "profil_url"]:
-            link_columns.append((idx, header))
-
-    # Přidej hyperlinky
-    for row_idx in range(2, ws.max_row + 1):  # Začni od řádku 2 (přeskoč hlavičku)
-        for col_idx, col_name in link_columns:
-            cell = ws.cell(row=row_idx, column=col_idx)
-            url = cell.value
-
-            if url and isinstance(url, str) and url.startswith("http"):
-                # Zkrať text pro odkazy (pokud je to seznam URL)
-                if col_name == "odkazy" and "," in url:
-                    # Více odkazů - zobraz jen "Více odkazů"
-                    urls = [u.strip() for u in url.split(",") if u.strip()]
-                    first_url = urls[0]
-                    cell.hyperlink = first_url
-                    cell.value = f"Zobrazit ({len(urls)} inzerátů)"
-                    cell.font = Font(color="0000FF", underline="single")
-                else:
-                    # Jeden odkaz
-                    cell.hyperlink = url
-                    # Zkrať zobrazení
-                    if col_name == "profil_maklere":
-                        cell.value = "Profil makléře"
-                    elif col_name == "profil_url":
-                        cell.value = "Profil makléře"
-                    cell.font = Font(color="0000FF", underline="single")
-
-    # Automatická šířka sloupců
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-
-        for cell in column:
-            try:
-                if cell.value:
-                    cell_length = len(str(cell.value))
-                    if cell_length > max_length:
-                        max_length = cell_length
-            except:
-                pass
-
-        # Nastav šířku (s limitem)
-        adjusted_width = min(max_length + 2, 60)  # Max 60 znaků
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-    # Ulož změny
-    wb.save(output_path)
+    has_counts = any("pocet_inzeratu" in record for record in records)
+    if has_counts:
+        records = sorted(records, key=lambda record: record.get("pocet_inzeratu") or 0, reverse=True)
+
+    # Ulož do Excelu včetně hyperlinků a formátování
+    write_table(
+        output_path,
+        records,
+        fmt,
+        links={
+            "profil_maklere": link(PROFILE_LABEL),
+            "profil_url": link(PROFILE_LABEL),
+            "odkazy": listing_links,
+        },
+    )
 
     print(f"\n✅ Data uložena do: {output_path}")
-    print(f"📊 Celkem makléřů: {len(df)}")
+    print(f"📊 Celkem makléřů: {len(records)}")
 
-    if "pocet_inzeratu" in df.columns:
-        total_listings = df["pocet_inzeratu"].sum()
+    if has_counts:
+        total_listings = sum(record.get("pocet_inzeratu") or 0 for record in records)
         print(f"🏠 Celkem inzerátů: {total_listings}")
 
 
@@ -191,7 +131,13 @@ Formát souboru s URL (jeden na řádek):
 
     parser.add_argument(
         "-o", "--output",
-        help="Cesta k výstupnímu Excel souboru (výchozí: data/makleri_profily_TIMESTAMP.xlsx)",
+        help="Cesta k výstupnímu Excel souboru (výchozí: data/makleri_profily_TIMESTAMP.FORMAT)",
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Formát výstupu - xlsx pro čtení, parquet/csv/jsonl pro další zpracování [podle přípony -o, jinak xlsx]",
     )
 
     parser.add_argument(
@@ -200,6 +146,44 @@ Formát souboru s URL (jeden na řádek):
         help="Nestahovat detaily inzerátů (rychlejší, ale méně přesné kontakty)",
     )
 
+    parser.add_argument(
+        "--lazy-details",
+        action="store_true",
+        help="Počty inzerátů brát z výpisu a detaily stahovat jen do nalezení telefonu a emailu",
+    )
+
+    parser.add_argument(
+        "--count-probe",
+        action="store_true",
+        help="Počty inzerátů makléře zjistit max. 15 dotazy per_page=1 místo procházení všech stránek",
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Počet souběžných požadavků na API (výchozí: 4)",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        default="data/cache",
+        help="Složka s cache odpovědí API (výchozí: data/cache)",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Nepoužívat cache odpovědí API",
+    )
+
+    parser.add_argument(
+        "--cache-ttl",
+        action="append",
+        metavar="TYP=SEKUNDY",
+        help="TTL cache pro typ endpointu (listing, estate, company), lze opakovat",
+    )
+
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -208,6 +192,11 @@ Formát souboru s URL (jeden na řádek):
 
     args = parser.parse_args()
 
+    try:
+        fmt = output_format(args.output, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
     # Validace vstupů
     if not args.urls and not args.file:
         parser.error("Musíš zadat buď -u/--urls nebo -f/--file")
@@ -232,7 +221,14 @@ Formát souboru s URL (jeden na řádek):
     print(f"🔍 Celkem makléřů k zpracování: {len(agent_urls)}\n")
 
     # Vytvoř scraper
-    scraper = SrealityScraper()
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = ResponseCache(args.cache_dir, ttls=parse_ttl_overrides(args.cache_ttl))
+        except ValueError as e:
+            parser.error(str(e))
+
+    scraper = SrealityScraper(concurrency=args.concurrency, cache=cache)
 
     # Spusť scraping
     print("⏳ Stahuji data...")
@@ -242,6 +238,8 @@ Formát souboru s URL (jeden na řádek):
         result = scraper.scrape_agent_profiles(
             agent_urls=agent_urls,
             fetch_details=not args.no_details,
+            lazy_details=args.lazy_details,
+            count_probe=args.count_probe,
         )
 
         # Zobraz chyby, pokud nějaké jsou
@@ -273,12 +271,12 @@ Formát souboru s URL (jeden na řádek):
 
             # Ulož do Excelu
             if args.output:
-                output_path = args.output
+                output_path = with_format(args.output, fmt)
             else:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_path = f"data/makleri_profily_{timestamp}.xlsx"
+                output_path = f"data/makleri_profily_{timestamp}.{fmt}"
 
-            save_to_excel(result.records, output_path)
+            save_to_excel(result.records, output_path, fmt)
 
         else:
             print("⚠️  Nepodařilo se získat žádná data.")
@@ -293,6 +291,9 @@ Formát souboru s URL (jeden na řádek):
             traceback.print_exc()
         sys.exit(1)
 
+    if cache is not None:
+        print(f"\n💾 Cache odpovědí: {cache.stats()}")
+
     print("\n" + "=" * 80)
     print("✅ Hotovo!")
     print("=" * 80)
@@ -8,10 +8,9 @@ import sys
 from pathlib import Path
 from typing import Iterable, List, Sequence
 
-import pandas as pd
-
 from scrapers import get_scraper, list_scrapers
 from scrapers.base import BaseScraper, ScraperResult, merge_results
+from scrapers.export import FORMATS, PROFILE_LABEL, link, listing_links, output_format, with_format, write_table
 
 
 def _available_slugs() -> List[str]:
@@ -221,6 +220,11 @@ def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
         type=Path,
         help="Cílový soubor (Excel .xlsx). Bez zadání se jen vypíše souhrn.",
     )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Formát výstupu - xlsx pro čtení, parquet/csv/jsonl pro další zpracování (výchozí podle přípony --output, jinak xlsx).",
+    )
     parser.add_argument(
         "--list",
         action="store_true",
@@ -231,7 +235,12 @@ def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
         action="store_true",
         help="Interaktivně se zeptá na výběr platformy, pokud není zadána.",
     )
-    return parser.parse_args(argv)
+    args = parser.parse_args(argv)
+    try:
+        args.format = output_format(args.output, args.format)
+    except ValueError as exc:
+        parser.error(str(exc))
+    return args
 
 
 def _validate_platforms(platforms: Iterable[str]) -> List[str]:
@@ -242,73 +251,18 @@ def _validate_platforms(platforms: Iterable[str]) -> List[str]:
     return list(dict.fromkeys(platforms))
 
 
-def _save_to_excel(result: ScraperResult, output: Path) -> None:
-    """Uloží výsledky do Excelu s hyperlinky a formátováním."""
-    from openpyxl import load_workbook
-    from openpyxl.styles import Font
-    from openpyxl.utils import get_column_letter
-
-    output.parent.mkdir(parents=True, exist_ok=True)
-    df = pd.DataFrame(result.records)
-
-    # Nejdřív ulož běžně
-    df.to_excel(output, index=False, engine="openpyxl")
-
-    # Pak načti a přidej hyperlinky + formátování
-    wb = load_workbook(output)
-    ws = wb.active
-
-    # Najdi sloupce s linky
-    headers = [cell.value for cell in ws[1]]
-    link_columns = []
-
-    for idx, header in enumerate(headers, 1):
-        if header in ["profil_maklere", "odkazy", "profil_url"]:
-            link_columns.append((idx, header))
-
-    # Přidej hyperlinky
-    for row_idx in range(2, ws.max_row + 1):  # Začni od řádku 2 (přeskoč hlavičku)
-        for col_idx, col_name in link_columns:
-            cell = ws.cell(row=row_idx, column=col_idx)
-            url = cell.value
-
-            if url and isinstance(url, str) and url.startswith("http"):
-                # Zkrať text pro odkazy (pokud je to seznam URL)
-                if col_name == "odkazy" and "," in url:
-                    # Více odkazů - zobraz jen "Více odkazů"
-                    urls = [u.strip() for u in url.split(",") if u.strip()]
-                    first_url = urls[0]
-                    cell.hyperlink = first_url
-                    cell.value = f"Zobrazit ({len(urls)} inzerátů)"
-                    cell.font = Font(color="0000FF", underline="single")
-                else:
-                    # Jeden odkaz
-                    cell.hyperlink = url
-                    # Zkrať zobrazení
-                    if col_name == "profil_maklere":
-                        cell.value = "Profil makléře"
-                    cell.font = Font(color="0000FF", underline="single")
-
-    # Automatická šířka sloupců
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-
-        for cell in column:
-            try:
-                if cell.value:
-                    cell_length = len(str(cell.value))
-                    if cell_length > max_length:
-                        max_length = cell_length
-            except:
-                pass
-
-        # Nastav šířku (s limitem)
-        adjusted_width = min(max_length + 2, 60)  # Max 60 znaků
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-    # Ulož změny
-    wb.save(output)
+def _save_to_excel(result: ScraperResult, output: Path, fmt: str = "xlsx") -> None:
+    """Uloží výsledky do Excelu s hyperlinky a formátováním (nebo do parquet/csv/jsonl)."""
+    write_table(
+        output,
+        result.records,
+        fmt,
+        links={
+            "profil_maklere": link(PROFILE_LABEL),
+            "profil_url": link(),
+            "odkazy": listing_links,
+        },
+    )
 
 
 def main(argv: Sequence[str] | None = None) -> int:
@@ -440,15 +394,15 @@ def main(argv: Sequence[str] | None = None) -> int:
     print(f"Celkem nalezeno {len(merged.records)} unikátních záznamů.")
 
     # Auto-generate output filename if using --prompt and no output specified
-    output_path = args.output
+    output_path = with_format(args.output, args.format) if args.output else None
     if not output_path and args.prompt and merged.records:
         from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = Path(f"data/makleri_{timestamp}.xlsx")
+        output_path = Path(f"data/makleri_{timestamp}.{args.format}")
         print(f"\nAutomaticky vytvořen název souboru: {output_path}")
 
     if output_path:
-        _save_to_excel(merged, output_path)
+        _save_to_excel(merged, output_path, args.format)
         print(f"✅ Data uložena do {output_path}")
     else:
         print("\n⚠️  Nezadal jsi --output, data nejsou uložena do souboru.")
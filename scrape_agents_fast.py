@@ -11,19 +11,21 @@ Rychlost: 4× rychlejší než předchozí verze!
 """
 
 import argparse
+import functools
 import sys
 import re
 import unicodedata
 from datetime import datetime
-from pathlib import Path
 from collections import defaultdict
 
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
-
-from scrapers.sreality import SrealityScraper
+from scrapers.cache import ResponseCache, parse_ttl_overrides
+from scrapers.checkpoint import Checkpoint, section_key
+from scrapers.export import FORMATS, PROFILE_LABEL, link, output_format, with_format, write_table
+from scrapers.pipeline import stream
+from scrapers.roster import RosterStore, fetch_company_sellers
+from scrapers.saturation import SaturationStop, chao1
+from scrapers.sharding import ShardSettings, expand_regions, run_shards
+from scrapers.sreality import SrealityScraper, estate_category, sweep_combinations
 
 
 def slugify_company_name(name):
@@ -38,29 +40,9 @@ def slugify_company_name(name):
     return ascii_value.strip("-") or "company"
 
 
-def scrape_agents_fast_combined(
-    scraper,
-    combinations,  # List of (category_main, category_type, locality) tuples
-    max_pages,
-    full_scan,
-):
-    """
-    Super rychlý scraping s deduplikací companies napříč kombinacemi.
-
-    FÁZE 1: Agreguj companies ze VŠECH kombinací
-    FÁZE 2: Deduplikuj (každá company jen jednou)
-    FÁZE 3: Volej sellers API jen pro unikátní companies
-    """
-
-    print(f"🔍 FÁZE 1: Agregace companies ze všech kombinací...")
-
-    if full_scan:
-        max_pages = None
-
-    limit = max_pages if max_pages is not None else None
-
-    # Sdílený dictionary pro VŠECHNY kombinace!
-    all_companies = defaultdict(lambda: {
+def new_company_map():
+    """Prázdná agregace companies: company_id -> statistiky z inzerátů."""
+    return defaultdict(lambda: {
         "company_id": None,
         "company_name": None,
         "total_estates": 0,
@@ -68,402 +50,364 @@ def scrape_agents_fast_combined(
         "category_breakdown": defaultdict(int),
     })
 
-    total_listings_all = 0
-    category_names = {1: "Byty", 2: "Domy", 3: "Pozemky", 4: "Komerční", 5: "Ostatní"}
-    type_names = {1: "Prodej", 2: "Pronájem", 3: "Dražby"}
-
-    # FÁZE 1: Projdi VŠECHNY kombinace a agreguj do jednoho dictionary
-    for combo_idx, (category_main, category_type, locality_region_id) in enumerate(combinations, 1):
-        print(f"\n   Kombinace {combo_idx}/{len(combinations)}: {category_names.get(category_main)} / {type_names.get(category_type)}")
-
-        page = 1
 
-        while True:
-            if limit is not None and page > limit:
-                break
-
-            params = {
-                "category_main_cb": category_main,
-                "category_type_cb": category_type,
-                "page": page,
-                "per_page": 60,
-            }
+def collect_combination(
+    scraper, combination, limit, all_companies, start_page=1, on_page=None, saturation=None, categories=None
+):
+    """FÁZE 1 pro jednu kombinaci: přičte RK z inzerátů do all_companies.
 
-            if locality_region_id is not None:
-                params["locality_region_id"] = locality_region_id
+    on_page(page, počet inzerátů) se volá po každé stránce. Se saturation
+    (SaturationStop) skončí, jakmile stránky přestanou přinášet nové RK.
+    Kombinace (None, None, kraj) je jeden průchod bez filtru kategorií;
+    categories pak určí, které dvojice (kategorie, typ) se započítají.
+    Vrací (počet inzerátů, True pokud se výpis stáhl bez chyby).
+    """
+    category_main, category_type, locality_region_id = combination
+    listings = 0
 
-            payload = scraper._request(scraper._config.api_url, params=params)
-            if not payload:
-                print(f"      ⚠️  Chyba při stahování stránky {page}")
-                break
+    params = {"per_page": 60}
+    if category_main is not None:
+        params["category_main_cb"] = category_main
+    if category_type is not None:
+        params["category_type_cb"] = category_type
 
-            estates = payload.get("_embedded", {}).get("estates", [])
-            if not estates:
-                break
+    if locality_region_id is not None:
+        params["locality_region_id"] = locality_region_id
 
-            # Počítadla pro tuto stránku
-            companies_on_page = set()
-            new_companies_set = set()
-            already_known_set = set()
+    pages = scraper._paginate(scraper._config.api_url, params, max_pages=limit, start_page=start_page)
+    for page, payload in pages:
+        estates = payload.get("_embedded", {}).get("estates", [])
+        if not estates:
+            break
 
-            for estate in estates:
-                total_listings_all += 1
+        if categories is not None:
+            # Průchod bez filtru - inzeráty se rozdělí podle kategorie lokálně
+            estates = [estate for estate in estates if estate_category(estate) in categories]
 
-                embedded = estate.get("_embedded", {})
-                company = embedded.get("company", {})
+        # Počítadla pro tuto stránku
+        companies_on_page = set()
+        new_companies_set = set()
+        already_known_set = set()
+        listings_on_page = 0
 
-                if not company:
-                    continue
+        for estate in estates:
+            listings_on_page += 1
 
-                company_id = company.get("id")
-                if not company_id:
-                    continue
+            embedded = estate.get("_embedded", {})
+            company = embedded.get("company", {})
 
-                company_id = str(company_id)
+            if not company:
+                continue
 
-                # Kontrola, jestli je company nová (jen při prvním výskytu na stránce!)
-                if company_id not in companies_on_page:
-                    companies_on_page.add(company_id)
+            company_id = company.get("id")
+            if not company_id:
+                continue
 
-                    comp = all_companies[company_id]
+            company_id = str(company_id)
 
-                    if comp["company_id"] is None:
-                        # Úplně nová RK (napříč všemi kombinacemi)
-                        comp["company_id"] = company_id
-                        comp["company_name"] = company.get("name")
-                        new_companies_set.add(company_id)
-                    else:
-                        # Už známá z předchozí kombinace/stránky
-                        already_known_set.add(company_id)
+            # Kontrola, jestli je company nová (jen při prvním výskytu na stránce!)
+            if company_id not in companies_on_page:
+                companies_on_page.add(company_id)
 
-                # Aktualizuj statistiky (pro každý inzerát)
                 comp = all_companies[company_id]
-                comp["total_estates"] += 1
-
-                # Lokalita
-                locality = estate.get("locality", "")
-                if locality:
-                    comp["localities"].add(locality)
-
-                # Kategorie
-                seo = estate.get("seo", {}) if isinstance(estate.get("seo"), dict) else {}
-                cat_main = seo.get("category_main_cb") or category_main
-                cat_type = seo.get("category_type_cb") or category_type
-                key = (cat_main, cat_type)
-                comp["category_breakdown"][key] += 1
-
-            # Výpis - statistiky s running total!
-            current_total_companies = sum(1 for c in all_companies.values() if c["company_id"] is not None)
-            print(f"      Stránka {page}: {len(estates)} inzerátů")
-            print(f"         → RK na stránce: {len(companies_on_page)}, Nové: {len(new_companies_set)}, Již známé: {len(already_known_set)}, Celkem RK: {current_total_companies}")
 
-            result_size = payload.get("result_size", 0)
-            if (page * 60) >= result_size:
-                break
-
-            page += 1
-            scraper._delay()
-
-    print(f"\n✅ Zpracováno {total_listings_all} inzerátů celkem")
-    print(f"✅ Nalezeno {len(all_companies)} UNIKÁTNÍCH realitních kanceláří")
-
-    # FÁZE 2: Volej sellers API jen pro UNIKÁTNÍ companies
-    print(f"\n🔍 FÁZE 2: Stahuji seznam makléřů (jen pro unikátní RK)...")
-
-    all_records = []
-
-    for idx, (company_id, comp) in enumerate(all_companies.items(), 1):
-        # Stáhnout VŠECHNY makléře (může být více stránek!)
-        all_sellers = []
-        page = 1
-
-        while True:
-            company_url = f"{scraper._config.base_url}/api/cs/v2/companies/{company_id}"
-            params = {"page": page} if page > 1 else None
-            company_data = scraper._request(company_url, params=params)
-
-            if not company_data:
-                print(f"   ⚠️  Chyba při stahování company {company_id}")
-                break
-
-            # Získej seznam makléřů
-            embedded = company_data.get("_embedded", {})
-            sellers_data = embedded.get("sellers", {})
+                if comp["company_id"] is None:
+                    # Úplně nová RK (napříč všemi kombinacemi)
+                    comp["company_id"] = company_id
+                    comp["company_name"] = company.get("name")
+                    new_companies_set.add(company_id)
+                else:
+                    # Už známá z předchozí kombinace/stránky
+                    already_known_set.add(company_id)
+
+            # Aktualizuj statistiky (pro každý inzerát)
+            comp = all_companies[company_id]
+            comp["total_estates"] += 1
 
-            if isinstance(sellers_data, dict):
-                result_size = sellers_data.get("result_size", 0)
-                per_page = sellers_data.get("per_page", 20)
-                sellers_list = sellers_data.get("sellers", [])
-            else:
-                sellers_list = []
-                result_size = 0
-                per_page = 20
+            # Lokalita
+            locality = estate.get("locality", "")
+            if locality:
+                comp["localities"].add(locality)
 
-            if not sellers_list:
-                break
+            # Kategorie
+            key = estate_category(estate, category_main, category_type)
+            comp["category_breakdown"][key] += 1
 
-            all_sellers.extend(sellers_list)
+        # Výpis - statistiky s running total!
+        current_total_companies = sum(1 for c in all_companies.values() if c["company_id"] is not None)
+        print(f"      Stránka {page}: {len(estates)} inzerátů")
+        print(f"         → RK na stránce: {len(companies_on_page)}, Nové: {len(new_companies_set)}, Již známé: {len(already_known_set)}, Celkem RK: {current_total_companies}")
 
-            # Kontrola, jestli jsou další stránky
-            if (page * per_page) >= result_size:
-                break
+        listings += listings_on_page
+        if on_page is not None:
+            on_page(page, listings_on_page)
 
-            page += 1
-            scraper._delay()
+        if saturation is not None and saturation.update(page, len(new_companies_set)):
+            print(f"      ⏹️  Nasyceno: {saturation.pages} stránek po sobě s méně než {saturation.min_new} novými RK, "
+                  f"zbytek kombinace se přeskakuje (stránka {page}/{pages.total_pages})")
+            break
 
-        if not all_sellers:
-            print(f"   ⚠️  Company {comp['company_name']}: žádní makléři")
-            continue
+    if pages.failed_page is not None:
+        print(f"      ⚠️  Chyba při stahování stránky {pages.failed_page}")
 
-        # Výpis
-        if page > 1:
-            print(f"   {idx}/{len(all_companies)}: {comp['company_name']} - {len(all_sellers)} makléřů ({page} stránek)")
-        else:
-            print(f"   {idx}/{len(all_companies)}: {comp['company_name']} - {len(all_sellers)} makléřů")
+    return listings, pages.failed_page is None
 
-        # Lokalita
-        localities_list = list(comp["localities"])
-        if localities_list:
-            locality = localities_list[0]
-            parts = [p.strip() for p in locality.split(",")]
-            mesto = parts[0] if parts else ""
-            kraj = parts[-1] if len(parts) > 1 else ""
-        else:
-            mesto = ""
-            kraj = ""
 
-        # Rozložení
-        breakdown_items = []
-        for (cat, typ), count in sorted(comp["category_breakdown"].items(), key=lambda x: -x[1]):
-            cat_name = category_names.get(cat, f"Kategorie {cat}")
-            typ_name = type_names.get(typ, f"Typ {typ}")
-            breakdown_items.append(f"{cat_name}/{typ_name}: {count}")
-        rozlozeni = ", ".join(breakdown_items) if breakdown_items else ""
+def collect_shard(shard, settings, limit=None, start_pages=None, saturation=None, categories=None):
+    """FÁZE 1 pro jeden shard ve worker procesu s vlastním scraperem.
 
-        company_slug = slugify_company_name(comp["company_name"])
+    Vrací (companies, počet inzerátů, poslední hotová stránka, hotovo).
+    """
+    companies = new_company_map()
+    start_page = (start_pages or {}).get(section_key(*shard), 0) + 1
+    last_page = start_page - 1
+
+    def on_page(page, _listings):
+        nonlocal last_page
+        last_page = page
+
+    with settings.scraper() as scraper:
+        listings, complete = collect_combination(
+            scraper, shard, limit, companies, start_page=start_page, on_page=on_page,
+            saturation=SaturationStop(*saturation) if saturation else None,
+            categories=categories,
+        )
+    return dict(companies), listings, last_page, complete
+
+
+def merge_companies(all_companies, companies):
+    """Přičte companies jednoho shardu do celkové agregace."""
+    for company_id, comp in companies.items():
+        target = all_companies[company_id]
+        if target["company_id"] is None:
+            target["company_id"] = comp["company_id"]
+            target["company_name"] = comp["company_name"]
+        target["total_estates"] += comp["total_estates"]
+        target["localities"] |= comp["localities"]
+        for key, count in comp["category_breakdown"].items():
+            target["category_breakdown"][key] += count
 
-        # Company řádek
-        all_records.append({
-            "typ_radku": "COMPANY",
-            "zdroj": "Sreality.cz",
-            "realitni_kancelar": comp["company_name"],
-            "jmeno_maklere": "",
-            "telefon": "",
-            "email": "",
-            "kraj": kraj,
-            "mesto": mesto,
-            "profil_url": "",
-            "pocet_inzeratu": comp["total_estates"],
-            "rozlozeni_inzeratu": rozlozeni,
-        })
 
-        # Makléři
-        for seller in all_sellers:
-            seller_id = seller.get("id")
-            seller_name = seller.get("name", "")
+def scrape_agents_fast_combined(
+    scraper,
+    combinations,  # List of (category_main, category_type, locality) tuples
+    max_pages,
+    full_scan,
+    checkpoint=None,
+    settings=None,
+    rosters=None,
+    saturation_pages=None,
+    saturation_new=1,
+    single_sweep=False,
+    errors=None,
+):
+    """
+    Super rychlý scraping s deduplikací companies napříč kombinacemi.
 
-            phones = seller.get("phones", [])
-            phone = ""
-            if phones and isinstance(phones, list):
-                first_phone = phones[0]
-                if isinstance(first_phone, dict):
-                    phone = first_phone.get("number", "")
+    FÁZE 1: Agreguj companies ze VŠECH kombinací
+    FÁZE 2: Deduplikuj (každá company jen jednou)
+    FÁZE 3: Volej sellers API jen pro unikátní companies
 
-            email = seller.get("email", "")
-            profile_url = f"https://www.sreality.cz/adresar/{company_slug}/{company_id}/makleri/{seller_id}"
+    S checkpointem se ukládá poslední hotová stránka každé kombinace,
+    agregované companies a už rozbalené companies; při pokračování se
+    hotová práce znovu nestahuje.
 
-            all_records.append({
-                "typ_radku": "AGENT",
-                "zdroj": "",
-                "realitni_kancelar": "",
-                "jmeno_maklere": seller_name,
-                "telefon": phone,
-                "email": email,
-                "kraj": "",
-                "mesto": "",
-                "profil_url": profile_url,
-                "pocet_inzeratu": "",
-                "rozlozeni_inzeratu": "",
-            })
+    Se settings (ShardSettings, workers > 1) běží FÁZE 1 ve více procesech.
 
-        scraper._delay()
+    S rosters (RosterStore) se stahují jen companies, jejichž uložený seznam
+    makléřů je starší než jeho max_age; u obnovených se vypíše, kdo přišel
+    a kdo odešel.
 
-    print(f"\n✅ Stahování dokončeno")
+    Se saturation_pages=N skončí kombinace, jakmile N stránek po sobě
+    přinese méně než saturation_new nových RK; odhad Chao1 pak řekne,
+    kolik RK asi chybí.
 
-    return all_records
+    Se single_sweep se pro každý kraj projde výpis jen jednou, bez filtru
+    kategorií, a inzeráty se rozdělí podle seo.category_main_cb /
+    category_type_cb lokálně - vyplatí se při výběru více kombinací.
 
+    Do seznamu errors se zapíšou kombinace, jejichž výpis se nepodařilo
+    stáhnout celý, a RK, jejichž seznam makléřů se nestáhl.
+    """
+    if errors is None:
+        errors = []
 
-def scrape_agents_fast(
-    scraper,
-    category_main,
-    category_type,
-    locality_region_id,
-    max_pages,
-    full_scan,
-):
-    """Super rychlý scraping pomocí company API (single combination)."""
+    state = checkpoint.section("fast") if checkpoint is not None else {}
 
-    print(f"🔍 FÁZE 1: Agregace podle company...")
+    print(f"🔍 FÁZE 1: Agregace companies ze všech kombinací...")
 
     if full_scan:
         max_pages = None
 
     limit = max_pages if max_pages is not None else None
 
-    # Agregace podle company_id
-    companies = defaultdict(lambda: {
-        "company_id": None,
-        "company_name": None,
-        "total_estates": 0,
-        "localities": set(),  # Různé lokality
-        "category_breakdown": defaultdict(int),
-    })
-
-    page = 1
-    total_listings = 0
+    categories = None
+    if single_sweep:
+        # Jeden průchod na kraj místo jednoho na každou kombinaci
+        combinations, categories = sweep_combinations(combinations)
+        if categories is not None:
+            print(f"   Jeden průchod na kraj ({len(combinations)}×) pro {len(categories)} kombinací kategorií")
 
-    # FÁZE 1: Projdi inzeráty a agreguj podle company
-    while True:
-        if limit is not None and page > limit:
-            break
+    # Sdílený dictionary pro VŠECHNY kombinace!
+    all_companies = new_company_map()
+
+    # Companies z checkpointu (klíče rozložení jsou "kategorie/typ")
+    for company_id, saved in state.get("companies", {}).items():
+        comp = all_companies[company_id]
+        comp.update(saved)
+        comp["localities"] = set(saved["localities"])
+        comp["category_breakdown"] = defaultdict(int, {
+            tuple(int(part) for part in key.split("/")): count
+            for key, count in saved["category_breakdown"].items()
+        })
 
-        params = {
-            "category_main_cb": category_main,
-            "category_type_cb": category_type,
-            "page": page,
-            "per_page": 60,
+    # Poslední hotová stránka každé kombinace (-1 = kombinace hotová)
+    combo_pages = dict(state.get("pages", {}))
+    total_listings_all = state.get("total_listings", 0)
+
+    def save_phase1():
+        state["pages"] = dict(combo_pages)
+        state["total_listings"] = total_listings_all
+        state["companies"] = {
+            company_id: {
+                **comp,
+                "localities": sorted(comp["localities"]),
+                "category_breakdown": {f"{cat}/{typ}": count for (cat, typ), count in comp["category_breakdown"].items()},
+            }
+            for company_id, comp in all_companies.items()
         }
+        checkpoint.flush()
 
-        if locality_region_id is not None:
-            params["locality_region_id"] = locality_region_id
-
-        payload = scraper._request(scraper._config.api_url, params=params)
-        if not payload:
-            print(f"⚠️  Chyba při stahování stránky {page}")
-            break
-
-        estates = payload.get("_embedded", {}).get("estates", [])
-        if not estates:
-            break
-
-        # Počítadla pro tuto stránku
-        new_companies = 0
-        existing_companies = 0
-
-        for estate in estates:
-            total_listings += 1
+    category_names = {1: "Byty", 2: "Domy", 3: "Pozemky", 4: "Komerční", 5: "Ostatní"}
+    type_names = {1: "Prodej", 2: "Pronájem", 3: "Dražby"}
 
-            embedded = estate.get("_embedded", {})
-            company = embedded.get("company", {})
+    # FÁZE 1: Projdi VŠECHNY kombinace a agreguj do jednoho dictionary
+    if settings is not None and settings.workers > 1:
+        # Kombinace (celá ČR po krajích) se rozdělí mezi procesy; výsledky
+        # se slučují v pořadí shardů, takže pořadí RK nezávisí na procesech.
+        shards = [shard for shard in expand_regions(combinations) if combo_pages.get(section_key(*shard)) != -1]
+        print(f"   🧩 {len(shards)} shardů, {min(settings.workers, len(shards) or 1)} procesů")
+
+        task = functools.partial(
+            collect_shard,
+            limit=limit,
+            start_pages=dict(combo_pages),
+            saturation=(saturation_pages, saturation_new) if saturation_pages else None,
+            categories=categories,
+        )
+        for position, (shard, (companies, listings, last_page, complete)) in enumerate(run_shards(task, shards, settings), 1):
+            merge_companies(all_companies, companies)
+            total_listings_all += listings
+            combo_pages[section_key(*shard)] = -1 if complete else last_page
+            print(f"   ✓ Shard {position}/{len(shards)} {shard}: {listings} inzerátů, {len(companies)} RK")
+            if not complete:
+                errors.append(f"Výpis kombinace {shard} skončil chybou na stránce {last_page + 1}")
+            if checkpoint is not None and checkpoint.due():
+                save_phase1()
 
-            if not company:
-                continue
+    else:
+        for combo_idx, (category_main, category_type, locality_region_id) in enumerate(combinations, 1):
+            if category_main is None:
+                print(f"\n   Průchod {combo_idx}/{len(combinations)}: všechny kategorie (kraj {locality_region_id or 'celá ČR'})")
+            else:
+                print(f"\n   Kombinace {combo_idx}/{len(combinations)}: {category_names.get(category_main)} / {type_names.get(category_type)}")
 
-            company_id = company.get("id")
-            if not company_id:
+            combo_key = section_key(category_main, category_type, locality_region_id)
+            last_page = combo_pages.get(combo_key, 0)
+            if last_page == -1:
+                print(f"      ♻️  Hotovo podle checkpointu")
                 continue
 
-            company_id = str(company_id)
-
-            # Kontrola, jestli je company nová
-            is_new = company_id not in companies or companies[company_id]["company_id"] is None
-
-            comp = companies[company_id]
-
-            if comp["company_id"] is None:
-                comp["company_id"] = company_id
-                comp["company_name"] = company.get("name")
-                new_companies += 1
+            def on_page(page, listings):
+                nonlocal total_listings_all
+                total_listings_all += listings
+                combo_pages[combo_key] = page
+                if checkpoint is not None and checkpoint.due():
+                    save_phase1()
+
+            _listings, complete = collect_combination(
+                scraper, (category_main, category_type, locality_region_id), limit, all_companies,
+                start_page=last_page + 1, on_page=on_page,
+                saturation=SaturationStop(saturation_pages, saturation_new) if saturation_pages else None,
+                categories=categories,
+            )
+            if complete:
+                combo_pages[combo_key] = -1
             else:
-                existing_companies += 1
-
-            comp["total_estates"] += 1
-
-            # Lokalita
-            locality = estate.get("locality", "")
-            if locality:
-                comp["localities"].add(locality)
-
-            # Kategorie
-            seo = estate.get("seo", {}) if isinstance(estate.get("seo"), dict) else {}
-            cat_main = seo.get("category_main_cb") or category_main
-            cat_type = seo.get("category_type_cb") or category_type
-            key = (cat_main, cat_type)
-            comp["category_breakdown"][key] += 1
-
-        # Výpis statistik pro tuto stránku
-        print(f"   Stránka {page}: {len(estates)} inzerátů")
-        if new_companies > 0 or existing_companies > 0:
-            print(f"      → Nové RK: {new_companies}, Existující RK: {existing_companies}")
-
-        result_size = payload.get("result_size", 0)
-        if (page * 60) >= result_size:
-            break
+                errors.append(f"Výpis kombinace {combo_key} skončil chybou na stránce {combo_pages.get(combo_key, 0) + 1}")
 
-        page += 1
-        scraper._delay()
+    if checkpoint is not None:
+        save_phase1()
 
-    print(f"\n✅ Zpracováno {total_listings} inzerátů")
-    print(f"✅ Nalezeno {len(companies)} realitních kanceláří")
+    print(f"\n✅ Zpracováno {total_listings_all} inzerátů celkem")
+    print(f"✅ Nalezeno {len(all_companies)} UNIKÁTNÍCH realitních kanceláří")
+    if saturation_pages:
+        # Capture-recapture: RK viděné jen v 1-2 inzerátech napoví, kolik jich chybí
+        estimate = chao1(comp["total_estates"] for comp in all_companies.values())
+        print(f"📈 Odhad (Chao1): ~{estimate:.0f} RK celkem, pravděpodobně chybí ~{estimate - len(all_companies):.0f}")
 
-    # FÁZE 2: Pro každou company stáhni seznam makléřů (s paginací!)
-    print(f"\n🔍 FÁZE 2: Stahuji seznam makléřů z company API...")
+    # FÁZE 2: Volej sellers API jen pro UNIKÁTNÍ companies
+    print(f"\n🔍 FÁZE 2: Stahuji seznam makléřů (jen pro unikátní RK)...")
 
     all_records = []
+    expanded = state.setdefault("expanded", {})
+
+    def expand(item):
+        company_id, _comp = item
+        if company_id in expanded:
+            return None
+        if rosters is not None:
+            # Čerstvý seznam makléřů z úložiště (0 stránek = nestahováno)
+            sellers = rosters.fresh(company_id)
+            if sellers is not None:
+                return sellers, 0, False
+        return fetch_company_sellers(scraper, company_id)
+
+    joined_total = 0
+    left_total = 0
+
+    # Companies se rozbalují souběžně, výsledky ale chodí v pořadí companies,
+    # takže řádky COMPANY → AGENT zůstávají ve stejném pořadí jako dřív.
+    expansions = stream(list(all_companies.items()), expand, workers=scraper._config.concurrency)
+
+    for idx, ((company_id, comp), expansion) in enumerate(expansions, 1):
+        if expansion is None:
+            # Rozbaleno už v přerušeném běhu
+            all_records.extend(expanded[company_id])
+            continue
 
-    for idx, (company_id, comp) in enumerate(companies.items(), 1):
-        # Stáhnout VŠECHNY makléře (může být více stránek!)
-        all_sellers = []
-        page = 1
-
-        while True:
-            company_url = f"{scraper._config.base_url}/api/cs/v2/companies/{company_id}"
-            params = {"page": page} if page > 1 else None
-            company_data = scraper._request(company_url, params=params)
-
-            if not company_data:
-                print(f"   ⚠️  Chyba při stahování company {company_id}")
-                break
-
-            # Získej seznam makléřů
-            embedded = company_data.get("_embedded", {})
-            sellers_data = embedded.get("sellers", {})
-
-            if isinstance(sellers_data, dict):
-                result_size = sellers_data.get("result_size", 0)
-                per_page = sellers_data.get("per_page", 20)
-                sellers_list = sellers_data.get("sellers", [])
-            else:
-                sellers_list = []
-                result_size = 0
-                per_page = 20
-
-            if not sellers_list:
-                break
-
-            all_sellers.extend(sellers_list)
-
-            # Kontrola, jestli jsou další stránky
-            if (page * per_page) >= result_size:
-                break
-
-            page += 1
-            scraper._delay()  # Delay mezi stránkami
+        # VŠICHNI makléři (může být více stránek!)
+        all_sellers, page, failed = expansion
+        if failed:
+            print(f"   ⚠️  Chyba při stahování company {company_id}")
+            errors.append(f"Chyba při stahování company {company_id}")
+
+        if rosters is not None and page and not failed:
+            change = rosters.put(company_id, comp["company_name"], all_sellers)
+            for seller in change.joined:
+                print(f"      ➕ {comp['company_name']}: přišel(a) {seller.get('name', '')}")
+            for seller in change.left:
+                print(f"      ➖ {comp['company_name']}: odešel(a) {seller.get('name', '')}")
+            joined_total += len(change.joined)
+            left_total += len(change.left)
 
         if not all_sellers:
             print(f"   ⚠️  Company {comp['company_name']}: žádní makléři")
+            if not failed:
+                expanded[company_id] = []
             continue
 
-        # Pokud bylo více stránek, ukaž to
+        company_records = []
+
+        # Výpis
         if page > 1:
-            print(f"   {idx}/{len(companies)}: {comp['company_name']} - {len(all_sellers)} makléřů ({page} stránek)")
+            print(f"   {idx}/{len(all_companies)}: {comp['company_name']} - {len(all_sellers)} makléřů ({page} stránek)")
         else:
-            print(f"   {idx}/{len(companies)}: {comp['company_name']} - {len(all_sellers)} makléřů")
+            print(f"   {idx}/{len(all_companies)}: {comp['company_name']} - {len(all_sellers)} makléřů")
 
-        # Lokalita - vezmi nejčastější
+        # Lokalita
         localities_list = list(comp["localities"])
         if localities_list:
-            # Vezmi první lokalitu a parse kraj/město
             locality = localities_list[0]
             parts = [p.strip() for p in locality.split(",")]
             mesto = parts[0] if parts else ""
@@ -472,9 +416,7 @@ def scrape_agents_fast(
             mesto = ""
             kraj = ""
 
-        # Vytvoř rozložení inzerátů
-        category_names = {1: "Byty", 2: "Domy", 3: "Pozemky", 4: "Komerční", 5: "Ostatní"}
-        type_names = {1: "Prodej", 2: "Pronájem", 3: "Dražby"}
+        # Rozložení
         breakdown_items = []
         for (cat, typ), count in sorted(comp["category_breakdown"].items(), key=lambda x: -x[1]):
             cat_name = category_names.get(cat, f"Kategorie {cat}")
@@ -482,11 +424,11 @@ def scrape_agents_fast(
             breakdown_items.append(f"{cat_name}/{typ_name}: {count}")
         rozlozeni = ", ".join(breakdown_items) if breakdown_items else ""
 
-        # Company řádek (hlavička)
         company_slug = slugify_company_name(comp["company_name"])
 
-        all_records.append({
-            "typ_radku": "COMPANY",  # Speciální typ pro formátování
+        # Company řádek
+        company_records.append({
+            "typ_radku": "COMPANY",
             "zdroj": "Sreality.cz",
             "realitni_kancelar": comp["company_name"],
             "jmeno_maklere": "",
@@ -499,12 +441,11 @@ def scrape_agents_fast(
             "rozlozeni_inzeratu": rozlozeni,
         })
 
-        # Makléři pod company
+        # Makléři
         for seller in all_sellers:
             seller_id = seller.get("id")
             seller_name = seller.get("name", "")
 
-            # Telefon - vezmi první
             phones = seller.get("phones", [])
             phone = ""
             if phones and isinstance(phones, list):
@@ -513,14 +454,12 @@ def scrape_agents_fast(
                     phone = first_phone.get("number", "")
 
             email = seller.get("email", "")
-
-            # URL profilu
             profile_url = f"https://www.sreality.cz/adresar/{company_slug}/{company_id}/makleri/{seller_id}"
 
-            all_records.append({
-                "typ_radku": "AGENT",  # Makléř
+            company_records.append({
+                "typ_radku": "AGENT",
                 "zdroj": "",
-                "realitni_kancelar": "",  # Prázdné, je pod hlavičkou
+                "realitni_kancelar": "",
                 "jmeno_maklere": seller_name,
                 "telefon": phone,
                 "email": email,
@@ -531,84 +470,86 @@ def scrape_agents_fast(
                 "rozlozeni_inzeratu": "",
             })
 
-        scraper._delay()
+        all_records.extend(company_records)
+        if checkpoint is not None and not failed:
+            expanded[company_id] = company_records
+            if checkpoint.due():
+                checkpoint.flush()
 
-    print(f"\n✅ Stahuji dokončeno")
+    print(f"\n✅ Stahování dokončeno")
+    if rosters is not None:
+        print(f"✅ Seznamy makléřů RK: {rosters.stats()} (přišlo {joined_total}, odešlo {left_total})")
 
     return all_records
 
 
-def save_to_excel_hierarchical(records, output_path):
-    """Uloží do Excelu s hierarchickým formátováním."""
+def scrape_agents_fast(
+    scraper,
+    category_main,
+    category_type,
+    locality_region_id,
+    max_pages,
+    full_scan,
+    checkpoint=None,
+    settings=None,
+    rosters=None,
+    saturation_pages=None,
+    saturation_new=1,
+    errors=None,
+):
+    """Super rychlý scraping pomocí company API (single combination)."""
+
+    return scrape_agents_fast_combined(
+        scraper,
+        [(category_main, category_type, locality_region_id)],
+        max_pages,
+        full_scan,
+        checkpoint=checkpoint,
+        settings=settings,
+        rosters=rosters,
+        saturation_pages=saturation_pages,
+        saturation_new=saturation_new,
+        errors=errors,
+    )
+
+
+def save_to_excel_hierarchical(records, output_path, fmt="xlsx"):
+    """Uloží do Excelu s hierarchickým formátováním.
+
+    Parquet/CSV/JSONL jsou pro další zpracování: zůstane v nich sloupec
+    typ_radku a jména makléřů bez odsazení.
+    """
     if not records:
         print("⚠️  Žádné záznamy")
         return
 
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    if fmt != "xlsx":
+        write_table(output_path, records, fmt)
+        print_hierarchy_stats(records, output_path)
+        return
 
-    # Odstraň typ_radku pro export
+    # Makléře odsaď pod jejich company
     export_records = []
     for rec in records:
-        export_rec = {k: v for k, v in rec.items() if k != "typ_radku"}
-        export_records.append(export_rec)
-
-    df = pd.DataFrame(export_records)
-    df.to_excel(output_path, index=False, engine="openpyxl")
-
-    # Formátování
-    wb = load_workbook(output_path)
-    ws = wb.active
-
-    # Barvy
-    company_fill = PatternFill(start_color="E8F4F8", end_color="E8F4F8", fill_type="solid")  # Světle modrá
-    company_font = Font(bold=True, size=12)
-
-    # Najdi sloupec profil_url
-    headers = [cell.value for cell in ws[1]]
-    profil_col = None
-    for idx, header in enumerate(headers, 1):
-        if header == "profil_url":
-            profil_col = idx
-            break
+        if rec.get("typ_radku") == "AGENT":
+            rec = {**rec, "jmeno_maklere": f"  → {rec.get('jmeno_maklere')}"}
+        export_records.append(rec)
 
-    # Formátuj řádky
-    for row_idx in range(2, ws.max_row + 1):
-        typ_radku = records[row_idx - 2].get("typ_radku")
-
-        if typ_radku == "COMPANY":
-            # Company řádek - zvýrazni
-            for col_idx in range(1, ws.max_column + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                cell.fill = company_fill
-                cell.font = company_font
-        elif typ_radku == "AGENT":
-            # Makléř - odsaď a přidej hyperlink
-            jmeno_cell = ws.cell(row=row_idx, column=headers.index("jmeno_maklere") + 1 if "jmeno_maklere" in headers else 4)
-            jmeno_cell.value = f"  → {jmeno_cell.value}"  # Odsazení
-
-            # Hyperlink
-            if profil_col:
-                cell = ws.cell(row=row_idx, column=profil_col)
-                url = cell.value
-                if url and isinstance(url, str) and url.startswith("http"):
-                    cell.hyperlink = url
-                    cell.value = "Profil makléře"
-                    cell.font = Font(color="0000FF", underline="single")
-
-    # Šířka sloupců
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-        ws.column_dimensions[column_letter].width = min(max_length + 2, 60)
-
-    wb.save(output_path)
+    # typ_radku se neexportuje, řídí jen formátování řádků
+    columns = [name for name in dict.fromkeys(k for rec in records for k in rec) if name != "typ_radku"]
+    write_table(
+        output_path,
+        export_records,
+        fmt,
+        columns=columns,
+        links={"profil_url": link(PROFILE_LABEL)},
+        row_style=lambda rec: "company" if rec.get("typ_radku") == "COMPANY" else None,
+    )
 
+    print_hierarchy_stats(records, output_path)
+
+
+def print_hierarchy_stats(records, output_path):
     # Spočítej statistiky
     companies_count = sum(1 for r in records if r.get("typ_radku") == "COMPANY")
     agents_count = sum(1 for r in records if r.get("typ_radku") == "AGENT")
@@ -715,9 +656,71 @@ def main():
     parser.add_argument("--max-pages", type=int, default=5, help="Max stránek [5]")
     parser.add_argument("--full-scan", action="store_true", help="Všechny stránky")
     parser.add_argument("-o", "--output", help="Výstupní soubor")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Formát výstupu - xlsx pro čtení, parquet/csv/jsonl pro další zpracování [podle přípony -o, jinak xlsx]")
+    parser.add_argument("--cache-dir", default="data/cache", help="Složka s cache odpovědí API [data/cache]")
+    parser.add_argument("--no-cache", action="store_true", help="Nepoužívat cache odpovědí API")
+    parser.add_argument("--cache-ttl", action="append", metavar="TYP=SEKUNDY",
+                        help="TTL cache pro typ endpointu (listing, estate, company), lze opakovat")
+    parser.add_argument("--checkpoint-dir", default="data/checkpoints", help="Složka se stavem běhů [data/checkpoints]")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Pokračovat v přerušeném běhu od posledního checkpointu")
+    parser.add_argument("--roster-dir", default="data/rosters", help="Složka s uloženými seznamy makléřů RK [data/rosters]")
+    parser.add_argument("--roster-max-age", type=float, default=7, metavar="DNY",
+                        help="Seznam makléřů RK mladší než tolik dní se znovu nestahuje [7]")
+    parser.add_argument("--no-roster", action="store_true", help="Vždy stáhnout seznamy makléřů všech RK")
+    parser.add_argument("--saturation", type=int, metavar="N",
+                        help="Ukončit kombinaci po N stránkách po sobě bez nových RK (stačí-li seznam RK)")
+    parser.add_argument("--saturation-new", type=int, default=1, metavar="K",
+                        help="Stránka je bez nových RK, přinese-li jich méně než K [1]")
+    parser.add_argument("--single-sweep", action="store_true",
+                        help="Jeden průchod výpisu na kraj bez filtru kategorií, rozdělení kombinací lokálně")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Počet procesů pro FÁZI 1 - kombinace (celá ČR po krajích) se rozdělí mezi ně; "
+                             "zrychlí jen práci na CPU, rychlost požadavků se mezi procesy dělí [1]")
 
     args = parser.parse_args()
 
+    try:
+        fmt = output_format(args.output, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = ResponseCache(args.cache_dir, ttls=parse_ttl_overrides(args.cache_ttl))
+        except ValueError as e:
+            parser.error(str(e))
+
+    rosters = None
+    if not args.no_roster:
+        rosters = RosterStore(args.roster_dir, max_age=args.roster_max_age * 24 * 60 * 60)
+
+    run_args = (
+        "prompt", "category_main", "category_type", "locality", "max_pages", "full_scan", "workers",
+        "saturation", "saturation_new", "single_sweep",
+    )
+    if args.resume:
+        try:
+            checkpoint = Checkpoint.resume(args.checkpoint_dir, args.resume)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        # Pokračuj se stejnými parametry jako přerušený běh
+        vars(args).update(checkpoint.params["args"])
+    else:
+        checkpoint = Checkpoint.create(
+            args.checkpoint_dir,
+            params={"args": {name: getattr(args, name) for name in run_args}},
+        )
+
+    # Každý proces si otevře vlastní cache a dostane díl rychlosti požadavků.
+    # Sestaví se až po obnovení parametrů přerušeného běhu (--workers).
+    settings = ShardSettings(
+        workers=args.workers,
+        cache_dir=None if cache is None else args.cache_dir,
+        cache_ttls=dict(cache.ttls) if cache is not None else {},
+    )
+
     print("="*80)
     print("🚀 SUPER RYCHLÝ SCRAPER MAKLÉŘŮ (s company API)")
     print("="*80)
@@ -732,12 +735,14 @@ def main():
         22: "Zlínský", 23: "Moravskoslezský"
     }
 
+    errors = []
     try:
-        scraper = SrealityScraper()
+        scraper = SrealityScraper(cache=cache)
 
         if args.prompt:
-            # Interaktivní mód
-            params = prompt_for_params()
+            # Interaktivní mód (při pokračování s uloženými odpověďmi)
+            params = checkpoint.params.get("prompt") or prompt_for_params()
+            checkpoint.params["prompt"] = params
 
             # Vytvoř VŠECHNY kombinace najednou (pro deduplikaci!)
             combinations = []
@@ -763,6 +768,13 @@ def main():
                 combinations,
                 params["max_pages"],
                 params["full_scan"],
+                checkpoint=checkpoint,
+                settings=settings,
+                rosters=rosters,
+                saturation_pages=args.saturation,
+                saturation_new=args.saturation_new,
+                single_sweep=args.single_sweep,
+                errors=errors,
             )
 
         else:
@@ -781,22 +793,44 @@ def main():
                 args.locality,
                 args.max_pages,
                 args.full_scan,
+                checkpoint=checkpoint,
+                settings=settings,
+                rosters=rosters,
+                saturation_pages=args.saturation,
+                saturation_new=args.saturation_new,
+                errors=errors,
             )
 
         if final_records:
-            output = args.output or f"data/makleri_fast_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            save_to_excel_hierarchical(final_records, output)
+            output = with_format(args.output, fmt) if args.output else f"data/makleri_fast_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+            save_to_excel_hierarchical(final_records, output, fmt)
         else:
             print("⚠️  Žádná data")
 
     except KeyboardInterrupt:
         print("\n⚠️  Přerušeno")
+        print(f"💾 Checkpoint: {checkpoint.run_id} (pokračování: --resume {checkpoint.run_id})")
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ Chyba: {e}")
         import traceback
         traceback.print_exc()
+        print(f"💾 Checkpoint: {checkpoint.run_id} (pokračování: --resume {checkpoint.run_id})")
         sys.exit(1)
+    finally:
+        checkpoint.flush()
+        if rosters is not None:
+            rosters.close()
+
+    # Doběhnutý běh už není co obnovovat - checkpoint zůstává jen po chybách
+    if errors:
+        print(f"\n💾 Část dat se nepodařilo stáhnout, checkpoint zůstává: --resume {checkpoint.run_id}")
+    else:
+        checkpoint.discard()
+
+    if cache is not None:
+        print(f"\n💾 Cache odpovědí: {cache.stats()}")
+    print(f"🔁 Sdílené požadavky: {scraper._flights.stats()}")
 
     print("\n" + "="*80)
     print("✅ Hotovo!")
@@ -14,19 +14,23 @@ Výstup:
 """
 
 import argparse
+import functools
 import sys
 import re
+import threading
 import unicodedata
 from datetime import datetime
-from pathlib import Path
 from collections import defaultdict
 
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font
-from openpyxl.utils import get_column_letter
-
-from scrapers.sreality import SrealityScraper
+from scrapers.cache import ResponseCache, parse_ttl_overrides
+from scrapers.checkpoint import Checkpoint, section_key
+from scrapers.delta import DeltaSweep, ListingIndex, SellerIndex
+from scrapers.export import FORMATS, PROFILE_LABEL, link, output_format, with_format, write_table
+from scrapers.pipeline import stream
+from scrapers.roster import fetch_company_sellers
+from scrapers.sharding import ShardSettings, expand_regions, run_shards
+from scrapers.singleflight import SingleFlight
+from scrapers.sreality import SrealityScraper, estate_category, sweep_combinations
 
 
 def slugify_company_name(name):
@@ -47,6 +51,127 @@ def slugify_company_name(name):
     return ascii_value or "company"
 
 
+# Údaje makléře, které se berou z jeho prvního inzerátu
+AGENT_FIELDS = ("user_id", "jmeno", "telefon", "email", "company", "company_id", "kraj", "mesto")
+
+
+def detail_seller(detail):
+    """Makléř z detailu inzerátu - user_id, jméno, telefon, email ({} bez user_id)."""
+    embedded = detail.get("_embedded", {})
+
+    # Získej seller/broker
+    seller = embedded.get("seller", {})
+    broker = embedded.get("broker", {})
+
+    # Získej user_id makléře
+    user_id = (
+        seller.get("user_id")
+        or seller.get("id")
+        or broker.get("user_id")
+        or broker.get("id")
+    )
+    if not user_id:
+        return {}
+
+    result = {
+        "user_id": str(user_id),
+        # Jméno makléře
+        "jmeno": (
+            seller.get("user_name")
+            or seller.get("name")
+            or broker.get("user_name")
+            or broker.get("name")
+            or "Neznámý makléř"
+        ),
+        "telefon": None,
+        "email": None,
+    }
+
+    # Telefon
+    phones = embedded.get("phones", [])
+    if phones and isinstance(phones, list):
+        for phone in phones:
+            if isinstance(phone, dict):
+                result["telefon"] = phone.get("number") or phone.get("value")
+                if result["telefon"]:
+                    break
+            elif isinstance(phone, str):
+                result["telefon"] = phone
+                break
+
+    # Email
+    emails = embedded.get("emails", [])
+    if emails and isinstance(emails, list):
+        for email in emails:
+            if isinstance(email, dict):
+                result["email"] = email.get("value") or email.get("email")
+                if result["email"]:
+                    break
+            elif isinstance(email, str):
+                result["email"] = email
+                break
+
+    return result
+
+
+def roster_contact(seller):
+    """Makléř ze seznamu makléřů company ve stejném tvaru jako detail_seller."""
+    phone = None
+    for item in seller.get("phones") or []:
+        if isinstance(item, dict):
+            phone = item.get("number") or item.get("value")
+        elif isinstance(item, str):
+            phone = item
+        if phone:
+            break
+
+    return {
+        "user_id": str(seller.get("id") or seller.get("user_id")),
+        "jmeno": seller.get("name") or seller.get("user_name") or "Neznámý makléř",
+        "telefon": phone,
+        "email": seller.get("email") or None,
+    }
+
+
+def listing_contribution(estate_info, seller):
+    """Makléř a kategorie jednoho inzerátu (None bez user_id makléře)."""
+    if not seller.get("user_id"):
+        return None
+
+    contribution = {
+        **seller,
+        # Company
+        "company": estate_info.get("company_name"),
+        "company_id": estate_info.get("company_id"),
+        "kraj": None,
+        "mesto": None,
+        "category_main": estate_info["category_main"],
+        "category_type": estate_info["category_type"],
+    }
+
+    # Lokalita
+    locality = estate_info.get("locality", "")
+    if locality:
+        parts = [p.strip() for p in locality.split(",")]
+        if parts:
+            contribution["mesto"] = parts[0]
+            if len(parts) > 1:
+                contribution["kraj"] = parts[-1]
+
+    return contribution
+
+
+def combination_key(category_main, category_type, locality, categories=None):
+    """Klíč kombinace v checkpointu a v indexu inzerátů.
+
+    Výběr kategorií jednoho průchodu (--single-sweep) je součástí klíče -
+    jiný výběr má vlastní stav, takže se index nepromíchá a nesmažou se
+    inzeráty, které jen vypadly z výběru.
+    """
+    selection = [f"{main}/{type_}" for main, type_ in sorted(categories)] if categories else []
+    return section_key("simple", category_main, category_type, locality, *selection)
+
+
 def scrape_agents_simple(
     scraper,
     category_main,
@@ -54,89 +179,153 @@ def scrape_agents_simple(
     locality_region_id,
     max_pages,
     full_scan,
+    checkpoint=None,
+    index=None,
+    categories=None,
+    sellers=None,
+    company_rosters=False,
+    errors=None,
 ):
-    """Optimalizovaný scraping - agregace podle user_id + detail jen pro makléře bez kontaktů."""
+    """Optimalizovaný scraping - agregace podle user_id + detail jen pro makléře bez kontaktů.
 
-    print(f"🔍 Scraping inzerátů pro získání makléřů...")
+    S checkpointem se průběžně ukládá poslední stránka, zpracované hash_id
+    a rozpracovaní makléři; při pokračování se hotová práce nestahuje znovu.
 
-    if full_scan:
-        max_pages = None
-
-    limit = max_pages if max_pages is not None else None
-
-    # Agregace dat - ukládáme VŠECHNY inzeráty s jejich hash_id
-    # Musíme stáhnout detail každého inzerátu, abychom našli user_id makléře
-    estates_list = []  # Seznam všech inzerátů pro zpracování
-
-    page = 1
-    total_listings = 0
-
-    # FÁZE 1: Projdi inzeráty a agreguj podle user_id
-    while True:
-        if limit is not None and page > limit:
-            break
-
-        params = {
-            "category_main_cb": category_main,
-            "category_type_cb": category_type,
-            "page": page,
-            "per_page": 60,
-        }
+    S indexem (ListingIndex) je běh přírůstkový: výpis se prochází od
+    nejnovějších, detail se stahuje jen pro nové a změněné inzeráty, po řadě
+    známých inzerátů se stránkování ukončí a makléři se spočítají z indexu.
 
-        if locality_region_id is not None:
-            params["locality_region_id"] = locality_region_id
+    S category_main = category_type = None a množinou categories se výpis
+    projde jednou bez filtru kategorií a započítají se jen inzeráty
+    vybraných dvojic (kategorie, typ).
 
-        payload = scraper._request(scraper._config.api_url, params=params)
-        if not payload:
-            print(f"⚠️  Chyba při stahování stránky {page}")
-            break
-
-        estates = payload.get("_embedded", {}).get("estates", [])
-        if not estates:
-            break
+    S indexem prodejců (SellerIndex) se detail stahuje jen pro inzeráty,
+    jejichž makléře index ještě nezná; ostatní se započítají bez API volání.
 
-        print(f"   Stránka {page}: {len(estates)} inzerátů")
+    S company_rosters se kontakty berou ze seznamů makléřů RK (jeden na
+    company, stažený jednou) spárovaných přes user_id prodejce z výpisu.
+    Detail se stahuje jen pro inzeráty, jejichž makléře seznam nezná, a to
+    jednou na makléře.
 
-        # Uložíme všechny inzeráty pro pozdější zpracování
-        for estate in estates:
-            total_listings += 1
+    Do seznamu errors se zapíše stránka výpisu, kterou se nepodařilo stáhnout.
+    """
 
-            hash_id = estate.get("hash_id")
-            if not hash_id:
-                continue
+    state = {}
+    if checkpoint is not None:
+        state = checkpoint.section(combination_key(category_main, category_type, locality_region_id, categories))
+        if "records" in state:
+            print(f"♻️  Kombinace je podle checkpointu hotová ({len(state['records'])} makléřů)")
+            return state["records"]
 
-            embedded = estate.get("_embedded", {})
-            company = embedded.get("company", {})
-
-            # Uložíme základní info o inzerátu
-            seo = estate.get("seo", {}) if isinstance(estate.get("seo"), dict) else {}
-            locality = estate.get("locality", "")
+    print(f"🔍 Scraping inzerátů pro získání makléřů...")
 
-            estates_list.append({
-                "hash_id": hash_id,
-                "company_name": company.get("name") if company else None,
-                "company_id": company.get("id") if company else None,
-                "category_main": seo.get("category_main_cb") or category_main,
-                "category_type": seo.get("category_type_cb") or category_type,
-                "locality": locality,
-            })
+    if full_scan:
+        max_pages = None
 
-        # Kontrola konce
-        result_size = payload.get("result_size", 0)
-        if (page * 60) >= result_size:
-            break
+    limit = max_pages if max_pages is not None else None
 
-        page += 1
-        scraper._delay()
+    params = {"per_page": 60}
+    if category_main is not None:
+        params["category_main_cb"] = category_main
+    if category_type is not None:
+        params["category_type_cb"] = category_type
+
+    if locality_region_id is not None:
+        params["locality_region_id"] = locality_region_id
+
+    sweep = None
+    if index is not None:
+        params.update(scraper._config.newest_first)
+        scope = combination_key(category_main, category_type, locality_region_id, categories)
+        sweep = DeltaSweep(
+            index, scope,
+            known_run=scraper._config.incremental_known_run,
+            full_every=scraper._config.incremental_full_sweep_days * 24 * 60 * 60,
+        )
 
-    print(f"\n✅ Zpracováno {total_listings} inzerátů")
+    # Detail inzerátu je potřeba jen kvůli makléři (user_id, kontakty) - známé
+    # inzeráty z indexu prodejců se nestahují.
+    # Stránky výpisu, stahování detailů a agregace běží souběžně: producent
+    # posílá inzeráty z výpisu, workery stahují detaily a smyčka níže je
+    # průběžně přičítá makléřům.
+    total_listings = 0
+    listing_failed = False
+    listing_complete = False
+    processed = set(state.get("processed", []))
+
+    def listing_estates():
+        nonlocal total_listings, listing_failed, listing_complete
+        # Rozpracovanou stránku stáhni znovu, hotové inzeráty se přeskočí
+        pages = scraper._paginate(scraper._config.api_url, params, max_pages=limit, start_page=state.get("page", 1))
+        for page, payload in pages:
+            estates = payload.get("_embedded", {}).get("estates", [])
+            if not estates:
+                break
+
+            print(f"   Stránka {page}: {len(estates)} inzerátů")
+            total_listings += len(estates)
+
+            if categories is not None:
+                # Průchod bez filtru - inzeráty se rozdělí podle kategorie lokálně
+                estates = [estate for estate in estates if estate_category(estate) in categories]
+
+            changed = set()
+            if sweep is not None:
+                estates = sweep.select(estates)
+                # Detail změněného inzerátu se stahuje mimo cache odpovědí
+                changed = sweep.changed_ids(estates)
+
+            known = {}
+            if sellers is not None:
+                known = sellers.lookup(estate["hash_id"] for estate in estates if estate.get("hash_id"))
+
+            for estate in estates:
+                hash_id = estate.get("hash_id")
+                if not hash_id or hash_id in processed:
+                    continue
 
-    # FÁZE 2: Stáhnout detaily VŠECH inzerátů a agregovat podle user_id (správně!)
-    print(f"\n🔍 Stahuji detaily všech inzerátů pro nalezení všech makléřů...")
-    print(f"   (Toto může chvíli trvat - {len(estates_list)} inzerátů × 1-2 sekundy)")
+                embedded = estate.get("_embedded", {})
+                company = embedded.get("company", {})
+
+                # Základní info o inzerátu
+                cat_main, cat_type = estate_category(estate, category_main, category_type)
+                locality = estate.get("locality", "")
+
+                # Jiný makléř ve výpisu než v indexu - inzerát převzal někdo
+                # jiný a detail v cache odpovědí může mít ještě původního
+                seller = known.get(str(hash_id))
+                listed = (embedded.get("seller") or {}).get("user_id")
+                listed = str(listed) if listed else None
+                reassigned = seller is not None and listed is not None and listed != seller.get("user_id")
+                if reassigned:
+                    seller = None
+
+                yield {
+                    "page": page,
+                    "hash_id": hash_id,
+                    "company_name": company.get("name") if company else None,
+                    "company_id": company.get("id") if company else None,
+                    "category_main": cat_main,
+                    "category_type": cat_type,
+                    "locality": locality,
+                    "seller": seller,
+                    "listed_user_id": listed,
+                    "fresh": reassigned or str(hash_id) in changed,
+                }
+
+            if sweep is not None and sweep.stopped:
+                print(f"   Zbytek výpisu je beze změny")
+                return
+
+        if pages.failed_page is not None:
+            listing_failed = True
+            print(f"⚠️  Chyba při stahování stránky {pages.failed_page}")
+            if errors is not None:
+                errors.append(f"Chyba při stahování stránky {pages.failed_page} (kraj {locality_region_id or 'celá ČR'})")
+        else:
+            listing_complete = limit is None or (pages.total_pages or 0) <= limit
 
-    # Optimalizace: Cachujeme user_id podle hash_id pro rychlejší lookup
-    hash_to_user = {}  # hash_id -> user_id mapping
+    print(f"   (Detaily se stahují průběžně, {scraper._config.concurrency} souběžně)")
 
     agents = defaultdict(lambda: {
         "user_id": None,
@@ -151,98 +340,126 @@ def scrape_agents_simple(
         "total_count": 0,
     })
 
-    for idx, estate_info in enumerate(estates_list, 1):
-        hash_id = estate_info["hash_id"]
-
-        # Stáhni detail inzerátu
-        detail_url = f"{scraper._config.base_url}/api/cs/v2/estates/{hash_id}"
-        detail = scraper._request(detail_url)
+    # Makléři rozpracovaní v checkpointu (klíče rozložení jsou "kategorie/typ")
+    for user_id, saved in state.get("agents", {}).items():
+        agent = agents[user_id]
+        agent.update(saved)
+        agent["inzeraty_breakdown"] = defaultdict(int, {
+            tuple(int(part) for part in key.split("/")): count
+            for key, count in saved["inzeraty_breakdown"].items()
+        })
 
-        if detail:
-            embedded = detail.get("_embedded", {})
+    last_page = state.get("page", 1)
+
+    def save_state():
+        state["page"] = last_page
+        state["processed"] = list(processed)
+        state["agents"] = {
+            user_id: {
+                **agent,
+                "inzeraty_breakdown": {f"{cat}/{typ}": count for (cat, typ), count in agent["inzeraty_breakdown"].items()},
+            }
+            for user_id, agent in agents.items()
+        }
+        checkpoint.flush()
+
+    def add(contribution):
+        agent = agents[contribution["user_id"]]
+
+        # První výskyt - ulož základní info
+        if agent["user_id"] is None:
+            agent.update({name: contribution[name] for name in AGENT_FIELDS})
+
+        # Spočítej inzerát pro tohoto makléře
+        key = (contribution["category_main"], contribution["category_type"])
+        agent["inzeraty_breakdown"][key] += 1
+        agent["total_count"] += 1
+
+    # Seznamy makléřů RK (company_id -> {user_id: kontakt}) a makléři
+    # dohledaní z detailu (user_id -> kontakt), každý jen jednou za běh
+    rosters = SingleFlight()
+    agent_details = SingleFlight()
+    detail_calls = 0
+    detail_lock = threading.Lock()
+
+    def company_roster(company_id):
+        # I seznam, který se nestáhl celý, se drží (případně prázdný) -
+        # jinak by každý další inzerát RK stahoval seznam znovu. Makléři
+        # mimo něj se dohledají z detailu.
+        company_sellers, page, failed = fetch_company_sellers(scraper, company_id)
+        if failed:
+            print(f"   ⚠️  Seznam makléřů RK {company_id} skončil chybou na stránce {page}")
+        contacts = (roster_contact(seller) for seller in company_sellers)
+        return {contact["user_id"]: contact for contact in contacts}
+
+    def fetch_seller(estate_info):
+        nonlocal detail_calls
+        with detail_lock:
+            detail_calls += 1
+        detail = scraper._fetch_estate(estate_info["hash_id"], fresh=estate_info["fresh"])
+        return detail_seller(detail) if detail else None
+
+    def lookup_seller(estate_info):
+        listed = estate_info["listed_user_id"]
+        if not company_rosters or not listed:
+            return fetch_seller(estate_info)
+        company_id = estate_info["company_id"]
+        if company_id:
+            roster = rosters.do(str(company_id), lambda: company_roster(company_id))
+            if roster and listed in roster:
+                return roster[listed]
+        # Makléř mimo seznam RK - detail stačí jeden za makléře
+        return agent_details.do(listed, lambda: fetch_seller(estate_info))
+
+    def resolve(estate_info):
+        """Makléř inzerátu - z indexu prodejců, seznamu RK nebo detailu (None při chybě)."""
+        if estate_info["seller"] is not None:
+            return estate_info["seller"]
+        seller = lookup_seller(estate_info)
+        if seller is not None and sellers is not None:
+            # I inzerát bez makléře se uloží, aby se příště nestahoval
+            sellers.put(estate_info["hash_id"], seller)
+        return seller
+
+    details = stream(listing_estates(), resolve, workers=scraper._config.concurrency)
+
+    idx = 0
+    indexed = 0
+    for idx, (estate_info, seller) in enumerate(details, 1):
+        hash_id = estate_info["hash_id"]
+        last_page = estate_info["page"]
+        if estate_info["seller"] is not None:
+            indexed += 1
 
-            # Získej seller/broker
-            seller = embedded.get("seller", {})
-            broker = embedded.get("broker", {})
+        if checkpoint is not None and checkpoint.due():
+            save_state()
 
-            # Získej user_id makléře
-            user_id = (
-                seller.get("user_id")
-                or seller.get("id")
-                or broker.get("user_id")
-                or broker.get("id")
-            )
+        if seller is not None:
+            processed.add(hash_id)
+            contribution = listing_contribution(estate_info, seller)
 
-            if user_id:
-                user_id = str(user_id)
-                hash_to_user[hash_id] = user_id
-                agent = agents[user_id]
-
-                # První výskyt - ulož základní info
-                if agent["user_id"] is None:
-                    agent["user_id"] = user_id
-
-                    # Jméno makléře
-                    agent["jmeno"] = (
-                        seller.get("user_name")
-                        or seller.get("name")
-                        or broker.get("user_name")
-                        or broker.get("name")
-                        or "Neznámý makléř"
-                    )
-
-                    # Company
-                    agent["company"] = estate_info.get("company_name")
-                    agent["company_id"] = estate_info.get("company_id")
-
-                    # Telefon
-                    phones = embedded.get("phones", [])
-                    if phones and isinstance(phones, list):
-                        for phone in phones:
-                            if isinstance(phone, dict):
-                                agent["telefon"] = phone.get("number") or phone.get("value")
-                                if agent["telefon"]:
-                                    break
-                            elif isinstance(phone, str):
-                                agent["telefon"] = phone
-                                break
-
-                    # Email
-                    emails = embedded.get("emails", [])
-                    if emails and isinstance(emails, list):
-                        for email in emails:
-                            if isinstance(email, dict):
-                                agent["email"] = email.get("value") or email.get("email")
-                                if agent["email"]:
-                                    break
-                            elif isinstance(email, str):
-                                agent["email"] = email
-                                break
-
-                    # Lokalita
-                    locality = estate_info.get("locality", "")
-                    if locality:
-                        parts = [p.strip() for p in locality.split(",")]
-                        if parts:
-                            agent["mesto"] = parts[0]
-                            if len(parts) > 1:
-                                agent["kraj"] = parts[-1]
-
-                # Spočítej inzerát pro tohoto makléře
-                key = (estate_info["category_main"], estate_info["category_type"])
-                agent["inzeraty_breakdown"][key] += 1
-                agent["total_count"] += 1
-
-            # Kratší delay - balancujeme rychlost vs. Cloudflare
-            # Místo random 1-3s používáme 0.5-1.5s
-            import time
-            import random
-            time.sleep(random.uniform(0.5, 1.5))
+            if sweep is not None:
+                # I inzerát bez makléře se uloží, aby se příště nestahoval
+                sweep.store(hash_id, contribution or {})
+            elif contribution:
+                add(contribution)
 
             if idx % 10 == 0:
-                print(f"   Zpracováno {idx}/{len(estates_list)}... (nalezeno {len(agents)} unikátních makléřů)")
+                print(f"   Zpracováno {idx} detailů... (nalezeno {len(agents)} unikátních makléřů)")
+
+    if sweep is not None:
+        # Makléři celého výřezu - čerstvé inzeráty i ty beze změny z indexu
+        for contribution in sweep.finish(complete=listing_complete):
+            if contribution:
+                add(contribution)
+        print(f"\n✅ Přírůstkový běh: {sweep.stats()}")
 
-    print(f"\n✅ Detaily získány")
+    print(f"\n✅ Zpracováno {total_listings} inzerátů")
+    print(f"✅ Detaily získány ({detail_calls})")
+    if company_rosters:
+        print(f"✅ Seznamy makléřů RK ({rosters.misses})")
+    if sellers is not None:
+        print(f"✅ Makléři z indexu prodejců ({indexed} inzerátů bez stahování detailu)")
     print(f"✅ Nalezeno {len(agents)} unikátních makléřů")
 
     # Převeď na finální formát
@@ -285,9 +502,85 @@ def scrape_agents_simple(
             "rozlozeni_inzeratu": rozlozeni,
         })
 
+    if checkpoint is not None:
+        if listing_failed:
+            save_state()
+        else:
+            state.clear()
+            state["records"] = final_records
+            checkpoint.flush()
+
     return final_records
 
 
+def scrape_shard(
+    shard, settings, max_pages=None, full_scan=False, index_dir=None, categories=None, seller_dir=None,
+    company_rosters=False,
+):
+    """Jeden shard (kategorie, typ, kraj) ve worker procesu s vlastním scraperem.
+
+    Vrací (záznamy, chyby).
+    """
+    errors = []
+    index = ListingIndex(index_dir) if index_dir else None
+    sellers = SellerIndex(seller_dir) if seller_dir else None
+    try:
+        category_main, category_type, locality = shard
+        with settings.scraper() as scraper:
+            records = scrape_agents_simple(
+                scraper, category_main, category_type, locality, max_pages, full_scan,
+                index=index, categories=categories, sellers=sellers, company_rosters=company_rosters,
+                errors=errors,
+            )
+        return records, errors
+    finally:
+        if index is not None:
+            index.close()
+        if sellers is not None:
+            sellers.close()
+
+
+def scrape_sharded(
+    combinations, max_pages, full_scan, settings, checkpoint=None, index_dir=None, categories=None, seller_dir=None,
+    company_rosters=False, errors=None,
+):
+    """Rozdělí kombinace (celou ČR po krajích) mezi procesy a spojí výsledky.
+
+    Záznamy se skládají v pořadí shardů, takže výsledek nezávisí na tom,
+    který proces doběhl dřív. Shardy hotové bez chyby se ukládají do
+    checkpointu, chyby ostatních se přidají do seznamu errors.
+    """
+    shards = expand_regions(combinations)
+
+    done = {}
+    if checkpoint is not None:
+        for shard in shards:
+            state = checkpoint.section(combination_key(*shard, categories))
+            if "records" in state:
+                done[shard] = state["records"]
+    todo = [shard for shard in shards if shard not in done]
+
+    print(f"🧩 {len(shards)} shardů, {min(settings.workers, len(todo) or 1)} procesů"
+          + (f" ({len(done)} hotových podle checkpointu)" if done else ""))
+
+    task = functools.partial(
+        scrape_shard, max_pages=max_pages, full_scan=full_scan, index_dir=index_dir, categories=categories,
+        seller_dir=seller_dir, company_rosters=company_rosters,
+    )
+    for position, (shard, (records, shard_errors)) in enumerate(run_shards(task, todo, settings), 1):
+        print(f"   ✓ Shard {position}/{len(todo)} {shard}: {len(records)} makléřů")
+        for error in shard_errors:
+            print(f"   ⚠️  {error}")
+        done[shard] = records
+        if errors is not None:
+            errors.extend(shard_errors)
+        if checkpoint is not None and not shard_errors:
+            checkpoint.section(combination_key(*shard, categories))["records"] = records
+            checkpoint.flush()
+
+    return [record for shard in shards for record in done[shard]]
+
+
 def prompt_for_params():
     """Interaktivní výběr parametrů s podporou multiple selection."""
     print("\n" + "="*80)
@@ -366,57 +659,18 @@ def prompt_for_params():
     }
 
 
-def save_to_excel(records, output_path):
-    """Uloží do Excelu s formátováním."""
+def save_to_excel(records, output_path, fmt="xlsx"):
+    """Uloží do Excelu s formátováním (nebo do parquet/csv/jsonl bez formátování)."""
     if not records:
         print("⚠️  Žádné záznamy")
         return
 
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-
-    df = pd.DataFrame(records)
-    df = df.sort_values(by="pocet_inzeratu", ascending=False)
-    df.to_excel(output_path, index=False, engine="openpyxl")
-
-    # Formátování
-    wb = load_workbook(output_path)
-    ws = wb.active
-
-    # Hyperlinky
-    headers = [cell.value for cell in ws[1]]
-    profil_col = None
-    for idx, header in enumerate(headers, 1):
-        if header == "profil_url":
-            profil_col = idx
-            break
-
-    if profil_col:
-        for row_idx in range(2, ws.max_row + 1):
-            cell = ws.cell(row=row_idx, column=profil_col)
-            url = cell.value
-            if url and isinstance(url, str) and url.startswith("http"):
-                cell.hyperlink = url
-                cell.value = "Profil makléře"
-                cell.font = Font(color="0000FF", underline="single")
-
-    # Šířka sloupců
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-        ws.column_dimensions[column_letter].width = min(max_length + 2, 60)
-
-    wb.save(output_path)
+    records = sorted(records, key=lambda record: record.get("pocet_inzeratu") or 0, reverse=True)
+    write_table(output_path, records, fmt, links={"profil_url": link(PROFILE_LABEL)})
 
     print(f"\n✅ Uloženo do: {output_path}")
-    print(f"📊 Celkem makléřů: {len(df)}")
-    if "pocet_inzeratu" in df.columns:
-        print(f"🏠 Celkem inzerátů: {df['pocet_inzeratu'].sum()}")
+    print(f"📊 Celkem makléřů: {len(records)}")
+    print(f"🏠 Celkem inzerátů: {sum(record.get('pocet_inzeratu') or 0 for record in records)}")
 
 
 def merge_agents(all_records):
@@ -497,9 +751,66 @@ def main():
     parser.add_argument("--max-pages", type=int, default=5, help="Max stránek [5]")
     parser.add_argument("--full-scan", action="store_true", help="Všechny stránky")
     parser.add_argument("-o", "--output", help="Výstupní soubor")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Formát výstupu - xlsx pro čtení, parquet/csv/jsonl pro další zpracování [podle přípony -o, jinak xlsx]")
+    parser.add_argument("--cache-dir", default="data/cache", help="Složka s cache odpovědí API [data/cache]")
+    parser.add_argument("--no-cache", action="store_true", help="Nepoužívat cache odpovědí API")
+    parser.add_argument("--cache-ttl", action="append", metavar="TYP=SEKUNDY",
+                        help="TTL cache pro typ endpointu (listing, estate, company), lze opakovat")
+    parser.add_argument("--checkpoint-dir", default="data/checkpoints", help="Složka se stavem běhů [data/checkpoints]")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Pokračovat v přerušeném běhu od posledního checkpointu")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Přírůstkový běh - detaily jen pro nové a změněné inzeráty od minulého běhu")
+    parser.add_argument("--index-dir", default="data/index",
+                        help="Složka s indexem inzerátů (--incremental) a indexem prodejců [data/index]")
+    parser.add_argument("--no-seller-index", action="store_true",
+                        help="Nepoužívat index prodejců - stáhnout detail každého inzerátu")
+    parser.add_argument("--company-rosters", action="store_true",
+                        help="Kontakty makléřů ze seznamů makléřů RK, detail jen pro makléře mimo seznam")
+    parser.add_argument("--single-sweep", action="store_true",
+                        help="Při výběru více kategorií projít výpis jednou na kraj a rozdělit inzeráty lokálně")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Počet procesů - kombinace (celá ČR po krajích) se rozdělí mezi ně; "
+                             "zrychlí jen práci na CPU, rychlost požadavků se mezi procesy dělí [1]")
 
     args = parser.parse_args()
 
+    try:
+        fmt = output_format(args.output, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = ResponseCache(args.cache_dir, ttls=parse_ttl_overrides(args.cache_ttl))
+        except ValueError as e:
+            parser.error(str(e))
+
+    run_args = ("prompt", "category_main", "category_type", "locality", "max_pages", "full_scan", "incremental", "workers", "single_sweep", "company_rosters")
+    if args.resume:
+        try:
+            checkpoint = Checkpoint.resume(args.checkpoint_dir, args.resume)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        # Pokračuj se stejnými parametry jako přerušený běh
+        vars(args).update(checkpoint.params["args"])
+    else:
+        checkpoint = Checkpoint.create(
+            args.checkpoint_dir,
+            params={"args": {name: getattr(args, name) for name in run_args}},
+        )
+
+    # Každý proces si otevře vlastní cache a dostane díl rychlosti požadavků.
+    # Sestaví se až po obnovení parametrů přerušeného běhu (--workers, --incremental).
+    settings = ShardSettings(
+        workers=args.workers,
+        cache_dir=None if cache is None else args.cache_dir,
+        cache_ttls=dict(cache.ttls) if cache is not None else {},
+    )
+    index_dir = args.index_dir if args.incremental else None
+    seller_dir = None if args.no_seller_index else args.index_dir
+
     print("="*80)
     print("🚀 RYCHLÝ SCRAPER MAKLÉŘŮ (optimalizovaný)")
     print("="*80)
@@ -514,37 +825,66 @@ def main():
         22: "Zlínský", 23: "Moravskoslezský"
     }
 
+    index = ListingIndex(args.index_dir) if args.incremental else None
+    sellers = SellerIndex(seller_dir) if seller_dir else None
+    errors = []
+
     try:
-        scraper = SrealityScraper()
+        scraper = SrealityScraper(cache=cache)
 
         if args.prompt:
-            # Interaktivní mód
-            params = prompt_for_params()
+            # Interaktivní mód (při pokračování s uloženými odpověďmi)
+            params = checkpoint.params.get("prompt") or prompt_for_params()
+            checkpoint.params["prompt"] = params
 
             # Vytvoř kombinace parametrů
             all_records = []
-
-            for category_main in params["category_main_list"]:
-                for category_type in params["category_type_list"]:
-                    localities = params["locality_list"] or [None]
-
-                    for locality in localities:
-                        print("\n" + "="*80)
+            combinations = [
+                (category_main, category_type, locality)
+                for category_main in params["category_main_list"]
+                for category_type in params["category_type_list"]
+                for locality in params["locality_list"] or [None]
+            ]
+
+            categories = None
+            if args.single_sweep:
+                # Jeden průchod na kraj, kombinace kategorií se rozdělí lokálně
+                combinations, categories = sweep_combinations(combinations)
+
+            if args.workers > 1:
+                all_records = scrape_sharded(
+                    combinations, params["max_pages"], params["full_scan"], settings, checkpoint, index_dir,
+                    categories=categories, seller_dir=seller_dir, company_rosters=args.company_rosters,
+                    errors=errors,
+                )
+
+            else:
+                for category_main, category_type, locality in combinations:
+                    print("\n" + "="*80)
+                    if category_main is None:
+                        print(f"🔍 Scraping: všechny vybrané kategorie ({len(categories)} kombinací) jedním průchodem")
+                    else:
                         print(f"🔍 Scraping: {category_names.get(category_main)} / {type_names.get(category_type)}")
-                        if locality:
-                            print(f"   Kraj: {region_names.get(locality)}")
-                        print("="*80)
-
-                        records = scrape_agents_simple(
-                            scraper,
-                            category_main,
-                            category_type,
-                            locality,
-                            params["max_pages"],
-                            params["full_scan"],
-                        )
+                    if locality:
+                        print(f"   Kraj: {region_names.get(locality)}")
+                    print("="*80)
+
+                    records = scrape_agents_simple(
+                        scraper,
+                        category_main,
+                        category_type,
+                        locality,
+                        params["max_pages"],
+                        params["full_scan"],
+                        checkpoint=checkpoint,
+                        index=index,
+                        categories=categories,
+                        sellers=sellers,
+                        company_rosters=args.company_rosters,
+                        errors=errors,
+                    )
 
-                        all_records.extend(records)
+                    all_records.extend(records)
 
             # Slouč duplicity
             print("\n" + "="*80)
@@ -562,29 +902,63 @@ def main():
             print(f"   • Stránek: {'VŠECHNY' if args.full_scan else args.max_pages}")
             print()
 
-            final_records = scrape_agents_simple(
-                scraper,
-                args.category_main,
-                args.category_type,
-                args.locality,
-                args.max_pages,
-                args.full_scan,
-            )
+            if args.workers > 1:
+                all_records = scrape_sharded(
+                    [(args.category_main, args.category_type, args.locality)],
+                    args.max_pages, args.full_scan, settings, checkpoint, index_dir,
+                    seller_dir=seller_dir, company_rosters=args.company_rosters, errors=errors,
+                )
+                final_records = merge_agents(all_records)
+                print(f"✅ Sloučeno z {len(all_records)} záznamů na {len(final_records)} unikátních makléřů")
+            else:
+                final_records = scrape_agents_simple(
+                    scraper,
+                    args.category_main,
+                    args.category_type,
+                    args.locality,
+                    args.max_pages,
+                    args.full_scan,
+                    checkpoint=checkpoint,
+                    index=index,
+                    sellers=sellers,
+                    company_rosters=args.company_rosters,
+                    errors=errors,
+                )
 
         if final_records:
-            output = args.output or f"data/makleri_simple_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            save_to_excel(final_records, output)
+            output = with_format(args.output, fmt) if args.output else f"data/makleri_simple_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+            save_to_excel(final_records, output, fmt)
         else:
             print("⚠️  Žádná data")
 
     except KeyboardInterrupt:
         print("\n⚠️  Přerušeno")
+        print(f"💾 Checkpoint: {checkpoint.run_id} (pokračování: --resume {checkpoint.run_id})")
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ Chyba: {e}")
         import traceback
         traceback.print_exc()
+        print(f"💾 Checkpoint: {checkpoint.run_id} (pokračování: --resume {checkpoint.run_id})")
         sys.exit(1)
+    finally:
+        checkpoint.flush()
+        if index is not None:
+            index.close()
+        if sellers is not None:
+            sellers.close()
+
+    # Doběhnutý běh už není co obnovovat - checkpoint zůstává jen po chybách
+    if errors:
+        print(f"\n💾 Některé stránky se nepodařilo stáhnout, checkpoint zůstává: --resume {checkpoint.run_id}")
+    else:
+        checkpoint.discard()
+
+    if cache is not None:
+        print(f"\n💾 Cache odpovědí: {cache.stats()}")
+    if sellers is not None and sellers.hits + sellers.misses:
+        print(f"📇 Index prodejců: {sellers.stats()}")
+    print(f"🔁 Sdílené požadavky: {scraper._flights.stats()}")
 
     print("\n" + "="*80)
     print("✅ Hotovo!")
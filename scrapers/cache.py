@@ -0,0 +1,146 @@
+"""Persistent on-disk cache of JSON API responses."""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional, Union
+from urllib.parse import urlencode, urlparse
+
+
+#: Default time-to-live in seconds for each endpoint class.
+DEFAULT_TTLS: Dict[str, float] = {
+    "listing": 60 * 60,  # stránky výpisu se mění průběžně
+    "estate": 7 * 24 * 60 * 60,  # detail inzerátu se téměř nemění
+    "company": 24 * 60 * 60,  # seznam makléřů RK se mění pomalu
+    "other": 60 * 60,
+}
+
+_ESTATE_DETAIL = re.compile(r"/estates/[^/]+/?$")
+_COMPANY = re.compile(r"/companies/[^/]+/?$")
+_LISTING = re.compile(r"/estates/?$")
+
+
+def endpoint_class(url: str) -> str:
+    """Classify an API URL into one of the :data:`DEFAULT_TTLS` keys."""
+
+    path = urlparse(url).path
+    if _LISTING.search(path):
+        return "listing"
+    if _ESTATE_DETAIL.search(path):
+        return "estate"
+    if _COMPANY.search(path):
+        return "company"
+    return "other"
+
+
+def cache_key(url: str, params: Optional[Mapping[str, object]] = None) -> str:
+    """URL plus sorted query parameters, so parameter order does not matter."""
+
+    if not params:
+        return url
+    items = sorted((str(key), str(value)) for key, value in params.items() if value is not None)
+    return f"{url}?{urlencode(items)}"
+
+
+def parse_ttl_overrides(values: Optional[Iterable[str]]) -> Dict[str, float]:
+    """Parse CLI values like ``estate=86400`` into a TTL mapping."""
+
+    ttls: Dict[str, float] = {}
+    for value in values or ():
+        kind, sep, seconds = value.partition("=")
+        kind = kind.strip()
+        if not sep or kind not in DEFAULT_TTLS:
+            raise ValueError(
+                f"Neplatné TTL '{value}', očekávám TYP=SEKUNDY, kde TYP je {', '.join(DEFAULT_TTLS)}"
+            )
+        ttls[kind] = float(seconds)
+    return ttls
+
+
+class ResponseCache:
+    """SQLite store of API payloads keyed by URL and sorted params.
+
+    Expiry is evaluated on read against the TTL of the endpoint class, so
+    changing a TTL affects entries that are already stored. Expired rows are
+    deleted whenever the cache is opened, so the file does not grow from run
+    to run. The connection is shared between fetch threads and guarded by a
+    lock.
+    """
+
+    filename = "responses.sqlite3"
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        *,
+        ttls: Optional[Mapping[str, float]] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.directory / self.filename), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.purged = self.purge_expired()
+
+    def get(self, url: str, params: Optional[Mapping[str, object]] = None) -> Optional[Dict]:
+        key = cache_key(url, params)
+        ttl = self.ttls[endpoint_class(url)]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at, payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or time.time() - row[0] > ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[1])
+
+    def set(self, url: str, params: Optional[Mapping[str, object]], payload: Dict) -> None:
+        key = cache_key(url, params)
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, stored_at, payload) VALUES (?, ?, ?, ?)",
+                (key, endpoint_class(url), time.time(), data),
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows; returns how many were removed."""
+
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for kind, ttl in self.ttls.items():
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE endpoint = ? AND stored_at < ?", (kind, now - ttl)
+                )
+                removed += cursor.rowcount
+            self._conn.commit()
+        return removed
+
+    def stats(self) -> str:
+        return f"{self.hits} zásahů, {self.misses} stažení"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,102 @@
+"""Durable crawl state so that long runs can be resumed after a crash."""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+def section_key(*parts: object) -> str:
+    """Key of a state section, e.g. ``simple:1:1:10`` for one combination."""
+
+    return ":".join("" if part is None else str(part) for part in parts)
+
+
+class Checkpoint:
+    """JSON snapshot of a run's progress stored as ``<directory>/<run_id>.json``.
+
+    The state is a plain JSON-serialisable dict owned by the caller: pages
+    finished per combination, processed ``hash_id``s, partial aggregates.
+    Callers update it as they go and write it when :meth:`due` says the
+    flush interval has passed; :meth:`flush` writes immediately. Writes go
+    to a temporary file that replaces the old snapshot, so an interrupted
+    write never leaves a broken checkpoint behind.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        state: Optional[Dict] = None,
+        *,
+        interval: float = 30.0,
+    ) -> None:
+        self.path = Path(path)
+        self.state: Dict = state if state is not None else {}
+        self.interval = interval
+        self._flushed_at = time.monotonic()
+
+    @classmethod
+    def create(
+        cls,
+        directory: Union[str, Path],
+        *,
+        params: Optional[Dict] = None,
+        interval: float = 30.0,
+    ) -> "Checkpoint":
+        """Start a new run; ``params`` are stored so a resume can reuse them.
+
+        The run id is the start time plus a random suffix, so runs started
+        in the same second (parallel jobs, cron) never share a checkpoint.
+        """
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        run_id = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+        checkpoint = cls(directory / f"{run_id}.json", {"params": params or {}}, interval=interval)
+        checkpoint.flush()
+        return checkpoint
+
+    @classmethod
+    def resume(cls, directory: Union[str, Path], run_id: str, *, interval: float = 30.0) -> "Checkpoint":
+        """Load the checkpoint of ``run_id``; raises ``FileNotFoundError`` if missing."""
+
+        path = Path(directory) / f"{run_id}.json"
+        if not path.exists():
+            raise FileNotFoundError(f"Checkpoint '{run_id}' neexistuje ({path})")
+        with path.open(encoding="utf-8") as handle:
+            state = json.load(handle)
+        return cls(path, state, interval=interval)
+
+    @property
+    def run_id(self) -> str:
+        return self.path.stem
+
+    @property
+    def params(self) -> Dict:
+        return self.state.setdefault("params", {})
+
+    def section(self, name: str) -> Dict:
+        """Mutable part of the state belonging to ``name``."""
+
+        return self.state.setdefault("sections", {}).setdefault(name, {})
+
+    def due(self) -> bool:
+        return time.monotonic() - self._flushed_at >= self.interval
+
+    def flush(self) -> None:
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(self.state, handle, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._flushed_at = time.monotonic()
+
+    def discard(self) -> None:
+        """Delete the snapshot once the run has finished and needs no resume."""
+
+        self.path.unlink(missing_ok=True)
+        self.path.with_suffix(".tmp").unlink(missing_ok=True)
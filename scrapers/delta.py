@@ -0,0 +1,308 @@
+"""Incremental crawling: a persistent index of listings seen by earlier runs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+
+def listing_fingerprint(estate: Dict) -> str:
+    """Digest of the listing fields whose change warrants a new detail fetch.
+
+    Only fields present in the ``/estates`` listing payload are used - price,
+    title, locality and the seller/company - so the fingerprint is known
+    before the detail is downloaded.
+    """
+
+    embedded = estate.get("_embedded") or {}
+    price = estate.get("price_czk") or {}
+    fields = [
+        price.get("value_raw") if isinstance(price, dict) else None,
+        estate.get("price"),
+        estate.get("name"),
+        estate.get("locality"),
+        (embedded.get("seller") or {}).get("user_id"),
+        (embedded.get("company") or {}).get("id"),
+    ]
+    data = json.dumps(fields, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class ListingIndex:
+    """SQLite store of ``hash_id`` → fingerprint and derived payload per scope.
+
+    A scope is one listing slice (scraper, category, type, region); the
+    payload is whatever the caller derived from the listing's detail, so an
+    unchanged listing can be counted again without downloading anything.
+    The connection is shared between threads and guarded by a lock.
+    """
+
+    filename = "listings.sqlite3"
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.directory / self.filename), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS listings (
+                scope TEXT NOT NULL,
+                hash_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (scope, hash_id)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sweeps (scope TEXT PRIMARY KEY, swept_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def last_full_sweep(self, scope: str) -> Optional[float]:
+        """Time of the last sweep of ``scope`` that walked the whole listing."""
+
+        with self._lock:
+            row = self._conn.execute("SELECT swept_at FROM sweeps WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else None
+
+    def mark_full_sweep(self, scope: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sweeps (scope, swept_at) VALUES (?, ?)", (scope, time.time())
+            )
+            self._conn.commit()
+
+    def fingerprints(self, scope: str, hash_ids: Iterable[str]) -> Dict[str, str]:
+        """Stored fingerprints of those ``hash_ids`` that are indexed."""
+
+        hash_ids = list(hash_ids)
+        if not hash_ids:
+            return {}
+        marks = ",".join("?" * len(hash_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash_id, fingerprint FROM listings WHERE scope = ? AND hash_id IN ({marks})",
+                (scope, *hash_ids),
+            ).fetchall()
+        return dict(rows)
+
+    def touch(self, scope: str, hash_ids: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE listings SET seen_at = ? WHERE scope = ? AND hash_id = ?",
+                [(now, scope, hash_id) for hash_id in hash_ids],
+            )
+            self._conn.commit()
+
+    def put(self, scope: str, hash_id: str, fingerprint: str, payload: Dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings (scope, hash_id, fingerprint, seen_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (scope, hash_id, fingerprint, time.time(), data),
+            )
+            self._conn.commit()
+
+    def payloads(self, scope: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM listings WHERE scope = ? ORDER BY rowid", (scope,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def retain(self, scope: str, hash_ids: Iterable[str]) -> int:
+        """Delete listings of ``scope`` not in ``hash_ids``; returns how many."""
+
+        keep = set(hash_ids)
+        with self._lock:
+            stored = [row[0] for row in self._conn.execute("SELECT hash_id FROM listings WHERE scope = ?", (scope,))]
+            gone = [hash_id for hash_id in stored if hash_id not in keep]
+            self._conn.executemany(
+                "DELETE FROM listings WHERE scope = ? AND hash_id = ?", [(scope, hash_id) for hash_id in gone]
+            )
+            self._conn.commit()
+        return len(gone)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SellerIndex:
+    """SQLite store of ``hash_id`` → seller (user_id, name, phone, email).
+
+    The only reason to download a listing's detail is often its seller; once
+    known, the seller is shared by every scope and run, so a listing seen
+    before never needs its detail again. An empty seller records that the
+    detail had none. The connection is shared between threads and guarded
+    by a lock.
+    """
+
+    filename = "sellers.sqlite3"
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.directory / self.filename), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sellers (
+                hash_id TEXT PRIMARY KEY,
+                stored_at REAL NOT NULL,
+                seller TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def lookup(self, hash_ids: Iterable[object]) -> Dict[str, Dict]:
+        """Known sellers of those ``hash_ids`` that are indexed."""
+
+        hash_ids = [str(hash_id) for hash_id in hash_ids]
+        if not hash_ids:
+            return {}
+        marks = ",".join("?" * len(hash_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash_id, seller FROM sellers WHERE hash_id IN ({marks})", hash_ids
+            ).fetchall()
+            self.hits += len(rows)
+            self.misses += len(hash_ids) - len(rows)
+        return {hash_id: json.loads(seller) for hash_id, seller in rows}
+
+    def put(self, hash_id: object, seller: Dict) -> None:
+        data = json.dumps(seller, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sellers (hash_id, stored_at, seller) VALUES (?, ?, ?)",
+                (str(hash_id), time.time(), data),
+            )
+            self._conn.commit()
+
+    def stats(self) -> str:
+        return f"{self.hits} známých, {self.misses} neznámých"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class DeltaSweep:
+    """One incremental pass over a scope, walked newest listings first.
+
+    :meth:`select` filters each listing page down to new or changed
+    listings; the caller fetches their details and records the derived
+    payload with :meth:`store`. Once ``known_run`` unchanged listings follow
+    each other, the rest of the (older) listing is assumed unchanged and
+    :attr:`stopped` is set. :meth:`finish` returns the payloads of the whole
+    scope - the fresh ones plus everything remembered from earlier runs.
+
+    Delisted listings can only be told apart by a sweep that walks the whole
+    listing, which an early stop never does. When the last such sweep of the
+    scope is older than ``full_every`` seconds (or there was none), the sweep
+    is :attr:`full`: it never stops early, so a complete run prunes the index.
+    """
+
+    def __init__(
+        self, index: ListingIndex, scope: str, *, known_run: int = 60, full_every: Optional[float] = None
+    ) -> None:
+        self.index = index
+        self.scope = scope
+        self.known_run = known_run
+        last_full = index.last_full_sweep(scope) if full_every is not None else None
+        self.full = full_every is not None and (last_full is None or time.time() - last_full >= full_every)
+        self.stopped = False
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.removed = 0
+        self._run = 0
+        self._seen: set = set()
+        self._pending: Dict[str, str] = {}
+        self._changed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def select(self, estates: List[Dict]) -> List[Dict]:
+        """New or changed listings of one page, in page order."""
+
+        by_id = {str(estate["hash_id"]): estate for estate in estates if estate.get("hash_id")}
+        known = self.index.fingerprints(self.scope, by_id)
+        fresh: List[Dict] = []
+        unchanged: List[str] = []
+        with self._lock:
+            for hash_id, estate in by_id.items():
+                self._seen.add(hash_id)
+                fingerprint = listing_fingerprint(estate)
+                if known.get(hash_id) == fingerprint:
+                    unchanged.append(hash_id)
+                    self.unchanged += 1
+                    self._run += 1
+                    if self._run >= self.known_run and not self.full:
+                        self.stopped = True
+                    continue
+                if hash_id in known:
+                    self.changed += 1
+                    self._changed.add(hash_id)
+                else:
+                    self.new += 1
+                self._run = 0
+                self._pending[hash_id] = fingerprint
+                fresh.append(estate)
+        self.index.touch(self.scope, unchanged)
+        return fresh
+
+    def changed_ids(self, estates: Iterable[Dict]) -> Set[str]:
+        """``hash_id``s of selected listings that changed since they were indexed.
+
+        Their details must not come from a response cache: a cached detail
+        may predate the change that made the listing fresh.
+        """
+
+        with self._lock:
+            return {str(estate.get("hash_id")) for estate in estates} & self._changed
+
+    def store(self, hash_id: object, payload: Dict) -> None:
+        """Remember the payload derived from a fresh listing's detail.
+
+        Only store what came from a detail that was actually downloaded: a
+        stored listing counts as unchanged until its listing entry changes,
+        so its detail would never be fetched again.
+        """
+
+        with self._lock:
+            fingerprint = self._pending.pop(str(hash_id), None)
+            self._changed.discard(str(hash_id))
+        if fingerprint is not None:
+            self.index.put(self.scope, str(hash_id), fingerprint, payload)
+
+    def finish(self, *, complete: bool) -> List[Dict]:
+        """Payloads of the scope; a ``complete`` sweep also drops delisted ones."""
+
+        if complete and not self.stopped:
+            self.removed = self.index.retain(self.scope, self._seen)
+            self.index.mark_full_sweep(self.scope)
+        return self.index.payloads(self.scope)
+
+    def stats(self) -> str:
+        summary = f"{self.new} nových, {self.changed} změněných, {self.unchanged} beze změny"
+        if self.removed:
+            summary += f", {self.removed} staženo z nabídky"
+        if self.stopped:
+            summary += " (zbytek výpisu beze změny)"
+        elif self.full:
+            summary += " (úplný průchod)"
+        return summary
@@ -0,0 +1,82 @@
+"""Asyncio based fetch engine with a bounded number of in-flight requests."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from .retry import RetryLater, backoff_delay, run_with_retries
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class FetchEngine:
+    """Run blocking fetch callables concurrently on an asyncio event loop.
+
+    The callables themselves stay synchronous (``requests`` based) and are
+    executed in a thread pool; asyncio only schedules them and caps the number
+    of calls in flight at ``concurrency``. With ``concurrency == 1`` everything
+    runs inline, which keeps single-threaded behaviour identical to a plain
+    loop.
+
+    A callable may raise :class:`~scrapers.retry.RetryLater`; the item then
+    waits for the requested delay without holding a concurrency slot, so the
+    other items keep flowing. After ``attempts`` tries the result is ``None``.
+
+    :meth:`map` is not re-entrant: do not call it from inside a callable that
+    is itself being run by the same engine. Calls from several ordinary
+    threads at once are fine; they share the thread pool.
+    """
+
+    def __init__(self, concurrency: int = 1) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency musí být alespoň 1")
+        self.concurrency = concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def map(self, func: Callable[[T], R], items: Iterable[T], *, attempts: int = 1) -> List[Optional[R]]:
+        """Apply ``func`` to every item and return results in input order."""
+
+        items = list(items)
+        if not items:
+            return []
+        if self.concurrency == 1 or len(items) == 1:
+            return run_with_retries(func, items, attempts=attempts)
+        return asyncio.run(self._gather(func, items, attempts))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _gather(self, func: Callable[[T], R], items: List[T], attempts: int) -> List[Optional[R]]:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        executor = self._get_executor()
+
+        async def run(item: T) -> Optional[R]:
+            for attempt in range(attempts):
+                async with semaphore:
+                    try:
+                        return await loop.run_in_executor(executor, func, item)
+                    except RetryLater as exc:
+                        retry_after = exc.retry_after
+                if attempt < attempts - 1:
+                    await asyncio.sleep(backoff_delay(attempt, retry_after))
+            return None
+
+        return list(await asyncio.gather(*(run(item) for item in items)))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency,
+                    thread_name_prefix="fetch",
+                )
+            return self._executor
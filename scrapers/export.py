@@ -0,0 +1,297 @@
+"""Writing result tables - ``.xlsx`` for people, Parquet/CSV/JSONL for tools."""
+
+from __future__ import annotations
+
+import csv
+import importlib.util
+import itertools
+import json
+import math
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
+
+
+#: Output formats understood by :func:`write_table` and :func:`read_table`.
+FORMATS = ("xlsx", "parquet", "csv", "jsonl")
+
+#: Label shown instead of an agent's profile URL.
+PROFILE_LABEL = "Profil makléře"
+
+#: Column value -> ``(target URL, shown text)``, or ``None`` for a plain cell.
+LinkFormat = Callable[[str], Optional[Tuple[str, object]]]
+
+
+def _named_styles() -> List[NamedStyle]:
+    return [
+        NamedStyle(name="odkaz", font=Font(color="0000FF", underline="single")),
+        NamedStyle(
+            name="company",
+            font=Font(bold=True, size=12),
+            fill=PatternFill(start_color="E8F4F8", end_color="E8F4F8", fill_type="solid"),
+        ),
+    ]
+
+
+def link(label: Optional[str] = None) -> LinkFormat:
+    """Link a URL cell, showing ``label`` instead of the URL when given."""
+
+    def format_link(value: str) -> Optional[Tuple[str, object]]:
+        if not value.startswith("http"):
+            return None
+        return value, label or value
+
+    return format_link
+
+
+def listing_links(value: str) -> Optional[Tuple[str, object]]:
+    """Link a comma-separated list of listing URLs to its first URL."""
+
+    if not value.startswith("http"):
+        return None
+    if "," not in value:
+        return value, value
+    urls = [url.strip() for url in value.split(",") if url.strip()]
+    return urls[0], f"Zobrazit ({len(urls)} inzerátů)"
+
+
+def _plain(value: Any) -> Any:
+    """``None`` for missing values (pandas NaN included), the value otherwise."""
+
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _columns(records: Sequence[Mapping], columns: Optional[Sequence[str]]) -> List[str]:
+    if columns is None:
+        return list(dict.fromkeys(key for record in records for key in record))
+    return list(columns)
+
+
+def write_xlsx(
+    path: Union[str, Path],
+    records: Sequence[Mapping],
+    *,
+    columns: Optional[Sequence[str]] = None,
+    links: Optional[Mapping[str, LinkFormat]] = None,
+    row_style: Optional[Callable[[Mapping], Optional[str]]] = None,
+    max_width: int = 60,
+    width_sample: int = 1000,
+) -> int:
+    """Write ``records`` as one sheet with links, styles and column widths.
+
+    The workbook is written in openpyxl's write-only mode, with no second
+    load-and-save pass. Column widths must be set before the first row, so
+    they fit the longest shown value among the header and the first
+    ``width_sample`` rows, capped at ``max_width``; only those rows are held
+    in memory, the rest are streamed to disk as they are formatted (openpyxl
+    itself still keeps hyperlink targets until the sheet is closed).
+    ``columns`` defaults to the record keys in order of first appearance
+    (like ``pd.DataFrame(records)``). ``links`` maps a column to the
+    formatter of its hyperlinks; ``row_style`` may name a style (``"company"``)
+    for a whole row. Returns the number of rows written.
+    """
+
+    columns = _columns(records, columns)
+    links = links or {}
+
+    def prepare(record: Mapping) -> Tuple[Optional[str], List[Tuple[object, Optional[str]]]]:
+        # Zobrazené hodnoty a cíle odkazů - bez buněk openpyxl
+        cells = []
+        for name in columns:
+            value = _plain(record.get(name))
+            target = None
+            format_link = links.get(name)
+            if format_link is not None and isinstance(value, str) and value:
+                formatted = format_link(value)
+                if formatted is not None:
+                    target, value = formatted
+            cells.append((value, target))
+        return row_style(record) if row_style else None, cells
+
+    prepared = map(prepare, records)
+    sample = list(itertools.islice(prepared, width_sample))
+    widths: Dict[int, int] = {index: len(str(name)) for index, name in enumerate(columns)}
+    for _style, cells in sample:
+        for index, (value, _target) in enumerate(cells):
+            if value is not None and value != "":
+                widths[index] = max(widths[index], len(str(value)))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    workbook = Workbook(write_only=True)
+    for style in _named_styles():
+        workbook.add_named_style(style)
+    sheet = workbook.create_sheet(title="Sheet1")
+    for index, width in widths.items():
+        sheet.column_dimensions[get_column_letter(index + 1)].width = min(width + 2, max_width)
+
+    sheet.append(list(columns))
+
+    written = 0
+    for style, cells in itertools.chain(sample, prepared):
+        row = []
+        for value, target in cells:
+            if style is None and target is None:
+                # Prostá hodnota - bez objektu buňky
+                row.append(value)
+                continue
+            cell = WriteOnlyCell(sheet, value=value)
+            if target is not None:
+                cell.hyperlink = target
+                cell.style = "odkaz"
+            else:
+                cell.style = style
+            row.append(cell)
+        sheet.append(row)
+        written += 1
+
+    workbook.save(path)
+    return written
+
+
+def output_format(path: Optional[Union[str, Path]], fmt: Optional[str] = None) -> str:
+    """The format to write: ``fmt``, else the suffix of ``path``, else xlsx.
+
+    Raises :class:`ValueError` for an unknown format or for Parquet without
+    the optional ``pyarrow`` package.
+    """
+
+    if fmt is None:
+        suffix = Path(path).suffix.lstrip(".").lower() if path else ""
+        fmt = suffix if suffix in FORMATS else "xlsx"
+    if fmt not in FORMATS:
+        raise ValueError(f"Neznámý formát '{fmt}', očekávám {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        _require_pyarrow()
+    return fmt
+
+
+def _require_pyarrow() -> None:
+    if importlib.util.find_spec("pyarrow") is None:
+        raise ValueError("Formát parquet vyžaduje balíček pyarrow (pip install pyarrow)")
+
+
+def with_format(path: Union[str, Path], fmt: str) -> Path:
+    """``path`` with the file suffix of ``fmt``."""
+
+    path = Path(path)
+    return path if path.suffix.lower() == f".{fmt}" else path.with_suffix(f".{fmt}")
+
+
+def write_csv(path: Union[str, Path], records: Iterable[Mapping], columns: Sequence[str]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        for record in records:
+            values = (_plain(record.get(name)) for name in columns)
+            writer.writerow(["" if value is None else value for value in values])
+            count += 1
+    return count
+
+
+def write_jsonl(path: Union[str, Path], records: Iterable[Mapping], columns: Sequence[str]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as handle:
+        for record in records:
+            row = {name: _plain(record.get(name)) for name in columns}
+            handle.write(json.dumps(row, ensure_ascii=False, default=str))
+            handle.write("\n")
+            count += 1
+    return count
+
+
+def _arrow_type(values: Iterable[Any]) -> Any:
+    import pyarrow as pa
+
+    kinds = {type(value) for value in values if value is not None}
+    if kinds and kinds <= {bool}:
+        return pa.bool_()
+    if kinds and kinds <= {int}:
+        return pa.int64()
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+def write_parquet(
+    path: Union[str, Path], records: Sequence[Mapping], columns: Sequence[str], *, batch_size: int = 50_000
+) -> int:
+    """Write ``records`` as Parquet in row groups of ``batch_size`` rows.
+
+    Column types are inferred from all values first (integers, floats and
+    booleans keep their type, anything mixed becomes a string), so every
+    row group shares one schema.
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {name: _arrow_type(_plain(record.get(name)) for record in records) for name in columns}
+    schema = pa.schema([(name, types[name]) for name in columns])
+    with pq.ParquetWriter(str(path), schema) as writer:
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            data = {}
+            for name in columns:
+                values = [_plain(record.get(name)) for record in batch]
+                if types[name] == pa.string():
+                    values = [None if value is None else str(value) for value in values]
+                data[name] = values
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+    return len(records)
+
+
+def write_table(
+    path: Union[str, Path],
+    records: Sequence[Mapping],
+    fmt: str = "xlsx",
+    *,
+    columns: Optional[Sequence[str]] = None,
+    **xlsx_options: Any,
+) -> int:
+    """Write ``records`` in ``fmt``; ``xlsx_options`` only apply to Excel.
+
+    Links, row styles and column widths are presentation: Parquet, CSV and
+    JSONL keep the raw values so that later stages can read them back.
+    """
+
+    if fmt == "xlsx":
+        return write_xlsx(path, records, columns=columns, **xlsx_options)
+    columns = _columns(records, columns)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        return write_parquet(path, records, columns)
+    if fmt == "csv":
+        return write_csv(path, records, columns)
+    if fmt == "jsonl":
+        return write_jsonl(path, records, columns)
+    raise ValueError(f"Neznámý formát '{fmt}', očekávám {', '.join(FORMATS)}")
+
+
+def read_table(path: Union[str, Path]) -> pd.DataFrame:
+    """Read a table written in any of :data:`FORMATS` (by file suffix).
+
+    CSV is read as text so that phone numbers keep their leading zeros and
+    spacing, as they do in Excel. Parquet without ``pyarrow`` raises
+    :class:`ValueError` like :func:`output_format`.
+    """
+
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        _require_pyarrow()
+        return pd.read_parquet(path)
+    if suffix == ".csv":
+        return pd.read_csv(path, dtype=str)
+    if suffix == ".jsonl":
+        return pd.read_json(path, lines=True, dtype=False)
+    return pd.read_excel(path)
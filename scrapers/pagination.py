@@ -0,0 +1,85 @@
+"""Paging through API listings with the remaining pages fetched concurrently."""
+
+from __future__ import annotations
+
+import math
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from .engine import FetchEngine
+
+
+def page_count(result_size: int, per_page: int) -> int:
+    """Number of pages needed for ``result_size`` items (at least one)."""
+
+    if per_page <= 0:
+        return 1
+    return max(1, math.ceil(result_size / per_page))
+
+
+def listing_page_count(payload: Dict) -> int:
+    """Page count of a ``/estates`` listing payload."""
+
+    return page_count(payload.get("result_size", 0) or 0, payload.get("per_page") or 60)
+
+
+class Paginator:
+    """Iterate ``(page, payload)`` pairs of a paged endpoint in page order.
+
+    Page 1 is fetched first to learn the page count; the following pages are
+    then fetched through the :class:`~scrapers.engine.FetchEngine` in windows
+    of ``window`` pages, so they run concurrently and are paced only by the
+    shared rate limiter. Fetching window by window lets the consumer stop
+    early (an empty page, a page limit) without downloading the whole listing.
+
+    ``fetch_page`` returns the payload or ``None`` and may raise
+    :class:`~scrapers.retry.RetryLater`. Iteration stops at the first page
+    that could not be fetched; its number is kept in :attr:`failed_page`.
+    ``start_page`` resumes an interrupted crawl; that page then plays the
+    role of page 1.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[int], Optional[Dict]],
+        *,
+        engine: FetchEngine,
+        max_pages: Optional[int] = None,
+        page_count: Callable[[Dict], int] = listing_page_count,
+        attempts: int = 3,
+        window: Optional[int] = None,
+        start_page: int = 1,
+    ) -> None:
+        self.fetch_page = fetch_page
+        self.engine = engine
+        self.max_pages = max_pages
+        self.page_count = page_count
+        self.attempts = attempts
+        self.window = window or engine.concurrency * 2
+        self.start_page = max(1, start_page)
+        self.total_pages: Optional[int] = None
+        self.failed_page: Optional[int] = None
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict]]:
+        start = self.start_page
+        if self.max_pages is not None and self.max_pages < start:
+            return
+
+        first = self.engine.map(self.fetch_page, [start], attempts=self.attempts)[0]
+        if not first:
+            self.failed_page = start
+            return
+
+        self.total_pages = self.page_count(first)
+        last = self.total_pages
+        if self.max_pages is not None:
+            last = min(last, self.max_pages)
+        yield start, first
+
+        for window_start in range(start + 1, last + 1, self.window):
+            pages = list(range(window_start, min(window_start + self.window, last + 1)))
+            payloads = self.engine.map(self.fetch_page, pages, attempts=self.attempts)
+            for page, payload in zip(pages, payloads):
+                if not payload:
+                    self.failed_page = page
+                    return
+                yield page, payload
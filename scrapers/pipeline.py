@@ -0,0 +1,106 @@
+"""Producer/consumer pipeline streaming items through a pool of fetch workers."""
+
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_STOP = object()
+
+
+def stream(
+    items: Iterable[T],
+    func: Callable[[T], R],
+    *,
+    workers: int = 4,
+    max_pending: Optional[int] = None,
+) -> Iterator[Tuple[T, R]]:
+    """Yield ``(item, func(item))`` while ``items`` is still being produced.
+
+    ``items`` is consumed by a producer thread (typically it walks listing
+    pages), ``workers`` threads apply ``func`` and the caller folds results
+    in as they are yielded. At most ``max_pending`` items are between the
+    producer and the caller at any time, so memory stays flat however long
+    the listing is, and the listing and the detail downloads overlap instead
+    of running one after the other.
+
+    Results are yielded in input order. An exception raised by the producer
+    or by ``func`` is re-raised in the caller; leaving the loop early stops
+    the producer and the workers.
+    """
+
+    if workers < 1:
+        raise ValueError("workers musí být alespoň 1")
+    max_pending = max_pending or workers * 4
+    # Sloty omezují počet rozpracovaných položek, a tím i obě fronty.
+    slots = threading.Semaphore(max_pending)
+    tasks: "queue.Queue[object]" = queue.Queue()
+    done: "queue.Queue[Tuple[int, object, object, Optional[BaseException]]]" = queue.Queue()
+    stop = threading.Event()
+
+    def produce() -> None:
+        count = 0
+        error: Optional[BaseException] = None
+        try:
+            for item in items:
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                tasks.put((count, item))
+                count += 1
+        except BaseException as exc:  # předá se volajícímu
+            error = exc
+        finally:
+            for _ in range(workers):
+                tasks.put(_STOP)
+            done.put((-1, count, None, error))
+
+    def work() -> None:
+        while True:
+            task = tasks.get()
+            if task is _STOP:
+                return
+            seq, item = task  # type: ignore[misc]
+            if stop.is_set():
+                continue
+            try:
+                done.put((seq, item, func(item), None))
+            except BaseException as exc:
+                done.put((seq, item, None, exc))
+
+    threads = [threading.Thread(target=produce, name="pipeline-producer", daemon=True)]
+    threads += [
+        threading.Thread(target=work, name=f"pipeline-worker-{index}", daemon=True)
+        for index in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    buffer: Dict[int, Tuple[T, R]] = {}
+    next_seq = 0
+    produced: Optional[int] = None
+    try:
+        while produced is None or next_seq < produced:
+            seq, item, result, error = done.get()
+            if error is not None:
+                raise error
+            if seq == -1:
+                produced = item  # type: ignore[assignment]
+                continue
+            buffer[seq] = (item, result)  # type: ignore[assignment]
+            while next_seq in buffer:
+                yield buffer.pop(next_seq)
+                slots.release()
+                next_seq += 1
+    finally:
+        stop.set()
+        # Uvolni producenta, pokud čeká na volný slot.
+        for _ in range(max_pending):
+            slots.release()
@@ -0,0 +1,173 @@
+"""Request pacing shared by all scrapers."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting requests per second.
+
+    Tokens refill continuously at ``rate`` per second up to ``burst``. Every
+    request takes one token before it is sent; when the bucket is empty the
+    caller sleeps just long enough for the next token. Time spent inside a
+    slow request therefore counts towards the pause, unlike a fixed sleep
+    after every call.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        if rate <= 0:
+            raise ValueError("rate musí být kladné číslo")
+        if burst < 1:
+            raise ValueError("burst musí být alespoň 1")
+        self._rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float, *, drain: bool = False) -> None:
+        """Change the refill rate; ``drain`` empties the bucket immediately."""
+
+        with self._lock:
+            self._refill()
+            self._rate = float(rate)
+            if drain:
+                self._tokens = min(self._tokens, 0.0)
+
+    def acquire(self) -> float:
+        """Take one token, sleeping if necessary. Returns the time waited."""
+
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+class AdaptiveRateController:
+    """AIMD controller tuning a :class:`TokenBucket` from observed responses.
+
+    While responses are healthy the rate grows additively by ``increase``
+    after every ``healthy_streak`` successes. A 429, a burst of 5xx/network
+    errors or a p95 latency rising above ``latency_factor`` times the best
+    p95 seen so far cuts the rate multiplicatively by ``decrease`` and
+    drains the bucket; after a latency cut the new p95 becomes the baseline,
+    so a server that stays slower costs one cut instead of a slide to
+    ``min_rate``. Decreases are rate-limited by ``cooldown`` seconds so that
+    a single overload seen by many in-flight requests counts only once.
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        *,
+        min_rate: float = 0.1,
+        max_rate: float = 4.0,
+        increase: float = 0.1,
+        decrease: float = 0.5,
+        healthy_streak: int = 20,
+        error_burst: int = 3,
+        error_window: int = 10,
+        latency_window: int = 50,
+        latency_factor: float = 2.0,
+        cooldown: float = 5.0,
+        log: Optional[Callable[[str], None]] = print,
+    ) -> None:
+        self.bucket = bucket
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.healthy_streak = healthy_streak
+        self.error_burst = error_burst
+        self.latency_window = latency_window
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.changes: List[Tuple[float, float, str]] = []
+        self._log = log
+        self._lock = threading.Lock()
+        self._streak = 0
+        self._outcomes: Deque[bool] = deque(maxlen=error_window)
+        self._latencies: List[float] = []
+        self._best_p95: Optional[float] = None
+        self._last_decrease = float("-inf")
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def record(self, status: Optional[int], latency: float) -> None:
+        """Feed one response (``status=None`` for a network error)."""
+
+        with self._lock:
+            if status == 429:
+                self._outcomes.append(False)
+                self._decrease("HTTP 429")
+                return
+
+            if status is None or status >= 500:
+                self._outcomes.append(False)
+                self._streak = 0
+                if self._outcomes.count(False) >= self.error_burst:
+                    self._decrease(f"{self._outcomes.count(False)} chyb serveru/sítě")
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(True)
+            self._latencies.append(latency)
+            if len(self._latencies) >= self.latency_window:
+                p95 = _percentile(self._latencies, 0.95)
+                self._latencies.clear()
+                if self._best_p95 is None or p95 < self._best_p95:
+                    self._best_p95 = p95
+                elif p95 > self._best_p95 * self.latency_factor:
+                    best, self._best_p95 = self._best_p95, p95
+                    # Nová latence je výchozí bod - trvale pomalejší server
+                    # tempo sníží jednou, ne v každém okně až na min_rate
+                    self._decrease(f"p95 latence {p95:.2f}s (nejlepší {best:.2f}s)")
+                    return
+
+            self._streak += 1
+            if self._streak >= self.healthy_streak:
+                self._streak = 0
+                self._set_rate(min(self.max_rate, self.rate + self.increase), "zdravé odpovědi", drain=False)
+
+    def _decrease(self, reason: str) -> None:
+        self._streak = 0
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._set_rate(max(self.min_rate, self.rate * self.decrease), reason, drain=True)
+
+    def _set_rate(self, new_rate: float, reason: str, *, drain: bool) -> None:
+        old_rate = self.rate
+        if new_rate == old_rate and not drain:
+            return
+        self.bucket.set_rate(new_rate, drain=drain)
+        if new_rate == old_rate:
+            return
+        self.changes.append((old_rate, new_rate, reason))
+        if self._log is not None:
+            self._log(f"⚙️  Tempo {old_rate:.2f} → {new_rate:.2f} req/s ({reason})")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,138 @@
+"""Retry scheduling: Retry-After handling, retry budget and delayed queue."""
+
+from __future__ import annotations
+
+import heapq
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, List, Optional, Sequence, Tuple, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+#: Status codes worth retrying; everything else (404, 410, ...) is final.
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class RetryLater(Exception):
+    """Raised by a fetch callable when the item should be retried later.
+
+    ``retry_after`` carries the server's ``Retry-After`` hint in seconds; the
+    scheduler falls back to exponential backoff when it is ``None``.
+    """
+
+    def __init__(self, retry_after: Optional[float] = None, reason: str = "") -> None:
+        super().__init__(reason or "retry later")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class RetryBudget:
+    """Caps retries at a fraction of all requests sent.
+
+    A blocked IP makes every request fail; without a budget each failure
+    would be retried several times and the crawl turns into a retry storm.
+    ``min_retries`` keeps a few retries available at the start of a run.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_retries: int = 10) -> None:
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        """Reserve one retry; ``False`` when the budget is exhausted."""
+
+        with self._lock:
+            allowed = max(self.min_retries, int(self.requests * self.ratio))
+            if self.retries >= allowed:
+                self.denied += 1
+                return False
+            self.retries += 1
+            return True
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return seconds to wait from a ``Retry-After`` header (seconds or HTTP date)."""
+
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    *,
+    base: float = 1.0,
+    cap: float = 120.0,
+) -> float:
+    """Delay before retry number ``attempt`` (0-based).
+
+    The server's ``Retry-After`` wins when present; otherwise exponential
+    backoff with full jitter.
+    """
+
+    if retry_after is not None:
+        return min(retry_after, cap)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def run_with_retries(
+    func: Callable[[T], R],
+    items: Sequence[T],
+    *,
+    attempts: int = 3,
+) -> List[Optional[R]]:
+    """Apply ``func`` to items in a single thread with a delayed retry queue.
+
+    When ``func`` raises :class:`RetryLater` the item is put back on a queue
+    ordered by its ready time and the next fresh item is processed meanwhile,
+    so one throttled request does not stall the rest. Items that still fail
+    after ``attempts`` tries yield ``None``. Results keep input order.
+    """
+
+    results: List[Optional[R]] = [None] * len(items)
+    tries = [0] * len(items)
+    fresh: Deque[int] = deque(range(len(items)))
+    delayed: List[Tuple[float, int]] = []
+
+    while fresh or delayed:
+        now = time.monotonic()
+        if delayed and (delayed[0][0] <= now or not fresh):
+            ready_at, index = heapq.heappop(delayed)
+            if ready_at > now:
+                time.sleep(ready_at - now)
+        else:
+            index = fresh.popleft()
+
+        try:
+            results[index] = func(items[index])
+        except RetryLater as exc:
+            tries[index] += 1
+            if tries[index] < attempts:
+                delay = backoff_delay(tries[index] - 1, exc.retry_after)
+                heapq.heappush(delayed, (time.monotonic() + delay, index))
+
+    return results
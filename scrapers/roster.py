@@ -0,0 +1,164 @@
+"""Persistent store of agency rosters (company → sellers) between runs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from .pagination import page_count
+
+if TYPE_CHECKING:
+    from .sreality import SrealityScraper
+
+
+def roster_fingerprint(sellers: List[Dict]) -> str:
+    """Digest of a seller list that ignores the order of the sellers."""
+
+    rows = sorted(json.dumps(seller, ensure_ascii=False, sort_keys=True) for seller in sellers)
+    return hashlib.sha1("\n".join(rows).encode("utf-8")).hexdigest()
+
+
+def sellers_page(company_data: Dict) -> Tuple[List[Dict], int, int]:
+    """Sellers of one company page and its paging (``result_size``, ``per_page``)."""
+
+    sellers_data = company_data.get("_embedded", {}).get("sellers", {})
+    if isinstance(sellers_data, dict):
+        return (
+            sellers_data.get("sellers", []),
+            sellers_data.get("result_size", 0),
+            sellers_data.get("per_page", 20),
+        )
+    return [], 0, 20
+
+
+def fetch_company_sellers(scraper: "SrealityScraper", company_id: object) -> Tuple[List[Dict], int, bool]:
+    """All sellers of a company: ``(sellers, pages, failed)``.
+
+    The first page tells ``result_size``/``per_page``; the remaining pages
+    are then fetched concurrently through the scraper's fetch engine. A
+    failed page ends the roster with the sellers collected before it.
+    """
+
+    first = scraper._fetch_company(company_id, 1)
+    if not first:
+        return [], 1, True
+
+    all_sellers, result_size, per_page = sellers_page(first)
+    if not all_sellers:
+        return [], 1, False
+
+    pages = page_count(result_size, per_page)
+    rest = scraper._engine.map(lambda page: scraper._fetch_company(company_id, page), range(2, pages + 1))
+    for page, company_data in enumerate(rest, 2):
+        if not company_data:
+            return all_sellers, page, True
+
+        sellers_list, _result_size, _per_page = sellers_page(company_data)
+        if not sellers_list:
+            return all_sellers, page, False
+        all_sellers.extend(sellers_list)
+
+    return all_sellers, pages, False
+
+
+def _seller_key(seller: Dict) -> str:
+    return str(seller.get("id") or seller.get("user_id") or seller.get("name") or "")
+
+
+@dataclass
+class RosterChange:
+    """Sellers who joined or left a company since its previous roster."""
+
+    joined: List[Dict] = field(default_factory=list)
+    left: List[Dict] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.joined or self.left)
+
+
+class RosterStore:
+    """SQLite store of company rosters with a maximum age.
+
+    A roster fetched less than ``max_age`` seconds ago is served by
+    :meth:`fresh` and the company is not downloaded again. :meth:`put`
+    stores a refreshed roster and reports who joined or left; an unchanged
+    roster (same fingerprint) only has its fetch time renewed. The
+    connection is shared between threads and guarded by a lock.
+    """
+
+    filename = "rosters.sqlite3"
+
+    def __init__(self, directory: Union[str, Path], *, max_age: float = 7 * 24 * 60 * 60) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.reused = 0
+        self.refreshed = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.directory / self.filename), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rosters (
+                company_id TEXT PRIMARY KEY,
+                name TEXT,
+                fingerprint TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                sellers TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def fresh(self, company_id: object) -> Optional[List[Dict]]:
+        """Stored sellers of ``company_id`` if younger than ``max_age``."""
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, sellers FROM rosters WHERE company_id = ?", (str(company_id),)
+            ).fetchone()
+            if row is None or time.time() - row[0] > self.max_age:
+                return None
+            self.reused += 1
+        return json.loads(row[1])
+
+    def put(self, company_id: object, name: Optional[str], sellers: List[Dict]) -> RosterChange:
+        """Store a freshly downloaded roster; returns the change against the old one."""
+
+        fingerprint = roster_fingerprint(sellers)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, sellers FROM rosters WHERE company_id = ?", (str(company_id),)
+            ).fetchone()
+            change = RosterChange()
+            if row is not None and row[0] != fingerprint:
+                before = {_seller_key(seller): seller for seller in json.loads(row[1])}
+                after = {_seller_key(seller): seller for seller in sellers}
+                change.joined = [seller for key, seller in after.items() if key not in before]
+                change.left = [seller for key, seller in before.items() if key not in after]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rosters (company_id, name, fingerprint, fetched_at, sellers) VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(company_id),
+                    name,
+                    fingerprint,
+                    time.time(),
+                    json.dumps(sellers, ensure_ascii=False, separators=(",", ":")),
+                ),
+            )
+            self._conn.commit()
+            self.refreshed += 1
+        return change
+
+    def stats(self) -> str:
+        return f"{self.reused} z úložiště, {self.refreshed} staženo"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
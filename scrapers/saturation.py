@@ -0,0 +1,47 @@
+"""Stopping discovery sweeps once they stop finding anything new."""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+@dataclass
+class SaturationStop:
+    """Signal the end of a sweep after ``pages`` consecutive quiet pages.
+
+    A page is quiet when it brings fewer than ``min_new`` previously unseen
+    items. Listings are sorted by relevance rather than randomly, so a
+    saturated sweep can still miss a few rare items; :func:`chao1` estimates
+    how many.
+    """
+
+    pages: int
+    min_new: int = 1
+    quiet: int = 0
+    stopped_at: Optional[int] = None
+
+    def update(self, page: int, new_items: int) -> bool:
+        """Record one page; returns ``True`` when the sweep should stop."""
+
+        self.quiet = self.quiet + 1 if new_items < self.min_new else 0
+        if self.quiet >= self.pages:
+            self.stopped_at = page
+            return True
+        return False
+
+
+def chao1(frequencies: Iterable[int]) -> float:
+    """Chao1 estimate of the total number of distinct items.
+
+    ``frequencies`` holds, for every item seen, how many times it was seen
+    (e.g. listings per company). Items seen once (f1) and twice (f2) tell how
+    many were probably never seen; the bias-corrected form is used so that
+    ``f2 == 0`` is well defined.
+    """
+
+    counts = Counter(frequency for frequency in frequencies if frequency > 0)
+    observed = sum(counts.values())
+    f1, f2 = counts.get(1, 0), counts.get(2, 0)
+    return observed + f1 * (f1 - 1) / (2 * (f2 + 1))
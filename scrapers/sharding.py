@@ -0,0 +1,90 @@
+"""Running crawl shards (category × type × region) in worker processes."""
+
+from __future__ import annotations
+
+import dataclasses
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .cache import ResponseCache
+from .sreality import SrealityScraper
+
+
+#: Sreality ``locality_region_id`` of the 14 Czech regions (10 = Praha ... 23 = Moravskoslezský).
+REGION_IDS: Tuple[int, ...] = tuple(range(10, 24))
+
+Shard = Tuple[int, int, Optional[int]]
+R = TypeVar("R")
+
+
+def expand_regions(combinations: Iterable[Shard]) -> List[Shard]:
+    """Split nationwide combinations (region ``None``) into one shard per region.
+
+    Every listing belongs to exactly one region, so the region shards cover
+    the nationwide listing without overlap and their results can be summed.
+    """
+
+    shards: List[Shard] = []
+    for category_main, category_type, region in combinations:
+        if region is None:
+            shards.extend((category_main, category_type, region_id) for region_id in REGION_IDS)
+        else:
+            shards.append((category_main, category_type, region))
+    return list(dict.fromkeys(shards))
+
+
+@dataclass(frozen=True)
+class ShardSettings:
+    """What a worker process needs to build its own scraper.
+
+    Each worker has its own session, cache connection and rate limiter; the
+    global request budget is split evenly so that all workers together stay
+    within the rate a single process would use. More workers therefore do
+    not fetch faster - they only spread the CPU-side work (JSON parsing,
+    aggregation, index writes) over more cores.
+    """
+
+    workers: int = 1
+    concurrency: Optional[int] = None
+    cache_dir: Optional[str] = None
+    cache_ttls: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def rate_share(self) -> float:
+        return 1.0 / max(1, self.workers)
+
+    @contextmanager
+    def scraper(self) -> Iterator[SrealityScraper]:
+        """This worker's scraper; its response cache is closed on exit."""
+
+        cache = ResponseCache(self.cache_dir, ttls=self.cache_ttls) if self.cache_dir else None
+        try:
+            yield SrealityScraper(concurrency=self.concurrency, cache=cache, rate_share=self.rate_share)
+        finally:
+            if cache is not None:
+                cache.close()
+
+
+def run_shards(
+    task: Callable[[Shard, ShardSettings], R],
+    shards: Sequence[Shard],
+    settings: ShardSettings,
+) -> Iterator[Tuple[Shard, R]]:
+    """Yield ``(shard, task(shard, settings))`` computed by a process pool.
+
+    ``task`` must be a picklable module-level function (or a
+    :func:`functools.partial` of one). Results are yielded in shard order,
+    not completion order, so merging them is deterministic.
+    """
+
+    shards = list(shards)
+    if not shards:
+        return
+    workers = max(1, min(settings.workers, len(shards)))
+    settings = dataclasses.replace(settings, workers=workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(task, shard, settings) for shard in shards]
+        for shard, future in zip(shards, futures):
+            yield shard, future.result()
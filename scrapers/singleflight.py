@@ -0,0 +1,81 @@
+"""Request coalescing: one network call per key for the lifetime of a run."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+
+R = TypeVar("R")
+
+
+class SingleFlight:
+    """Share one call and its parsed result between all callers of a key.
+
+    Concurrent callers of a key that is being fetched wait for the first
+    caller instead of issuing their own request; later callers get the stored
+    result. ``None`` results and exceptions are not stored, so a failed fetch
+    can be attempted again.
+
+    With ``max_entries`` only that many results are kept, least recently
+    used first out, so memory stays flat however many keys a run streams
+    through; an evicted key is simply fetched again.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._inflight: Dict[Hashable, threading.Event] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Optional[R]]) -> Optional[R]:
+        while True:
+            with self._lock:
+                if key in self._results:
+                    self.hits += 1
+                    self._results.move_to_end(key)
+                    return self._results[key]  # type: ignore[return-value]
+                event = self._inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    self.misses += 1
+                    break
+            # Jiné vlákno už tento klíč stahuje - počkej na jeho výsledek.
+            event.wait()
+            with self._lock:
+                if key in self._results:
+                    self.hits += 1
+                    return self._results[key]  # type: ignore[return-value]
+            # Vedoucí volání selhalo, zkus to sám.
+
+        try:
+            value = func()
+        except BaseException:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+            raise
+
+        with self._lock:
+            if value is not None:
+                self._results[key] = value
+                if self.max_entries is not None and len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+            del self._inflight[key]
+        event.set()
+        return value
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._results
+
+    def stats(self) -> str:
+        return f"{self.hits} sdílených, {self.misses} volání"
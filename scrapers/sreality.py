@@ -4,25 +4,50 @@ from __future__ import annotations
 
 import random
 import re
+import threading
 import time
 import unicodedata
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 from urllib.parse import urljoin, urlparse
 
 import requests
 
 from .base import BaseScraper, Record, ScraperResult
+from .cache import ResponseCache
+from .checkpoint import Checkpoint, section_key
+from .delta import DeltaSweep, ListingIndex
+from .engine import FetchEngine
+from .pagination import Paginator, listing_page_count
+from .ratelimit import AdaptiveRateController, TokenBucket
 from .registry import register
+from .retry import RETRYABLE_STATUSES, RetryBudget, RetryLater, backoff_delay, parse_retry_after
+from .singleflight import SingleFlight
 
 
 @dataclass
 class _Config:
     base_url: str = "https://www.sreality.cz"
     api_url: str = f"{base_url}/api/cs/v2/estates"
-    min_delay: float = 1.0
-    max_delay: float = 3.0
+    requests_per_second: float = 1.0
+    burst: int = 3
+    adaptive_rate: bool = True
+    min_requests_per_second: float = 0.1
+    # Strop adaptivního tempa = inzerovaný rozpočet (~60 detailů/min);
+    # regulátor při přetížení zpomalí a po zotavení se vrátí nejvýš sem
+    max_requests_per_second: float = 1.0
+    retries: int = 3
+    retry_budget_ratio: float = 0.1
+    concurrency: int = 4
+    contact_detail_limit: int = 3
+    incremental_known_run: int = 60
+    # Po kolika dnech projde přírůstkový běh celý výpis a odstraní stažené inzeráty
+    incremental_full_sweep_days: float = 7
+    # Kolik odpovědí (detailů, stránek RK) si běh drží pro opakované použití
+    shared_results: int = 2000
+    # Řazení výpisu od nejnovějších - přírůstkový průchod pak končí u známých inzerátů
+    newest_first = {"sort": 0}
     category_main = {1: "Byty", 2: "Domy", 3: "Pozemky", 4: "Komerční", 5: "Ostatní"}
     category_type = {1: "Prodej", 2: "Pronájem", 3: "Dražby"}
     user_agents = (
@@ -78,17 +103,123 @@ def _slugify_locality(value: Optional[str]) -> Optional[str]:
     return ascii_value or None
 
 
+def estate_category(
+    estate: Dict,
+    category_main: Optional[int] = None,
+    category_type: Optional[int] = None,
+) -> Tuple[Optional[int], Optional[int]]:
+    """``(category_main, category_type)`` of a listing estate from its ``seo`` block.
+
+    The arguments are the fallback used when the estate does not say, i.e.
+    the filter the listing was requested with.
+    """
+
+    seo = estate.get("seo") if isinstance(estate.get("seo"), dict) else {}
+    return seo.get("category_main_cb") or category_main, seo.get("category_type_cb") or category_type
+
+
+def sweep_combinations(
+    combinations: Sequence[Tuple[Optional[int], Optional[int], Optional[int]]],
+) -> Tuple[List[Tuple[Optional[int], Optional[int], Optional[int]]], Optional[Set[Tuple[int, int]]]]:
+    """Combinations for a single-sweep run and the category pairs to keep.
+
+    Each region is listed once without a category filter and the listings
+    are split by :func:`estate_category` locally. With a single category
+    pair the filtered query is cheaper (and ``max_pages`` keeps counting
+    pages of that category), so the combinations come back unchanged with
+    ``None`` categories.
+    """
+
+    categories = {(category_main, category_type) for category_main, category_type, _locality in combinations}
+    if len(categories) <= 1:
+        return list(combinations), None
+    return list(dict.fromkeys((None, None, locality) for _main, _type, locality in combinations)), categories
+
+
+def seller_fields(detail: Dict) -> Dict:
+    """The part of an estate detail that agent profiles read.
+
+    Seller, broker and company names and ids, the first phone and email,
+    category and locality - a small fraction of the full detail, so a run
+    can keep one per listing for reuse.
+    """
+
+    embedded = detail.get("_embedded") or {}
+
+    def pick(data: object, *names: str) -> Dict:
+        return {name: data[name] for name in names if name in data} if isinstance(data, dict) else {}
+
+    phone = SrealityScraper._first_phone(detail)
+    email = SrealityScraper._first_email(detail)
+    return {
+        "hash_id": detail.get("hash_id"),
+        "locality": detail.get("locality"),
+        "seo": pick(detail.get("seo"), "category_main_cb", "category_type_cb"),
+        "_embedded": {
+            "seller": pick(embedded.get("seller"), "user_id", "id", "user_name", "name", "company_name"),
+            "broker": pick(embedded.get("broker"), "user_id", "id", "user_name", "name"),
+            "company": pick(embedded.get("company"), "id", "name", "company_name"),
+            "phones": [phone] if phone else [],
+            "emails": [email] if email else [],
+        },
+    }
+
+
 @register
 class SrealityScraper(BaseScraper):
     slug = "sreality"
     name = "Sreality.cz"
     description = "Oficiální API, detailní kontakty, vyžaduje pomalé tempo požadavků."
-    rate_limit_info = "~60 detailů/min, respektovat náhodné prodlevy a reagovat na HTTP 429."
+    rate_limit_info = "~60 detailů/min (token bucket sdílený všemi vlákny), reagovat na HTTP 429."
     supports_full_scan = True
 
-    def __init__(self) -> None:
-        self._session = requests.Session()
+    def __init__(
+        self,
+        *,
+        concurrency: Optional[int] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_share: float = 1.0,
+    ) -> None:
         self._config = _Config()
+        self._cache = cache
+        if concurrency is not None:
+            self._config.concurrency = concurrency
+        if rate_share != 1.0:
+            # Běh rozdělený do více procesů - každý má svůj díl rychlosti
+            self._config.requests_per_second *= rate_share
+            self._config.min_requests_per_second *= rate_share
+            self._config.max_requests_per_second *= rate_share
+            self._config.burst = max(1, round(self._config.burst * rate_share))
+        self._engine = FetchEngine(self._config.concurrency)
+        self._limiter = TokenBucket(self._config.requests_per_second, self._config.burst)
+        self._rate_control: Optional[AdaptiveRateController] = None
+        if self._config.adaptive_rate:
+            self._rate_control = AdaptiveRateController(
+                self._limiter,
+                min_rate=self._config.min_requests_per_second,
+                max_rate=self._config.max_requests_per_second,
+            )
+        self._retry_budget = RetryBudget(self._config.retry_budget_ratio)
+        # Detaily inzerátů a RK sdílené v rámci běhu - stejný hash_id nebo
+        # company_id se stahuje jen jednou. Drží se jen posledních
+        # shared_results odpovědí, aby paměť nerostla s délkou výpisu.
+        self._flights = SingleFlight(max_entries=self._config.shared_results)
+        # Údaje o prodejci z detailů fáze 1 (hash_id -> zkrácený detail) -
+        # fáze 2 je bere odsud místo stahování, bez ohledu na velikost výpisu
+        self._known_details: Dict[str, Dict] = {}
+        self._reused_details = 0
+        self._reuse_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def _session(self) -> requests.Session:
+        # requests.Session není bezpečně sdílitelná mezi vlákny - každé vlákno
+        # fetch enginu má vlastní.
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
 
     # ------------------------------------------------------------------
     # Public API
@@ -102,6 +233,9 @@ class SrealityScraper(BaseScraper):
         max_pages: Optional[int] = None,
         full_scan: bool = False,
         fetch_details: bool = True,
+        lazy_details: bool = False,
+        count_probe: bool = False,
+        checkpoint: Optional[Checkpoint] = None,
     ) -> ScraperResult:
         """
         EFEKTIVNÍ METODA: Najde aktivní makléře a získá jejich kompletní profily.
@@ -118,6 +252,10 @@ class SrealityScraper(BaseScraper):
             max_pages: Maximální počet stránek k procházení
             full_scan: Projít všechny stránky
             fetch_details: Stahovat detaily inzerátů pro přesnější kontakty
+            lazy_details: Ve fázi 2 stahovat detaily jen do nalezení telefonu a emailu
+            count_probe: Ve fázi 2 zjistit počty inzerátů dotazy per_page=1 místo procházení výpisu
+            checkpoint: Průběžně ukládaný stav běhu; hotové stránky a profily se při
+                pokračování znovu nestahují
 
         Returns:
             ScraperResult s kompletními profily aktivních makléřů
@@ -130,38 +268,33 @@ class SrealityScraper(BaseScraper):
         limit = max_pages if max_pages is not None else None
 
         # Fáze 1: Najdi aktivní makléře
-        active_user_ids = set()
-        page = 1
-
-        while True:
-            if limit is not None and page > limit:
-                break
-
-            params = {
-                "category_main_cb": category_main,
-                "category_type_cb": category_type,
-                "page": page,
-                "per_page": 60,
-            }
-
-            if locality_region_id is not None:
-                params["locality_region_id"] = locality_region_id
+        known: Dict[str, Dict] = {}
+        self._known_details = known
+        state: Dict = {}
+        if checkpoint is not None:
+            state = checkpoint.section(section_key("aktivni", category_main, category_type, locality_region_id))
+        active_user_ids = set(state.get("user_ids", []))
+
+        params = {
+            "category_main_cb": category_main,
+            "category_type_cb": category_type,
+            "per_page": 60,
+        }
 
-            payload = self._request(self._config.api_url, params=params)
-            if not payload:
-                break
+        if locality_region_id is not None:
+            params["locality_region_id"] = locality_region_id
 
+        pages = self._paginate(self._config.api_url, params, max_pages=limit, start_page=state.get("page", 0) + 1)
+        for page, payload in ([] if state.get("done") else pages):
             estates = payload.get("_embedded", {}).get("estates", [])
             if not estates:
                 break
 
             # Projdi inzeráty a získej user_id
-            for estate in estates:
-                if fetch_details:
-                    detail = self._fetch_detail(estate)
-                else:
-                    detail = estate
-
+            details = self._fetch_details(estates) if fetch_details else estates
+            for estate, detail in zip(estates, details):
+                if fetch_details and detail and detail is not estate and estate.get("hash_id"):
+                    known[str(estate["hash_id"])] = seller_fields(detail)
                 if detail:
                     embedded = detail.get("_embedded", {})
                     seller = embedded.get("seller", {})
@@ -177,24 +310,42 @@ class SrealityScraper(BaseScraper):
                     if user_id:
                         active_user_ids.add(str(user_id))
 
-            result_size = payload.get("result_size", 0)
-            if (page * 60) >= result_size:
-                break
+            if checkpoint is not None:
+                state.update(page=page, user_ids=sorted(active_user_ids))
+                if checkpoint.due():
+                    checkpoint.flush()
 
-            page += 1
-            self._delay()
+        if checkpoint is not None and pages.failed_page is None:
+            state["done"] = True
+            checkpoint.flush()
 
         print(f"✅ Nalezeno {len(active_user_ids)} aktivních makléřů")
 
         # Fáze 2: Získej kompletní profily
         print(f"\n🔍 Fáze 2: Získávám kompletní profily...")
 
-        result = self.scrape_agent_profiles(
-            agent_urls=list(active_user_ids),
-            fetch_details=fetch_details,
-        )
+        # Údaje z detailů fáze 1 jsou v self._known_details, takže fáze 2
+        # stejné hash_id znovu nestahuje.
+        reused_before = self._reused_details
+        try:
+            result = self.scrape_agent_profiles(
+                agent_urls=list(active_user_ids),
+                fetch_details=fetch_details,
+                lazy_details=lazy_details,
+                count_probe=count_probe,
+                checkpoint=checkpoint,
+            )
+        finally:
+            self._known_details = {}
+
+        if pages.failed_page is not None:
+            # Fáze 1 nedoběhla - makléři z dalších stránek ve výsledku chybí
+            result.errors.append(
+                f"Chyba při komunikaci se Sreality API (možná blokace), výpis skončil na stránce {pages.failed_page}."
+            )
 
         result.metadata.update({
+            "usetrena_volani_detailu": str(self._reused_details - reused_before),
             "metoda": "Aktivní makléři s kompletními profily",
             "kategorie": self._config.category_main.get(category_main, "Neznámé"),
             "typ": self._config.category_type.get(category_type, "Neznámé"),
@@ -207,6 +358,9 @@ class SrealityScraper(BaseScraper):
         *,
         agent_urls: list[str],
         fetch_details: bool = True,
+        lazy_details: bool = False,
+        count_probe: bool = False,
+        checkpoint: Optional[Checkpoint] = None,
     ) -> ScraperResult:
         """
         Scrape agent profiles from Sreality.cz.
@@ -214,12 +368,20 @@ class SrealityScraper(BaseScraper):
         Args:
             agent_urls: List of agent profile URLs or user IDs
             fetch_details: Whether to fetch detailed listing info
+            lazy_details: Count listings from the listing pages and fetch
+                details one by one only until a phone and an email are found
+            count_probe: Read listing counts per category from ``per_page=1``
+                queries instead of paging through all listings (implies
+                ``lazy_details``)
+            checkpoint: Run state; agents already processed in it are not
+                fetched again and new ones are added to it
 
         Returns:
             ScraperResult with agent data
         """
         records: Dict[str, Dict[str, object]] = {}
         result = ScraperResult()
+        done_profiles = checkpoint.section("profily") if checkpoint is not None else {}
 
         for agent_url in agent_urls:
             # Extract user_id from URL or use directly if it's an ID
@@ -229,15 +391,26 @@ class SrealityScraper(BaseScraper):
                 result.errors.append(f"Nelze extrahovat user_id z: {agent_url}")
                 continue
 
-            # Get all listings from this agent
-            agent_data = self._fetch_agent_listings(user_id, fetch_details)
+            agent_record = done_profiles.get(user_id)
+            if agent_record is None:
+                # Get all listings from this agent
+                agent_data = None
+                if count_probe:
+                    agent_data = self._probe_agent_listings(user_id, fetch_details)
+                if agent_data is None:
+                    agent_data = self._fetch_agent_listings(user_id, fetch_details, lazy_details=lazy_details)
+
+                if not agent_data:
+                    result.errors.append(f"Nepodařilo se načíst data pro user_id: {user_id}")
+                    continue
 
-            if not agent_data:
-                result.errors.append(f"Nepodařilo se načíst data pro user_id: {user_id}")
-                continue
+                # Process agent data
+                agent_record = self._process_agent_data(agent_data, user_id)
 
-            # Process agent data
-            agent_record = self._process_agent_data(agent_data, user_id)
+                if agent_record and checkpoint is not None:
+                    done_profiles[user_id] = agent_record
+                    if checkpoint.due():
+                        checkpoint.flush()
 
             if agent_record:
                 key = agent_record["jmeno_maklere"], agent_record.get("telefon"), agent_record.get("email"), agent_record.get("realitni_kancelar")
@@ -281,8 +454,12 @@ class SrealityScraper(BaseScraper):
                 "cas_exportu": datetime.utcnow().isoformat(),
                 "celkem_makleru": str(len(result.records)),
                 "typ_scrapovani": "Profily makléřů",
+                "tempo_pozadavku": f"{self._limiter.rate:.2f} req/s",
+                "sdilene_pozadavky": self._flights.stats(),
             }
         )
+        if self._cache is not None:
+            result.metadata["cache"] = self._cache.stats()
         return result
 
     def scrape(  # type: ignore[override]
@@ -294,7 +471,16 @@ class SrealityScraper(BaseScraper):
         max_pages: Optional[int] = None,
         full_scan: bool = False,
         fetch_details: bool = True,
+        index: Optional[ListingIndex] = None,
     ) -> ScraperResult:
+        """Aggregate agents from the listings of one category/region slice.
+
+        With ``index`` the run is incremental: the listing is walked newest
+        first, details are fetched only for listings that are new or whose
+        fingerprint changed, paging stops after a run of unchanged listings
+        and the agents of unchanged listings are taken from the index.
+        """
+
         if full_scan:
             max_pages = None
 
@@ -302,76 +488,95 @@ class SrealityScraper(BaseScraper):
         records: Dict[str, Dict[str, object]] = {}
         result = ScraperResult()
 
-        page = 1
-        while True:
-            if limit is not None and page > limit:
-                break
-
-            params = {
-                "category_main_cb": category_main,
-                "category_type_cb": category_type,
-                "page": page,
-                "per_page": 60,
-            }
-
-            if locality_region_id is not None:
-                params["locality_region_id"] = locality_region_id
-
-            payload = self._request(self._config.api_url, params=params)
-            if not payload:
-                result.errors.append("Chyba při komunikaci se Sreality API (možná blokace).")
-                break
+        params = {
+            "category_main_cb": category_main,
+            "category_type_cb": category_type,
+            "per_page": 60,
+        }
 
+        if locality_region_id is not None:
+            params["locality_region_id"] = locality_region_id
+
+        sweep: Optional[DeltaSweep] = None
+        if index is not None:
+            params.update(self._config.newest_first)
+            scope = section_key("scrape", category_main, category_type, locality_region_id, int(fetch_details))
+            sweep = DeltaSweep(
+                index,
+                scope,
+                known_run=self._config.incremental_known_run,
+                full_every=self._config.incremental_full_sweep_days * 24 * 60 * 60,
+            )
+
+        def add(agent_record: Record) -> None:
+            key = agent_record["jmeno_maklere"], agent_record.get("telefon"), agent_record.get("email"), agent_record.get("realitni_kancelar")
+            key_str = "|".join(value or "" for value in key)
+
+            aggregated = records.setdefault(
+                key_str,
+                {
+                    "zdroj": self.name,
+                    "jmeno_maklere": agent_record.get("jmeno_maklere") or "Neznámý makléř",
+                    "telefon": agent_record.get("telefon"),
+                    "email": agent_record.get("email"),
+                    "realitni_kancelar": agent_record.get("realitni_kancelar"),
+                    "kraj": agent_record.get("kraj"),
+                    "mesto": agent_record.get("mesto"),
+                    "specializace": set(),
+                    "detailni_informace": [],
+                    "odkazy": [],
+                    "profil_maklere": agent_record.get("profil_maklere"),
+                },
+            )
+
+            if agent_record.get("specializace"):
+                aggregated["specializace"].add(agent_record["specializace"])
+            if agent_record.get("detailni_informace"):
+                aggregated["detailni_informace"].append(agent_record["detailni_informace"])
+            if agent_record.get("odkazy"):
+                aggregated["odkazy"].extend(agent_record["odkazy"])
+
+        pages = self._paginate(self._config.api_url, params, max_pages=limit)
+        for _page, payload in pages:
             estates = payload.get("_embedded", {}).get("estates", [])
             if not estates:
                 break
 
-            for estate in estates:
-                if fetch_details:
-                    detail = self._fetch_detail(estate)
-                else:
-                    detail = estate
+            if sweep is not None:
+                estates = sweep.select(estates)
 
+            # Změněné inzeráty se stahují mimo cache - detail z cache je
+            # starší než změna, kvůli které se stahuje znovu
+            fresh = sweep.changed_ids(estates) if sweep is not None else frozenset()
+            details = self._fetch_details(estates, fresh) if fetch_details else estates
+            for estate, detail in zip(estates, details):
                 if not detail:
                     continue
 
-                agent_record = self._extract_agent(detail, estate)
-                if not agent_record:
+                if sweep is not None and fetch_details and detail is estate:
+                    # Detail se nestáhl - záznam jen z výpisu se neukládá,
+                    # jinak by se detail příště už nestahoval
                     continue
 
-                key = agent_record["jmeno_maklere"], agent_record.get("telefon"), agent_record.get("email"), agent_record.get("realitni_kancelar")
-                key_str = "|".join(value or "" for value in key)
-
-                aggregated = records.setdefault(
-                    key_str,
-                    {
-                        "zdroj": self.name,
-                        "jmeno_maklere": agent_record.get("jmeno_maklere") or "Neznámý makléř",
-                        "telefon": agent_record.get("telefon"),
-                        "email": agent_record.get("email"),
-                        "realitni_kancelar": agent_record.get("realitni_kancelar"),
-                        "kraj": agent_record.get("kraj"),
-                        "mesto": agent_record.get("mesto"),
-                        "specializace": set(),
-                        "detailni_informace": [],
-                        "odkazy": [],
-                        "profil_maklere": agent_record.get("profil_maklere"),
-                    },
-                )
-
-                if agent_record.get("specializace"):
-                    aggregated["specializace"].add(agent_record["specializace"])
-                if agent_record.get("detailni_informace"):
-                    aggregated["detailni_informace"].append(agent_record["detailni_informace"])
-                if agent_record.get("odkazy"):
-                    aggregated["odkazy"].extend(agent_record["odkazy"])
+                agent_record = self._extract_agent(detail, estate)
+                if sweep is not None:
+                    # I inzerát bez makléře se uloží, aby se příště nestahoval
+                    sweep.store(estate.get("hash_id"), agent_record or {})
+                elif agent_record:
+                    add(agent_record)
 
-            result_size = payload.get("result_size", 0)
-            if (page * 60) >= result_size:
+            if sweep is not None and sweep.stopped:
                 break
 
-            page += 1
-            self._delay()
+        if pages.failed_page is not None:
+            result.errors.append("Chyba při komunikaci se Sreality API (možná blokace).")
+
+        if sweep is not None:
+            complete = pages.failed_page is None and (limit is None or (pages.total_pages or 0) <= limit)
+            for agent_record in sweep.finish(complete=complete):
+                if agent_record:
+                    add(agent_record)
+            result.metadata["prirustkovy_rezim"] = sweep.stats()
 
         for aggregated in records.values():
             aggregated["specializace"] = ", ".join(sorted(aggregated["specializace"])) or None
@@ -386,8 +591,12 @@ class SrealityScraper(BaseScraper):
                 "celkem_makleru": str(len(result.records)),
                 "kategorie": self._config.category_main.get(category_main, "Neznámé"),
                 "typ": self._config.category_type.get(category_type, "Neznámé"),
+                "tempo_pozadavku": f"{self._limiter.rate:.2f} req/s",
+                "sdilene_pozadavky": self._flights.stats(),
             }
         )
+        if self._cache is not None:
+            result.metadata["cache"] = self._cache.stats()
         return result
 
     # ------------------------------------------------------------------
@@ -420,60 +629,126 @@ class SrealityScraper(BaseScraper):
 
         return None
 
-    def _fetch_agent_listings(self, user_id: str, fetch_details: bool = True) -> Optional[Dict]:
-        """Fetch all listings for a specific agent."""
-        all_listings = []
-        agent_info = {}
-        page = 1
-
-        while True:
-            params = {
-                "user_id": user_id,
-                "page": page,
-                "per_page": 60,
-            }
-
-            payload = self._request(self._config.api_url, params=params)
+    def _fetch_agent_listings(
+        self,
+        user_id: str,
+        fetch_details: bool = True,
+        *,
+        lazy_details: bool = False,
+    ) -> Optional[Dict]:
+        """Fetch all listings for a specific agent.
 
-            if not payload:
-                break
+        With ``lazy_details`` the listings stay as returned by the listing
+        pages (enough for counts, breakdown and locality) and only the few
+        details needed for contacts are fetched, see :meth:`_fetch_contact_details`.
+        """
+        all_listings = []
+        params = {
+            "user_id": user_id,
+            "per_page": 60,
+        }
 
+        for _page, payload in self._paginate(self._config.api_url, params):
             estates = payload.get("_embedded", {}).get("estates", [])
 
             if not estates:
                 break
 
-            for estate in estates:
-                if fetch_details:
-                    detail = self._fetch_detail(estate)
-                else:
-                    detail = estate
+            details = self._fetch_details(estates) if fetch_details and not lazy_details else estates
+            all_listings.extend(detail for detail in details if detail)
 
-                if detail:
-                    all_listings.append(detail)
-                    # Extract agent info from first listing if we don't have it yet
-                    if not agent_info and detail.get("_embedded"):
-                        embedded = detail.get("_embedded", {})
-                        agent_info = {
-                            "seller": embedded.get("seller", {}),
-                            "broker": embedded.get("broker", {}),
-                            "company": embedded.get("company", {}),
-                        }
-
-            result_size = payload.get("result_size", 0)
-            if (page * 60) >= result_size:
-                break
-
-            page += 1
-            self._delay()
+        contact_listings = all_listings
+        if fetch_details and lazy_details:
+            contact_listings = self._fetch_contact_details(all_listings)
 
         return {
             "user_id": user_id,
             "listings": all_listings,
-            "agent_info": agent_info,
+            "contact_listings": contact_listings,
+            "agent_info": self._agent_info(contact_listings) or self._agent_info(all_listings),
             "total_count": len(all_listings),
         }
 
+    def _probe_agent_listings(self, user_id: str, fetch_details: bool = True) -> Optional[Dict]:
+        """Agent listing counts from one ``per_page=1`` query per category pair.
+
+        Each query returns ``result_size`` for its (category_main, category_type)
+        pair plus one sample listing, which is enough for the breakdown, the
+        locality and the contact details. That is at most 15 small requests per
+        agent regardless of how many listings the agent has. Returns ``None``
+        when a probe fails, so the caller can fall back to paging.
+        """
+        pairs = [
+            (category_main, category_type)
+            for category_main in self._config.category_main
+            for category_type in self._config.category_type
+        ]
+
+        def probe(pair: Tuple[int, int]) -> Optional[Dict]:
+            params = {
+                "user_id": user_id,
+                "category_main_cb": pair[0],
+                "category_type_cb": pair[1],
+                "per_page": 1,
+            }
+            return self._request_once(self._config.api_url, params=params)
+
+        payloads = self._engine.map(probe, pairs, attempts=self._config.retries)
+        if any(payload is None for payload in payloads):
+            return None
+
+        counts = {}
+        samples = []
+        for pair, payload in zip(pairs, payloads):
+            count = payload.get("result_size", 0) or 0
+            if not count:
+                continue
+            counts[pair] = count
+            samples.extend(payload.get("_embedded", {}).get("estates", [])[:1])
+
+        contact_listings = self._fetch_contact_details(samples) if fetch_details else samples
+        return {
+            "user_id": user_id,
+            "listings": samples,
+            "contact_listings": contact_listings,
+            "category_counts": counts,
+            "agent_info": self._agent_info(contact_listings) or self._agent_info(samples),
+            "total_count": sum(counts.values()),
+        }
+
+    def _fetch_contact_details(self, estates: List[Dict]) -> List[Dict]:
+        """Fetch details one at a time until both a phone and an email are known.
+
+        At most ``contact_detail_limit`` details are fetched - the same number
+        of listings :meth:`_process_agent_data` looks at for contacts.
+        """
+        details = []
+        phone = None
+        email = None
+        for estate in estates[: self._config.contact_detail_limit]:
+            detail = self._fetch_detail(estate)
+            if not detail:
+                continue
+            details.append(detail)
+            phone = phone or self._first_phone(detail)
+            email = email or self._first_email(detail)
+            if phone and email:
+                break
+        return details
+
+    @staticmethod
+    def _agent_info(listings: Iterable[Dict]) -> Dict:
+        # Údaje o makléři z prvního inzerátu, který je obsahuje
+        for listing in listings:
+            embedded = listing.get("_embedded")
+            if embedded:
+                return {
+                    "seller": embedded.get("seller", {}),
+                    "broker": embedded.get("broker", {}),
+                    "company": embedded.get("company", {}),
+                }
+        return {}
+
     def _process_agent_data(self, agent_data: Dict, user_id: str) -> Optional[Record]:
         """Process agent data and extract contact information with aggregated stats."""
         if not agent_data or not agent_data.get("listings"):
@@ -503,7 +778,8 @@ class SrealityScraper(BaseScraper):
         # Try to get phone and email from first listing
         phone = None
         email = None
-        for listing in listings[:3]:  # Check first 3 listings
+        contact_listings = agent_data.get("contact_listings", listings)
+        for listing in contact_listings[:3]:  # Check first 3 listings
             if not phone:
                 phone = self._first_phone(listing)
             if not email:
@@ -514,7 +790,8 @@ class SrealityScraper(BaseScraper):
         # Agreguj statistiky podle typu inzerátu
         # Kategorie: 1=Byty, 2=Domy, 3=Pozemky, 4=Komerční, 5=Ostatní
         # Typ: 1=Prodej, 2=Pronájem, 3=Dražby
-        stats = {}
+        # Počty z count-probe režimu jsou přesné, výpis obsahuje jen vzorky
+        stats = dict(agent_data.get("category_counts") or {})
         localities = []
 
         for listing in listings:
@@ -523,7 +800,7 @@ class SrealityScraper(BaseScraper):
             category_main = seo.get("category_main_cb")
             category_type = seo.get("category_type_cb")
 
-            if category_main and category_type:
+            if category_main and category_type and "category_counts" not in agent_data:
                 key = (category_main, category_type)
                 stats[key] = stats.get(key, 0) + 1
 
@@ -563,47 +840,177 @@ class SrealityScraper(BaseScraper):
             "kraj": region,
             "mesto": city,
             "profil_url": profile_url,
-            "pocet_inzeratu": len(listings),
+            "pocet_inzeratu": agent_data.get("total_count", len(listings)),
             "rozlozeni_inzeratu": breakdown_text,
         }
 
     # ------------------------------------------------------------------
     # Internals
     # ------------------------------------------------------------------
-    def _request(self, url: str, *, params: Optional[Dict[str, object]] = None, retries: int = 3) -> Optional[Dict]:
+    def _request(
+        self, url: str, *, params: Optional[Dict[str, object]] = None, retries: int = 3, fresh: bool = False
+    ) -> Optional[Dict]:
+        send = self._send_once if fresh else self._request_once
         for attempt in range(retries):
             try:
-                headers = {
-                    "User-Agent": random.choice(self._config.user_agents),
-                    "Accept": "application/json, text/plain, */*",
-                    "Accept-Language": "cs-CZ,cs;q=0.9,en;q=0.8",
-                    "Referer": "https://www.sreality.cz/",
-                }
-                response = self._session.get(url, params=params, headers=headers, timeout=30)
-                if response.status_code == 200:
-                    return response.json()
-                if response.status_code == 429:
-                    wait_time = (2 ** attempt) * 5
-                    time.sleep(wait_time)
-                    continue
-            except Exception:
+                return send(url, params=params)
+            except RetryLater as exc:
                 if attempt == retries - 1:
                     return None
-                time.sleep(2 ** attempt)
+                time.sleep(backoff_delay(attempt, exc.retry_after))
         return None
 
-    def _delay(self) -> None:
-        time.sleep(random.uniform(self._config.min_delay, self._config.max_delay))
+    def _request_once(self, url: str, *, params: Optional[Dict[str, object]] = None) -> Optional[Dict]:
+        """Send one request.
+
+        Returns the payload, ``None`` for a final failure, or raises
+        :class:`RetryLater` for a retryable one (429, 5xx, network error)
+        while the retry budget allows it. The caller decides whether to sleep
+        or to put the request on a delayed queue.
+
+        Payloads found in the response cache are returned without touching
+        the network or the rate limiter.
+        """
+        if self._cache is not None:
+            cached = self._cache.get(url, params)
+            if cached is not None:
+                return cached
+        return self._send_once(url, params=params)
+
+    def _send_once(self, url: str, *, params: Optional[Dict[str, object]] = None) -> Optional[Dict]:
+        """:meth:`_request_once` without the cache lookup.
+
+        For data known to have changed since it may have been cached; the
+        new payload still replaces the cached one.
+        """
+
+        headers = {
+            "User-Agent": random.choice(self._config.user_agents),
+            "Accept": "application/json, text/plain, */*",
+            "Accept-Language": "cs-CZ,cs;q=0.9,en;q=0.8",
+            "Referer": "https://www.sreality.cz/",
+        }
+        self._limiter.acquire()
+        self._retry_budget.record_request()
+        started = time.monotonic()
+        try:
+            response = self._session.get(url, params=params, headers=headers, timeout=30)
+        except requests.RequestException as exc:
+            self._record_response(None, time.monotonic() - started)
+            return self._retry_or_give_up(None, f"síťová chyba: {exc}")
+        self._record_response(response.status_code, time.monotonic() - started)
+
+        if response.status_code == 200:
+            try:
+                payload = response.json()
+            except ValueError:
+                return None
+            if self._cache is not None:
+                self._cache.set(url, params, payload)
+            return payload
+        if response.status_code in RETRYABLE_STATUSES:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            return self._retry_or_give_up(retry_after, f"HTTP {response.status_code}")
+        return None
+
+    def _paginate(
+        self,
+        url: str,
+        params: Dict[str, object],
+        *,
+        max_pages: Optional[int] = None,
+        page_count: Callable[[Dict], int] = listing_page_count,
+        start_page: int = 1,
+    ) -> Paginator:
+        """Pages of ``url``; pages after the first are fetched concurrently."""
+
+        def fetch_page(page: int) -> Optional[Dict]:
+            return self._request_once(url, params={**params, "page": page})
+
+        return Paginator(
+            fetch_page,
+            engine=self._engine,
+            max_pages=max_pages,
+            page_count=page_count,
+            attempts=self._config.retries,
+            start_page=start_page,
+        )
+
+    def _retry_or_give_up(self, retry_after: Optional[float], reason: str) -> None:
+        if not self._retry_budget.try_spend():
+            return None
+        raise RetryLater(retry_after, reason)
+
+    def _record_response(self, status: Optional[int], latency: float) -> None:
+        if self._rate_control is not None:
+            self._rate_control.record(status, latency)
+
+    def _fetch_details(self, estates: Iterable[Dict], fresh: Set[str] = frozenset()) -> List[Optional[Dict]]:
+        """Fetch details of several estates concurrently, preserving order.
+
+        Throttled requests go back on the engine's delayed queue instead of
+        blocking a worker, so healthy detail calls keep flowing meanwhile.
+        Details of the ``hash_id``s in ``fresh`` bypass the response cache.
+        """
+        estates = list(estates)
+        details = self._engine.map(
+            lambda estate: self._fetch_detail_once(estate, fresh=str(estate.get("hash_id")) in fresh),
+            estates,
+            attempts=self._config.retries,
+        )
+        return [detail or estate for estate, detail in zip(estates, details)]
+
+    def _fetch_detail_once(self, estate: Dict, fresh: bool = False) -> Optional[Dict]:
+        hash_id = estate.get("hash_id")
+        if not hash_id:
+            return estate
+        known = None if fresh else self._known_detail(hash_id)
+        if known is not None:
+            return known
+        url = self._estate_url(hash_id)
+        send = self._send_once if fresh else self._request_once
+        return self._flights.do(self._estate_key(hash_id, fresh), lambda: send(url))
 
     def _fetch_detail(self, estate: Dict) -> Optional[Dict]:
         hash_id = estate.get("hash_id")
         if not hash_id:
             return estate
-        detail_url = f"{self._config.base_url}/api/cs/v2/estates/{hash_id}"
-        detail = self._request(detail_url)
-        if detail:
-            self._delay()
-        return detail or estate
+        return self._known_detail(hash_id) or self._fetch_estate(hash_id) or estate
+
+    def _known_detail(self, hash_id: object) -> Optional[Dict]:
+        """Seller fields of a detail fetched earlier in this run, if any."""
+        known = self._known_details.get(str(hash_id))
+        if known is not None:
+            with self._reuse_lock:
+                self._reused_details += 1
+        return known
+
+    def _fetch_estate(self, hash_id: object, fresh: bool = False) -> Optional[Dict]:
+        """Detail of one estate; repeated calls in the run share one request.
+
+        ``fresh`` bypasses the response cache, for a listing that changed
+        since its detail may have been cached.
+        """
+        url = self._estate_url(hash_id)
+        return self._flights.do(self._estate_key(hash_id, fresh), lambda: self._request(url, fresh=fresh))
+
+    @staticmethod
+    def _estate_key(hash_id: object, fresh: bool) -> Tuple[str, ...]:
+        # Čerstvý detail se nesmí vzít z dřívějšího sdíleného požadavku, který
+        # mohl přijít z cache
+        return ("estate", str(hash_id), "fresh") if fresh else ("estate", str(hash_id))
+
+    def _fetch_company(self, company_id: object, page: int = 1) -> Optional[Dict]:
+        """One page of a company profile including its sellers, shared like estates."""
+        url = f"{self._config.base_url}/api/cs/v2/companies/{company_id}"
+        params = {"page": page} if page > 1 else None
+        return self._flights.do(
+            ("company", str(company_id), page),
+            lambda: self._request(url, params=params),
+        )
+
+    def _estate_url(self, hash_id: object) -> str:
+        return f"{self._config.base_url}/api/cs/v2/estates/{hash_id}"
 
     def _extract_agent(self, detail: Dict, estate: Dict) -> Optional[Record]:
         embedded = detail.get("_embedded", {})
@@ -0,0 +1,223 @@
+"""Reading many exported workbooks - in worker processes, one file per task.
+
+Parsed tables are kept in JSON sidecar files next to the workbooks, so
+re-reading an unchanged archive of exports skips the xlsx parsing altogether.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+import pandas as pd
+
+from .export import read_table
+
+
+R = TypeVar("R")
+
+
+def map_files(
+    func: Callable[[Path], R],
+    paths: Iterable[Path],
+    *,
+    workers: Optional[int] = None,
+) -> Iterator[Tuple[Path, R]]:
+    """Yield ``(path, func(path))`` for every file, parsed by a process pool.
+
+    Parsing xlsx is CPU-bound, so files are read in ``workers`` processes
+    (default: one per core). ``func`` should return a small per-file partial
+    aggregate rather than the whole parsed frame; at most ``2 * workers``
+    results are pending at any time, so the caller can fold partials in as
+    they arrive and memory does not grow with the number of files.
+
+    Results are yielded in input order, so a fold is deterministic. ``func``
+    must be a picklable module-level function. With one worker (or one
+    file) everything runs in the calling process.
+    """
+
+    paths = list(paths)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    if workers == 1:
+        for path in paths:
+            yield path, func(path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Tuple[Path, "Future[R]"]] = deque()
+        for path in paths:
+            pending.append((path, pool.submit(func, path)))
+            if len(pending) >= 2 * workers:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+
+
+def file_hash(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of the file content."""
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_TIME_TYPES = {"datetime": pd.Timestamp, "date": dt.date, "time": dt.time}
+
+
+def _encode_value(value: Any) -> Any:
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    for name, kind in (("datetime", dt.datetime), ("date", dt.date), ("time", dt.time)):
+        if isinstance(value, kind):
+            return {"$" + name: value.isoformat()}
+    raise TypeError(f"Hodnotu typu {type(value).__name__} nelze uložit do mezipaměti")
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        (tag, text), = value.items()
+        kind = _TIME_TYPES[tag[1:]]
+        return kind.fromisoformat(text)
+    return value
+
+
+def table_to_json(table: pd.DataFrame) -> str:
+    """One line of JSON with the columns, dtypes and values of ``table``.
+
+    Plain data only (text, numbers, booleans, missing values, dates), so
+    reading it back never runs code. Values keep their Python type, so
+    mixed text/number columns (phone numbers) come back unchanged. The
+    index is not kept - cached tables use the default range index.
+    """
+
+    columns = [
+        {
+            "name": _encode_value(name),
+            "dtype": str(table[name].dtype),
+            "values": [_encode_value(value) for value in table[name].tolist()],
+        }
+        for name in table.columns
+    ]
+    return json.dumps({"columns": columns}, ensure_ascii=False, separators=(",", ":"))
+
+
+def table_from_json(text: str) -> pd.DataFrame:
+    columns = json.loads(text)["columns"]
+    return pd.DataFrame({
+        _decode_value(column["name"]): pd.Series(
+            [_decode_value(value) for value in column["values"]], dtype=column["dtype"]
+        )
+        for column in columns
+    })
+
+
+class WorkbookCache:
+    """Parsed tables of workbooks, reused while the workbook is unchanged.
+
+    Each table is kept as JSON (:func:`table_to_json`) in a sidecar file in
+    a ``.parsed`` directory next to its workbook (or in ``directory``),
+    together with the workbook's path, size, mtime and content hash. An
+    entry is reused when size and mtime still match; when only the mtime
+    changed (a copied or touched file), the content hash decides and the
+    entry is refreshed. Any other change parses the workbook again and
+    replaces the entry. An entry that cannot be read is parsed again too.
+
+    ``kind`` names what ``reader`` produces (e.g. a table with normalised
+    columns), so different readers of one workbook keep separate entries.
+    The cache only holds paths, so it can be passed to worker processes;
+    writing an entry never fails the read.
+    """
+
+    dirname = ".parsed"
+    version = 2
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None) -> None:
+        self.directory = Path(directory) if directory else None
+
+    def entry_path(self, path: Path, kind: str) -> Path:
+        directory = self.directory or path.parent / self.dirname
+        key = hashlib.sha1(f"{path.resolve()}|{kind}".encode("utf-8")).hexdigest()[:16]
+        return directory / f"{path.name}.{kind}.{key}.json"
+
+    def read(
+        self,
+        path: Union[str, Path],
+        reader: Callable[[Path], pd.DataFrame] = read_table,
+        kind: str = "table",
+    ) -> Tuple[pd.DataFrame, bool]:
+        """``(reader(path), cached)`` - from the sidecar entry when it is current."""
+
+        path = Path(path)
+        stat = path.stat()
+        entry = self.entry_path(path, kind)
+        meta = self._load_meta(entry)
+        if meta is not None and meta["size"] == stat.st_size:
+            digest = None
+            if meta["mtime_ns"] != stat.st_mtime_ns:
+                digest = file_hash(path)
+            if digest is None or meta["sha256"] == digest:
+                table = self._load_table(entry)
+                if table is not None:
+                    if digest is not None:
+                        self._store(entry, path, stat, digest, table)
+                    return table, True
+
+        table = reader(path)
+        self._store(entry, path, stat, None, table)
+        return table, False
+
+    def _load_meta(self, entry: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(entry, encoding="utf-8") as handle:
+                meta = json.loads(handle.readline())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(meta, dict) or meta.get("version") != self.version:
+            return None
+        return meta
+
+    @staticmethod
+    def _load_table(entry: Path) -> Optional[pd.DataFrame]:
+        try:
+            with open(entry, encoding="utf-8") as handle:
+                handle.readline()  # hlavička
+                return table_from_json(handle.readline())
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def _store(
+        self, entry: Path, path: Path, stat: os.stat_result, digest: Optional[str], table: pd.DataFrame
+    ) -> None:
+        temp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            meta = {
+                "version": self.version,
+                "path": str(path.resolve()),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest or file_hash(path),
+            }
+            data = table_to_json(table)
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp, "w", encoding="utf-8") as handle:
+                handle.write(json.dumps(meta) + "\n")
+                handle.write(data + "\n")
+            os.replace(temp, entry)
+        except (OSError, TypeError, ValueError):
+            # Mezipaměť je jen zrychlení - bez zápisu se soubor příště načte znovu
+            temp.unlink(missing_ok=True)
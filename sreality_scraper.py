@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import requests
+import threading
 import time
 import random
 import pandas as pd
@@ -12,6 +13,10 @@ from urllib.parse import urljoin, urlparse
 
 from scrapers import get_scraper, list_scrapers
 from scrapers.base import BaseScraper, ScraperResult
+from scrapers.engine import FetchEngine
+from scrapers.pagination import Paginator
+from scrapers.ratelimit import TokenBucket
+from scrapers.retry import RETRYABLE_STATUSES, RetryBudget, RetryLater, backoff_delay, parse_retry_after, run_with_retries
 
 class Config:
     BASE_URL = "https://www.sreality.cz"
@@ -20,8 +25,11 @@ class Config:
     CATEGORY_MAIN = {1: "Byty", 2: "Domy", 3: "Pozemky", 4: "Komerční", 5: "Ostatní"}
     CATEGORY_TYPE = {1: "Prodej", 2: "Pronájem", 3: "Dražby"}
 
-    MIN_DELAY = 1
-    MAX_DELAY = 3
+    REQUESTS_PER_SECOND = 1.0
+    BURST = 3
+    RETRIES = 3
+    RETRY_BUDGET_RATIO = 0.1
+    CONCURRENCY = 4
 
     USER_AGENTS = [
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -35,11 +43,23 @@ class Config:
 class AgentScraper:
     def __init__(self, verbose: bool = True):
         self.config = Config()
-        self.session = requests.Session()
         self.verbose = verbose
         self.agents: Dict[str, Dict] = {}
+        self.limiter = TokenBucket(self.config.REQUESTS_PER_SECOND, self.config.BURST)
+        self.retry_budget = RetryBudget(self.config.RETRY_BUDGET_RATIO)
+        self.engine = FetchEngine(self.config.CONCURRENCY)
+        self._local = threading.local()
         self.config.OUTPUT_DIR.mkdir(exist_ok=True)
 
+    @property
+    def session(self) -> requests.Session:
+        # Stránky výpisu se stahují z více vláken, každé má vlastní session
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
     def _get_headers(self) -> Dict[str, str]:
         return {
             'User-Agent': random.choice(self.config.USER_AGENTS),
@@ -48,39 +68,54 @@ class AgentScraper:
             'Referer': 'https://www.sreality.cz/',
         }
 
-    def _delay(self):
-        delay = random.uniform(self.config.MIN_DELAY, self.config.MAX_DELAY)
-        time.sleep(delay)
-
     def _make_request(self, url: str, params: Dict = None, retries: int = 3) -> Optional[Dict]:
         for attempt in range(retries):
             try:
-                headers = self._get_headers()
-                response = self.session.get(url, params=params, headers=headers, timeout=30)
-
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 429:
-                    wait_time = (2 ** attempt) * 5
-                    if self.verbose:
-                        print(f"  ⚠️  Rate limit! Čekám {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    if self.verbose:
-                        print(f"  ❌ HTTP {response.status_code}")
+                return self._request_once(url, params)
+            except RetryLater as e:
+                if attempt == retries - 1:
                     return None
+                wait_time = backoff_delay(attempt, e.retry_after)
+                if self.verbose:
+                    print(f"  ⚠️  {e.reason}! Čekám {wait_time:.0f}s...")
+                time.sleep(wait_time)
+
+        return None
+
+    def _request_once(self, url: str, params: Dict = None) -> Optional[Dict]:
+        """Jeden pokus o request; při dočasné chybě vyhodí RetryLater (pokud to dovolí retry budget)."""
+        headers = self._get_headers()
+        self.limiter.acquire()
+        self.retry_budget.record_request()
 
-            except Exception as e:
-                if self.verbose and attempt == retries - 1:
-                    print(f"  ❌ {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=30)
+        except requests.RequestException as e:
+            if self.verbose:
+                print(f"  ❌ {str(e)}")
+            return self._retry_or_give_up(None, "Chyba sítě")
+
+        if response.status_code == 200:
+            try:
+                return response.json()
+            except ValueError:
                 return None
 
+        if response.status_code in RETRYABLE_STATUSES:
+            reason = "Rate limit" if response.status_code == 429 else f"HTTP {response.status_code}"
+            return self._retry_or_give_up(parse_retry_after(response.headers.get('Retry-After')), reason)
+
+        if self.verbose:
+            print(f"  ❌ HTTP {response.status_code}")
         return None
 
+    def _retry_or_give_up(self, retry_after: Optional[float], reason: str) -> None:
+        if not self.retry_budget.try_spend():
+            if self.verbose:
+                print(f"  ❌ {reason} - vyčerpán retry budget, přeskakuji")
+            return None
+        raise RetryLater(retry_after, reason)
+
     def scrape_agents(self,
                      category_main: int = 1,
                      category_type: int = 1,
@@ -106,32 +141,28 @@ class AgentScraper:
             print(f"📄 Max. stránek: {max_pages}")
         print(f"=" * 60 + "\n")
 
-        page = 1
         total_listings = 0
 
-        while page <= max_pages:
-            params = {
-                'category_main_cb': category_main,
-                'category_type_cb': category_type,
-                'page': page,
-                'per_page': 60,
-            }
+        params = {
+            'category_main_cb': category_main,
+            'category_type_cb': category_type,
+            'per_page': 60,
+        }
 
-            if locality_region_id:
-                params['locality_region_id'] = locality_region_id
+        if locality_region_id:
+            params['locality_region_id'] = locality_region_id
+
+        # Po první stránce je znám počet stránek, další se stahují souběžně
+        pages = Paginator(
+            lambda page: self._request_once(self.config.API_URL, {**params, 'page': page}),
+            engine=self.engine,
+            max_pages=max_pages,
+            attempts=self.config.RETRIES,
+        )
 
+        for page, data in pages:
             if self.verbose:
-                if unlimited:
-                    print(f"📄 Stránka {page}...", end=' ')
-                else:
-                    print(f"📄 Stránka {page}/{max_pages}...", end=' ')
-
-            data = self._make_request(self.config.API_URL, params)
-
-            if not data:
-                print(f"❌ CHYBA! Pravděpodobně Cloudflare blokace.")
-                print(f"   Zkus to znovu za chvíli, nebo z jiné sítě.")
-                break
+                print(f"📄 Stránka {page}/{min(max_pages, pages.total_pages)}...", end=' ')
 
             estates = data.get('_embedded', {}).get('estates', [])
 
@@ -139,10 +170,14 @@ class AgentScraper:
                 print(f"✓ Konec")
                 break
 
-            for estate in estates:
-                if fetch_details:
-                    self._process_estate_detail(estate)
-                else:
+            if fetch_details:
+                # Přiškrcené requesty jdou do fronty se zpožděním, ostatní detaily běží dál
+                details = run_with_retries(self._fetch_estate_detail_once, estates, attempts=self.config.RETRIES)
+                for estate, detail in zip(estates, details):
+                    if detail:
+                        self._extract_agent_info(detail, estate)
+            else:
+                for estate in estates:
                     self._process_estate_basic(estate)
 
             total_listings += len(estates)
@@ -150,30 +185,23 @@ class AgentScraper:
             if self.verbose:
                 print(f"✓ {len(estates)} inzerátů | {len(self.agents)} makléřů")
 
-            result_size = data.get('result_size', 0)
-            if page * 60 >= result_size:
-                print(f"\n✓ Konec výsledků ({result_size} celkem)")
-                break
+            if page == pages.total_pages:
+                print(f"\n✓ Konec výsledků ({data.get('result_size', 0)} celkem)")
 
-            page += 1
-            self._delay()
+        if pages.failed_page is not None:
+            print(f"❌ CHYBA na stránce {pages.failed_page}! Pravděpodobně Cloudflare blokace.")
+            print(f"   Zkus to znovu za chvíli, nebo z jiné sítě.")
 
         print(f"\n✨ Dokončeno! {len(self.agents)} makléřů z {total_listings} inzerátů")
         return list(self.agents.values())
 
-    def _process_estate_detail(self, estate: Dict):
+    def _fetch_estate_detail_once(self, estate: Dict) -> Optional[Dict]:
         hash_id = estate.get('hash_id')
         if not hash_id:
-            return
+            return None
 
         detail_url = f"{self.config.BASE_URL}/api/cs/v2/estates/{hash_id}"
-        detail = self._make_request(detail_url)
-
-        if not detail:
-            return
-
-        self._extract_agent_info(detail, estate)
-        self._delay()
+        return self._request_once(detail_url)
 
     def _process_estate_basic(self, estate: Dict):
         self._extract_agent_info(estate, estate)
@@ -0,0 +1,54 @@
+import pytest
+
+from scrapers.cache import ResponseCache, cache_key, endpoint_class, parse_ttl_overrides
+
+API = "https://www.sreality.cz/api/cs/v2"
+
+
+def test_endpoint_classes():
+    assert endpoint_class(f"{API}/estates") == "listing"
+    assert endpoint_class(f"{API}/estates/123456") == "estate"
+    assert endpoint_class(f"{API}/companies/42") == "company"
+
+
+def test_cache_key_ignores_param_order():
+    assert cache_key(f"{API}/estates", {"page": 2, "per_page": 60}) == cache_key(
+        f"{API}/estates", {"per_page": 60, "page": 2}
+    )
+
+
+def test_roundtrip_and_ttl_expiry(tmp_path):
+    cache = ResponseCache(tmp_path, ttls={"listing": 0})
+    cache.set(f"{API}/estates/1", None, {"hash_id": 1})
+    cache.set(f"{API}/estates", {"page": 1}, {"result_size": 10})
+
+    assert cache.get(f"{API}/estates/1") == {"hash_id": 1}
+    assert cache.get(f"{API}/estates", {"page": 1}) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    reopened = ResponseCache(tmp_path)
+    assert reopened.get(f"{API}/estates", {"page": 1}) == {"result_size": 10}
+
+
+def test_parse_ttl_overrides_rejects_unknown_kind():
+    assert parse_ttl_overrides(["estate=60"]) == {"estate": 60.0}
+    with pytest.raises(ValueError):
+        parse_ttl_overrides(["foo=1"])
+
+
+def test_expired_rows_are_purged_on_open_so_the_file_stops_growing(tmp_path, monkeypatch):
+    import scrapers.cache
+
+    now = [1_000_000.0]
+    monkeypatch.setattr(scrapers.cache.time, "time", lambda: now[0])
+    sizes = []
+    for run in range(6):
+        cache = ResponseCache(tmp_path)
+        for hash_id in range(200):
+            cache.set(f"{API}/estates/{run}{hash_id:04d}", None, {"text": "x" * 1000})
+        cache.close()
+        sizes.append((tmp_path / ResponseCache.filename).stat().st_size)
+        now[0] += 8 * 24 * 60 * 60  # detaily inzerátů vyprší po 7 dnech
+
+    assert sizes[-1] <= sizes[1]
+    assert ResponseCache(tmp_path).purged == 200
@@ -0,0 +1,87 @@
+import pytest
+
+from scrapers.checkpoint import Checkpoint, section_key
+
+
+def test_state_survives_resume(tmp_path):
+    checkpoint = Checkpoint.create(tmp_path, params={"max_pages": 5})
+    section = checkpoint.section(section_key("simple", 1, 1, None))
+    section["page"] = 3
+    section["processed"] = ["101", "102"]
+    checkpoint.flush()
+
+    resumed = Checkpoint.resume(tmp_path, checkpoint.run_id)
+
+    assert resumed.params == {"max_pages": 5}
+    assert resumed.section("simple:1:1:") == {"page": 3, "processed": ["101", "102"]}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_missing_run_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Checkpoint.resume(tmp_path, "20000101_000000")
+
+
+def test_flush_is_due_after_interval(tmp_path):
+    checkpoint = Checkpoint(tmp_path / "run.json", interval=0.0)
+    assert checkpoint.due()
+    assert not Checkpoint(tmp_path / "run.json", interval=60.0).due()
+
+
+def test_runs_started_together_get_own_checkpoints(tmp_path):
+    first = Checkpoint.create(tmp_path, params={"run": 1})
+    second = Checkpoint.create(tmp_path, params={"run": 2})
+
+    assert first.run_id != second.run_id
+    assert Checkpoint.resume(tmp_path, first.run_id).params == {"run": 1}
+
+
+def test_discarded_run_leaves_nothing_behind(tmp_path):
+    checkpoint = Checkpoint.create(tmp_path)
+    checkpoint.discard()
+
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("errors, kept", [([], 0), (["Stránka 2 selhala"], 1)])
+def test_active_agents_keep_checkpoint_only_after_errors(tmp_path, monkeypatch, errors, kept):
+    import scrape_active_agents
+    from scrapers.base import ScraperResult
+
+    monkeypatch.setattr(
+        scrape_active_agents.SrealityScraper,
+        "scrape_active_agents_full_profiles",
+        lambda self, **kwargs: ScraperResult(errors=list(errors)),
+    )
+    monkeypatch.setattr("sys.argv", [
+        "scrape_active_agents.py", "--no-cache", "--checkpoint-dir", str(tmp_path),
+    ])
+
+    scrape_active_agents.main()
+
+    assert len(list(tmp_path.glob("*.json"))) == kept
+
+
+@pytest.mark.parametrize("script, function, extra", [
+    ("scrape_agents_simple", "scrape_agents_simple", ["--no-seller-index"]),
+    ("scrape_agents_fast", "scrape_agents_fast", ["--no-roster"]),
+])
+@pytest.mark.parametrize("errors, kept", [([], 0), (["Chyba při stahování stránky 2"], 1)])
+def test_scrapers_discard_checkpoint_after_clean_run(tmp_path, monkeypatch, capsys, script, function, extra, errors, kept):
+    import importlib
+
+    module = importlib.import_module(script)
+
+    def fake_scrape(*args, **kwargs):
+        kwargs["errors"].extend(errors)
+        return []
+
+    monkeypatch.setattr(module, function, fake_scrape)
+    monkeypatch.setattr("sys.argv", [
+        f"{script}.py", "--no-cache", "--checkpoint-dir", str(tmp_path), *extra,
+    ])
+
+    module.main()
+
+    assert len(list(tmp_path.glob("*.json"))) == kept
+    assert ("--resume" in capsys.readouterr().out) == bool(kept)
@@ -0,0 +1,118 @@
+from scrapers.delta import DeltaSweep, ListingIndex, SellerIndex, listing_fingerprint
+
+
+def _estate(hash_id, price=1_000_000):
+    return {"hash_id": hash_id, "name": f"Byt {hash_id}", "locality": "Praha", "price": price}
+
+
+def _sweep(index, estates, **kwargs):
+    sweep = DeltaSweep(index, "simple:1:1:", **kwargs)
+    fresh = sweep.select(estates)
+    for estate in fresh:
+        sweep.store(estate["hash_id"], {"hash_id": estate["hash_id"]})
+    return sweep, fresh
+
+
+def test_only_new_and_changed_listings_are_selected(tmp_path):
+    index = ListingIndex(tmp_path)
+    _sweep(index, [_estate(1), _estate(2), _estate(3)])
+
+    sweep, fresh = _sweep(index, [_estate(4), _estate(1), _estate(2, price=900_000), _estate(3)])
+
+    assert [estate["hash_id"] for estate in fresh] == [4, 2]
+    assert (sweep.new, sweep.changed, sweep.unchanged) == (1, 1, 2)
+    assert len(sweep.finish(complete=False)) == 4
+
+
+def test_run_of_known_listings_stops_the_sweep(tmp_path):
+    index = ListingIndex(tmp_path)
+    _sweep(index, [_estate(hash_id) for hash_id in range(1, 6)])
+
+    sweep, _ = _sweep(index, [_estate(9)] + [_estate(hash_id) for hash_id in range(1, 4)], known_run=3)
+
+    assert sweep.stopped
+
+
+def test_complete_sweep_drops_delisted_listings(tmp_path):
+    index = ListingIndex(tmp_path)
+    _sweep(index, [_estate(1), _estate(2)])
+
+    sweep, _ = _sweep(index, [_estate(2)])
+
+    assert sweep.finish(complete=True) == [{"hash_id": 2}]
+    assert sweep.removed == 1
+
+
+def test_fingerprint_ignores_unrelated_fields():
+    estate = _estate(1)
+    assert listing_fingerprint(estate) == listing_fingerprint({**estate, "labels": ["Novinka"]})
+    assert listing_fingerprint(estate) != listing_fingerprint({**estate, "locality": "Brno"})
+
+
+def test_seller_index_survives_reopening(tmp_path):
+    sellers = SellerIndex(tmp_path)
+    sellers.put(1, {"user_id": "7", "jmeno": "Jana", "telefon": None, "email": "jana@example.cz"})
+    sellers.put(2, {})
+    sellers.close()
+
+    sellers = SellerIndex(tmp_path)
+    assert sellers.lookup([1, 2, 3]) == {"1": {"user_id": "7", "jmeno": "Jana", "telefon": None, "email": "jana@example.cz"}, "2": {}}
+    assert (sellers.hits, sellers.misses) == (2, 1)
+
+
+def test_overdue_full_sweep_does_not_stop_and_prunes(tmp_path):
+    index = ListingIndex(tmp_path)
+    first, _ = _sweep(index, [_estate(hash_id) for hash_id in range(1, 6)], full_every=3600)
+    assert first.full
+    first.finish(complete=True)
+
+    # Úplný průchod je čerstvý - denní běh smí skončit u známých inzerátů
+    recent, _ = _sweep(index, [_estate(hash_id) for hash_id in range(1, 4)], known_run=3, full_every=3600)
+    assert (recent.full, recent.stopped) == (False, True)
+
+    overdue, _ = _sweep(index, [_estate(hash_id) for hash_id in range(1, 4)], known_run=3, full_every=0)
+    assert (overdue.full, overdue.stopped) == (True, False)
+    assert len(overdue.finish(complete=True)) == 3
+    assert overdue.removed == 2
+
+
+def test_failed_detail_is_not_stored(tmp_path):
+    from scrapers.sreality import SrealityScraper
+
+    class _Pages(list):
+        failed_page = None
+        total_pages = 1
+
+    scraper = SrealityScraper()
+    estates = [_estate(1), _estate(2)]
+    scraper._paginate = lambda url, params, max_pages=None: _Pages([(1, {"_embedded": {"estates": estates}})])
+    scraper._request_once = lambda url: None if url.endswith("/2") else {"_embedded": {"seller": {"user_name": "Jan"}}}
+    index = ListingIndex(tmp_path)
+
+    scraper.scrape(category_main=1, category_type=1, index=index)
+
+    stored = index.fingerprints("scrape:1:1::1", ["1", "2"])
+    assert list(stored) == ["1"]
+
+
+def test_changed_listing_detail_bypasses_response_cache(tmp_path):
+    from scrapers.cache import ResponseCache
+    from scrapers.sreality import SrealityScraper
+
+    class _Pages(list):
+        failed_page = None
+        total_pages = 1
+
+    cache = ResponseCache(tmp_path / "cache")
+    scraper = SrealityScraper(cache=cache)
+    # Detail z cache pochází z doby před změnou inzerátu
+    cache.set(scraper._estate_url(1), None, {"_embedded": {"seller": {"user_name": "Jan"}}})
+    scraper._send_once = lambda url, params=None: {"_embedded": {"seller": {"user_name": "Eva"}}}
+    index = ListingIndex(tmp_path / "index")
+
+    def run(estate):
+        scraper._paginate = lambda url, params, max_pages=None: _Pages([(1, {"_embedded": {"estates": [estate]}})])
+        return [record["jmeno_maklere"] for record in scraper.scrape(category_main=1, category_type=1, index=index).records]
+
+    assert run(_estate(1)) == ["Jan"]
+    assert run(_estate(1, price=900_000)) == ["Eva"]
@@ -0,0 +1,31 @@
+import threading
+import time
+
+from scrapers.engine import FetchEngine
+
+
+def test_map_preserves_input_order():
+    engine = FetchEngine(concurrency=4)
+
+    def slow_square(value):
+        time.sleep(0.01 * (5 - value))
+        return value * value
+
+    assert engine.map(slow_square, range(5)) == [0, 1, 4, 9, 16]
+
+
+def test_map_caps_in_flight_calls():
+    engine = FetchEngine(concurrency=3)
+    lock = threading.Lock()
+    state = {"current": 0, "peak": 0}
+
+    def track(_):
+        with lock:
+            state["current"] += 1
+            state["peak"] = max(state["peak"], state["current"])
+        time.sleep(0.02)
+        with lock:
+            state["current"] -= 1
+
+    engine.map(track, range(12))
+    assert state["peak"] == 3
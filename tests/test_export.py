@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from scrapers.export import (
+    PROFILE_LABEL,
+    link,
+    listing_links,
+    output_format,
+    read_table,
+    with_format,
+    write_table,
+    write_xlsx,
+)
+
+
+def test_links_styles_and_widths_in_one_pass(tmp_path):
+    path = tmp_path / "out" / "makleri.xlsx"
+    records = [
+        {"typ_radku": "COMPANY", "jmeno": "RK Praha", "profil_url": ""},
+        {"typ_radku": "AGENT", "jmeno": "Jana", "profil_url": "https://www.sreality.cz/makler/7"},
+        {"typ_radku": "AGENT", "jmeno": "Petr", "odkazy": "https://a.cz/1, https://a.cz/2"},
+    ]
+
+    written = write_xlsx(
+        path,
+        records,
+        columns=["jmeno", "profil_url", "odkazy"],
+        links={"profil_url": link(PROFILE_LABEL), "odkazy": listing_links},
+        row_style=lambda record: "company" if record["typ_radku"] == "COMPANY" else None,
+    )
+
+    sheet = load_workbook(path).active
+    assert written == 3
+    assert [cell.value for cell in sheet[1]] == ["jmeno", "profil_url", "odkazy"]
+    assert sheet["B3"].value == PROFILE_LABEL
+    assert sheet["B3"].hyperlink.target == "https://www.sreality.cz/makler/7"
+    assert sheet["C4"].value == "Zobrazit (2 inzerátů)"
+    assert sheet["C4"].hyperlink.target == "https://a.cz/1"
+    assert sheet["A2"].font.b and sheet["A2"].fill.start_color.rgb.endswith("E8F4F8")
+    assert sheet.column_dimensions["A"].width == len("RK Praha") + 2
+    assert sheet.column_dimensions["C"].width == len("Zobrazit (2 inzerátů)") + 2
+
+
+def test_widths_come_from_a_sample_and_all_rows_are_written(tmp_path):
+    path = tmp_path / "makleri.xlsx"
+    records = [{"jmeno": "Jana"}, {"jmeno": "Petr"}, {"jmeno": "Velmi dlouhé jméno makléře"}]
+
+    written = write_xlsx(path, records, width_sample=2)
+
+    sheet = load_workbook(path).active
+    assert written == 3
+    assert [row[0].value for row in sheet.iter_rows(min_row=2)] == ["Jana", "Petr", "Velmi dlouhé jméno makléře"]
+    assert sheet.column_dimensions["A"].width == len("jmeno") + 2
+
+
+def test_columns_follow_first_appearance(tmp_path):
+    path = tmp_path / "makleri.xlsx"
+
+    write_xlsx(path, [{"a": 1, "b": 2}, {"c": 3, "a": 4}])
+
+    rows = [[cell.value for cell in row] for row in load_workbook(path).active.iter_rows()]
+    assert rows == [["a", "b", "c"], [1, 2, None], [4, None, 3]]
+
+
+RECORDS = [
+    {"jmeno_maklere": "Jana", "telefon": "+420 777 000 111", "pocet_inzeratu": 3},
+    {"jmeno_maklere": "Petr", "telefon": None, "pocet_inzeratu": 12, "email": "petr@rk.cz"},
+]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet"])
+def test_columnar_formats_round_trip(tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    path = with_format(tmp_path / "makleri.xlsx", output_format(None, fmt))
+
+    assert write_table(path, RECORDS, fmt, links={"profil_url": link(PROFILE_LABEL)}) == 2
+
+    df = read_table(path)
+    assert path.suffix == f".{fmt}"
+    assert list(df.columns) == ["jmeno_maklere", "telefon", "pocet_inzeratu", "email"]
+    assert df["telefon"].iloc[0] == "+420 777 000 111"
+    assert pd.isna(df["telefon"].iloc[1])
+    assert [int(count) for count in df["pocet_inzeratu"]] == [3, 12]
+
+
+def test_format_follows_output_suffix():
+    assert output_format("data/makleri.csv") == "csv"
+    assert output_format("data/makleri.txt") == "xlsx"
+    assert output_format(None, "jsonl") == "jsonl"
+
+
+def test_parquet_without_pyarrow_is_a_clear_error(tmp_path, monkeypatch):
+    import importlib.util
+
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name, *args: None if name == "pyarrow" else find_spec(name, *args))
+
+    with pytest.raises(ValueError, match="pyarrow"):
+        output_format("data/makleri.parquet")
+    with pytest.raises(ValueError, match="pyarrow"):
+        read_table(tmp_path / "makleri.parquet")
@@ -0,0 +1,87 @@
+import threading
+
+from scrape_agents_fast import collect_combination, new_company_map
+from scrapers.engine import FetchEngine
+from scrapers.pagination import Paginator
+from scrapers.roster import fetch_company_sellers
+
+
+class _FakeScraper:
+    def __init__(self, sellers=45, per_page=20, broken_page=None):
+        self._engine = FetchEngine(concurrency=4)
+        self.sellers = sellers
+        self.per_page = per_page
+        self.broken_page = broken_page
+        self.pages = []
+        self._lock = threading.Lock()
+
+    def _fetch_company(self, company_id, page=1):
+        with self._lock:
+            self.pages.append(page)
+        if page == self.broken_page:
+            return None
+        start = (page - 1) * self.per_page
+        sellers = [{"id": index} for index in range(start, min(start + self.per_page, self.sellers))]
+        return {"_embedded": {"sellers": {"result_size": self.sellers, "per_page": self.per_page, "sellers": sellers}}}
+
+
+def test_all_seller_pages_are_fetched_in_order():
+    scraper = _FakeScraper()
+
+    sellers, pages, failed = fetch_company_sellers(scraper, "7")
+
+    assert [seller["id"] for seller in sellers] == list(range(45))
+    assert (pages, failed) == (3, False)
+    assert sorted(scraper.pages) == [1, 2, 3]
+
+
+def test_failed_page_keeps_sellers_before_it():
+    sellers, pages, failed = fetch_company_sellers(_FakeScraper(broken_page=2), "7")
+
+    assert [seller["id"] for seller in sellers] == list(range(20))
+    assert (pages, failed) == (2, True)
+
+
+class _ListingScraper:
+    class _config:
+        api_url = "https://www.sreality.cz/api/cs/v2/estates"
+
+    def __init__(self, estates):
+        self.estates = estates
+        self.params = []
+
+    def _paginate(self, url, params, *, max_pages=None, start_page=1):
+        self.params.append(params)
+
+        def fetch_page(page):
+            return {"result_size": len(self.estates), "per_page": 60, "_embedded": {"estates": self.estates}}
+
+        return Paginator(fetch_page, engine=FetchEngine(1), max_pages=max_pages, start_page=start_page)
+
+
+def test_single_sweep_keeps_only_selected_categories():
+    estates = [
+        {"hash_id": 1, "seo": {"category_main_cb": 1, "category_type_cb": 1}, "_embedded": {"company": {"id": 5}}},
+        {"hash_id": 2, "seo": {"category_main_cb": 2, "category_type_cb": 1}, "_embedded": {"company": {"id": 5}}},
+        {"hash_id": 3, "seo": {"category_main_cb": 3, "category_type_cb": 2}, "_embedded": {"company": {"id": 6}}},
+    ]
+    scraper = _ListingScraper(estates)
+    companies = new_company_map()
+
+    listings, complete = collect_combination(
+        scraper, (None, None, 10), None, companies, categories={(1, 1), (2, 1)}
+    )
+
+    assert scraper.params == [{"per_page": 60, "locality_region_id": 10}]
+    assert (listings, complete) == (2, True)
+    assert dict(companies["5"]["category_breakdown"]) == {(1, 1): 1, (2, 1): 1}
+    assert "6" not in companies
+
+
+def test_single_combination_keeps_filtered_query():
+    from scrapers.sreality import sweep_combinations
+
+    assert sweep_combinations([(1, 1, 10), (1, 1, 11)]) == ([(1, 1, 10), (1, 1, 11)], None)
+    assert sweep_combinations([(1, 1, 10), (2, 1, 10), (1, 1, 11)]) == (
+        [(None, None, 10), (None, None, 11)], {(1, 1), (2, 1)},
+    )
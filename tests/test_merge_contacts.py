@@ -0,0 +1,26 @@
+import pandas as pd
+
+from merge_contacts import merge_excels
+
+
+def test_partials_merge_like_all_rows(tmp_path):
+    first = tmp_path / "first.csv"
+    second = tmp_path / "second.csv"
+    pd.DataFrame([
+        {"jmeno_maklere": "Jan Novák", "telefon": "777 000 111", "odkazy": "https://a"},
+        {"jmeno_maklere": "JAN  NOVÁK", "telefon": "+420777000111", "email": " ", "odkazy": "https://b|https://a"},
+    ]).to_csv(first, index=False)
+    pd.DataFrame([
+        {"zdroj": "sreality", "jmeno_maklere": "Jan Novak", "telefon": "777000111", "odkazy": "https://c"},
+        {"jmeno_maklere": "Eva", "telefon": "602000000"},
+    ]).to_csv(second, index=False)
+
+    merged = merge_excels([first, second], workers=2).set_index("jmeno_maklere")
+
+    assert len(merged) == 2
+    jan = merged.loc["Jan Novák"]
+    assert jan["telefon"] == "777 000 111"
+    assert jan["zdroj"] == "sreality"
+    assert jan["email"] == " "
+    assert jan["odkazy"] == "https://a | https://b | https://c"
+    assert pd.isna(merged.loc["Eva", "odkazy"])
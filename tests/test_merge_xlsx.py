@@ -0,0 +1,103 @@
+import pandas as pd
+
+from merge_xlsx import agent_tables, combine_tables, merge_xlsx_files
+from scrapers.workbooks import WorkbookCache
+
+
+def _export(rows):
+    return pd.DataFrame(rows)
+
+
+def test_links_prefer_full_list_and_skip_summaries():
+    df = _export([
+        {"Jméno makléře": "Jan", "Telefon": "1", "Realitní kancelář": "RK",
+         "Všechny odkazy": "https://a | https://b", "Odkazy": "https://a"},
+        {"Jméno makléře": "Jan", "Telefon": "1", "Realitní kancelář": "RK",
+         "Všechny odkazy": None, "Odkazy": "https://c\n... (celkem 5)"},
+        {"Jméno makléře": "Eva", "Telefon": None, "Realitní kancelář": "RK",
+         "Všechny odkazy": "N/A", "Odkazy": "https://d"},
+    ])
+
+    tables = agent_tables(df)
+
+    assert list(tables.agents["jmeno_maklere"]) == ["Jan", "Eva"]
+    assert tables.agents.loc[1, "telefon"] == "N/A"
+    links = tables.odkazy.groupby("jmeno_maklere")["value"].agg(sorted).to_dict()
+    assert links == {"Jan": ["https://a", "https://b", "https://c"]}
+
+
+def test_missing_name_column_is_skipped():
+    assert agent_tables(_export([{"Telefon": "1"}])) is None
+
+
+def test_files_are_merged_and_deduplicated(tmp_path):
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    common = {"Jméno makléře": "Jan", "Telefon": "1", "Realitní kancelář": "RK", "Email": "jan@rk.cz"}
+    _export([{**common, "Odkazy": "https://b\nhttps://a", "Typy nemovitostí": "Byty"}]).to_csv(
+        inputs / "first.csv", index=False
+    )
+    _export([{**common, "Odkazy": "https://a\nhttps://c", "Typy nemovitostí": "Domy, Byty"}]).to_csv(
+        inputs / "second.csv", index=False
+    )
+
+    output = merge_xlsx_files(inputs, tmp_path / "out", fmt="csv")
+    merged = pd.read_csv(output, dtype=str)
+
+    assert len(merged) == 1
+    row = merged.iloc[0]
+    assert row["Počet unikátních inzerátů"] == "3"
+    assert row["Všechny odkazy"] == "https://a|https://b|https://c"
+    assert row["Typy nemovitostí"] == "Byty, Domy"
+
+
+def test_first_file_wins_for_agent_details():
+    first = agent_tables(_export([{"Jméno makléře": "Jan", "Email": "a@rk.cz"}]))
+    second = agent_tables(_export([{"Jméno makléře": "Jan", "Email": "b@rk.cz"}]))
+
+    merged = combine_tables([first, second])
+
+    assert list(merged.agents["email"]) == ["a@rk.cz"]
+
+
+def test_parallel_read_matches_serial(tmp_path):
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    for index in range(3):
+        _export([
+            {"Jméno makléře": "Jan", "Telefon": "1", "Odkazy": f"https://{index}"},
+            {"Jméno makléře": f"Eva {index}", "Telefon": "2", "Odkazy": "https://e"},
+        ]).to_csv(inputs / f"{index}.csv", index=False)
+
+    serial = merge_xlsx_files(inputs, tmp_path / "serial", fmt="csv", workers=1)
+    parallel = merge_xlsx_files(inputs, tmp_path / "parallel", fmt="csv", workers=2)
+
+    assert pd.read_csv(serial).equals(pd.read_csv(parallel))
+
+
+def test_cached_tables_give_same_result(tmp_path, capsys):
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    _export([{"Jméno makléře": "Jan", "Telefon": "1", "Odkazy": "https://a"}]).to_csv(inputs / "a.csv", index=False)
+    cache = WorkbookCache()
+
+    first = merge_xlsx_files(inputs, tmp_path / "first", fmt="csv", workers=1, cache=cache)
+    second = merge_xlsx_files(inputs, tmp_path / "second", fmt="csv", workers=1, cache=cache)
+
+    assert "a.csv (mezipaměť)" in capsys.readouterr().out
+    assert pd.read_csv(first).equals(pd.read_csv(second))
+
+
+def test_folding_in_batches_matches_one_combine(tmp_path):
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    for index in range(5):
+        _export([
+            {"Jméno makléře": "Jan", "Telefon": "1", "Email": f"jan{index}@rk.cz", "Odkazy": f"https://{index}"},
+            {"Jméno makléře": f"Eva {index % 2}", "Telefon": "2", "Odkazy": "https://e"},
+        ]).to_csv(inputs / f"{index}.csv", index=False)
+
+    batched = merge_xlsx_files(inputs, tmp_path / "batched", fmt="csv", workers=1, fold_every=2)
+    single = merge_xlsx_files(inputs, tmp_path / "single", fmt="csv", workers=1, fold_every=100)
+
+    assert open(batched, "rb").read() == open(single, "rb").read()
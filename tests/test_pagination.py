@@ -0,0 +1,56 @@
+import threading
+import time
+
+from scrapers.engine import FetchEngine
+from scrapers.pagination import Paginator, page_count
+
+
+def test_page_count_rounds_up():
+    assert page_count(0, 60) == 1
+    assert page_count(60, 60) == 1
+    assert page_count(61, 60) == 2
+
+
+def test_pages_yielded_in_order_and_fetched_concurrently():
+    lock = threading.Lock()
+    state = {"current": 0, "peak": 0}
+
+    def fetch(page):
+        with lock:
+            state["current"] += 1
+            state["peak"] = max(state["peak"], state["current"])
+        time.sleep(0.01 * (10 - page))
+        with lock:
+            state["current"] -= 1
+        return {"result_size": 450, "page": page}
+
+    pages = list(Paginator(fetch, engine=FetchEngine(concurrency=4)))
+
+    assert [page for page, _ in pages] == list(range(1, 9))
+    assert [payload["page"] for _, payload in pages] == list(range(1, 9))
+    assert state["peak"] > 1
+
+
+def test_stops_at_max_pages_and_first_failure():
+    def fetch(page):
+        return None if page == 4 else {"result_size": 600}
+
+    limited = Paginator(fetch, engine=FetchEngine(concurrency=2), max_pages=3)
+    assert [page for page, _ in limited] == [1, 2, 3]
+    assert limited.failed_page is None
+
+    failing = Paginator(fetch, engine=FetchEngine(concurrency=2))
+    assert [page for page, _ in failing] == [1, 2, 3]
+    assert failing.failed_page == 4
+
+
+def test_start_page_resumes_mid_listing():
+    fetched = []
+
+    def fetch(page):
+        fetched.append(page)
+        return {"result_size": 300}
+
+    pages = Paginator(fetch, engine=FetchEngine(concurrency=2), start_page=3)
+    assert [page for page, _ in pages] == [3, 4, 5]
+    assert sorted(fetched) == [3, 4, 5]
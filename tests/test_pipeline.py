@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+from scrapers.pipeline import stream
+
+
+def test_results_follow_input_order():
+    def slow_double(value):
+        time.sleep(0.001 * (value % 5))
+        return value * 2
+
+    assert list(stream(range(50), slow_double, workers=4)) == [(value, value * 2) for value in range(50)]
+
+
+def test_work_overlaps_with_production_and_pending_is_bounded():
+    produced = []
+    lock = threading.Lock()
+    state = {"pending": 0, "peak": 0}
+
+    def produce():
+        for value in range(30):
+            with lock:
+                state["pending"] += 1
+                state["peak"] = max(state["peak"], state["pending"])
+            produced.append(value)
+            yield value
+
+    seen_while_producing = []
+    for value, _ in stream(produce(), lambda value: value, workers=2, max_pending=4):
+        with lock:
+            state["pending"] -= 1
+        seen_while_producing.append(len(produced) < 30)
+        time.sleep(0.001)
+
+    assert state["peak"] <= 5
+    assert seen_while_producing[0]
+
+
+def test_worker_errors_reach_the_caller():
+    def fail(value):
+        if value == 3:
+            raise RuntimeError("boom")
+        return value
+
+    with pytest.raises(RuntimeError):
+        list(stream(range(10), fail, workers=2))
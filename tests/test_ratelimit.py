@@ -0,0 +1,72 @@
+import time
+
+from scrapers.ratelimit import AdaptiveRateController, TokenBucket
+
+
+def test_burst_is_served_without_waiting():
+    bucket = TokenBucket(rate=1.0, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_empty_bucket_waits_for_next_token():
+    bucket = TokenBucket(rate=20.0, burst=1)
+    bucket.acquire()
+    start = time.monotonic()
+    waited = bucket.acquire()
+    assert waited > 0
+    assert time.monotonic() - start >= 0.04
+
+
+def test_time_spent_elsewhere_counts_towards_the_pause():
+    bucket = TokenBucket(rate=20.0, burst=1)
+    bucket.acquire()
+    time.sleep(0.06)
+    assert bucket.acquire() == 0.0
+
+
+def test_controller_increases_additively_and_cuts_on_429():
+    bucket = TokenBucket(rate=1.0, burst=1)
+    controller = AdaptiveRateController(bucket, increase=0.5, healthy_streak=2, max_rate=2.0, log=None)
+
+    for _ in range(4):
+        controller.record(200, 0.1)
+    assert bucket.rate == 2.0
+
+    controller.record(429, 0.1)
+    assert bucket.rate == 1.0
+    assert controller.changes[-1] == (2.0, 1.0, "HTTP 429")
+
+
+def test_controller_cuts_on_rising_p95_latency():
+    bucket = TokenBucket(rate=2.0, burst=1)
+    controller = AdaptiveRateController(bucket, healthy_streak=1000, latency_window=5, log=None)
+
+    for _ in range(5):
+        controller.record(200, 0.1)
+    for _ in range(5):
+        controller.record(200, 0.5)
+    assert bucket.rate == 1.0
+
+
+def test_sreality_adaptive_ceiling_is_the_advertised_budget():
+    from scrapers.sreality import SrealityScraper
+
+    scraper = SrealityScraper()
+
+    assert scraper._rate_control.max_rate == scraper._limiter.rate == 1.0  # ~60 detailů/min
+
+
+def test_lasting_latency_shift_cuts_once_and_recovers():
+    bucket = TokenBucket(rate=2.0, burst=1)
+    controller = AdaptiveRateController(
+        bucket, healthy_streak=5, increase=0.1, latency_window=5, cooldown=0.0, log=None
+    )
+
+    for _ in range(5):
+        controller.record(200, 0.1)
+    for _ in range(30):
+        controller.record(200, 0.5)
+
+    reasons = [reason for _old, _new, reason in controller.changes]
+    assert sum(reason.startswith("p95") for reason in reasons) == 1
+    assert bucket.rate > 1.0
@@ -0,0 +1,41 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+from scrapers.retry import RetryBudget, RetryLater, parse_retry_after, run_with_retries
+
+
+def test_parse_retry_after_accepts_seconds_and_http_date():
+    assert parse_retry_after("7") == 7.0
+    future = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(future, usegmt=True)) <= 30
+    assert parse_retry_after("nonsense") is None
+    assert parse_retry_after(None) is None
+
+
+def test_retry_budget_caps_retries_to_share_of_traffic():
+    budget = RetryBudget(ratio=0.1, min_retries=1)
+    for _ in range(30):
+        budget.record_request()
+    assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+
+
+def test_delayed_item_does_not_block_the_rest():
+    calls = []
+    failed_once = set()
+
+    def fetch(item):
+        calls.append(item)
+        if item == "a" and item not in failed_once:
+            failed_once.add(item)
+            raise RetryLater(0.05)
+        return item.upper()
+
+    assert run_with_retries(fetch, ["a", "b", "c"]) == ["A", "B", "C"]
+    assert calls == ["a", "b", "c", "a"]
+
+
+def test_items_failing_every_attempt_yield_none():
+    def fetch(item):
+        raise RetryLater(0)
+
+    assert run_with_retries(fetch, [1, 2], attempts=2) == [None, None]
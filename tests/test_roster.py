@@ -0,0 +1,32 @@
+from scrapers.roster import RosterStore, roster_fingerprint
+
+
+def test_fresh_roster_is_served_from_store(tmp_path):
+    store = RosterStore(tmp_path)
+    store.put("7", "RK", [{"id": 1, "name": "Jana"}])
+
+    assert store.fresh("7") == [{"id": 1, "name": "Jana"}]
+    assert store.fresh("8") is None
+
+
+def test_stale_roster_is_not_served(tmp_path):
+    store = RosterStore(tmp_path, max_age=0)
+    store.put("7", "RK", [{"id": 1, "name": "Jana"}])
+
+    assert store.fresh("7") is None
+
+
+def test_refresh_reports_joined_and_left_sellers(tmp_path):
+    store = RosterStore(tmp_path)
+    store.put("7", "RK", [{"id": 1, "name": "Jana"}, {"id": 2, "name": "Petr"}])
+
+    change = store.put("7", "RK", [{"id": 2, "name": "Petr"}, {"id": 3, "name": "Eva"}])
+
+    assert [seller["name"] for seller in change.joined] == ["Eva"]
+    assert [seller["name"] for seller in change.left] == ["Jana"]
+    assert not store.put("7", "RK", [{"id": 3, "name": "Eva"}, {"id": 2, "name": "Petr"}])
+
+
+def test_fingerprint_ignores_seller_order():
+    sellers = [{"id": 1}, {"id": 2}]
+    assert roster_fingerprint(sellers) == roster_fingerprint(list(reversed(sellers)))
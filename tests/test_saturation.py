@@ -0,0 +1,23 @@
+import pytest
+
+from scrapers.saturation import SaturationStop, chao1
+
+
+def test_stops_after_consecutive_quiet_pages():
+    stop = SaturationStop(pages=2, min_new=3)
+
+    assert not stop.update(1, 10)
+    assert not stop.update(2, 1)
+    assert not stop.update(3, 5)  # nová RK přerušuje řadu
+    assert not stop.update(4, 0)
+    assert stop.update(5, 2)
+    assert stop.stopped_at == 5
+
+
+def test_chao1_adds_expected_unseen_items():
+    # 4 RK viděné jednou, 1 dvakrát, 1 pětkrát: 6 + 4*3 / (2*2) = 9
+    assert chao1([1, 1, 1, 1, 2, 5]) == pytest.approx(9.0)
+
+
+def test_chao1_without_singletons_is_the_observed_count():
+    assert chao1([3, 4, 0]) == 2
@@ -0,0 +1,69 @@
+import sqlite3
+import time
+
+import pytest
+
+from scrapers.sharding import REGION_IDS, ShardSettings, expand_regions, run_shards
+from scrapers.sreality import SrealityScraper
+
+
+def _slow_echo(shard, settings):
+    # Dřívější shardy doběhnou později - pořadí výsledků musí i tak sedět
+    time.sleep(0.05 * (3 - shard[0]))
+    return shard[0], settings.workers
+
+
+def test_nationwide_combinations_split_into_regions():
+    shards = expand_regions([(1, 1, None), (2, 1, 10), (2, 1, 10)])
+
+    assert shards[: len(REGION_IDS)] == [(1, 1, region) for region in REGION_IDS]
+    assert shards[len(REGION_IDS):] == [(2, 1, 10)]
+
+
+def test_results_come_back_in_shard_order():
+    shards = [(0, 1, None), (1, 1, None), (2, 1, None)]
+
+    results = list(run_shards(_slow_echo, shards, ShardSettings(workers=8)))
+
+    assert results == [(shard, (shard[0], 3)) for shard in shards]
+
+
+def test_rate_budget_is_split_between_workers():
+    full = SrealityScraper()
+    with ShardSettings(workers=4).scraper() as share:
+        assert share._limiter.rate == full._limiter.rate / 4
+
+
+def test_worker_cache_is_closed_after_the_shard(tmp_path):
+    with ShardSettings(workers=2, cache_dir=str(tmp_path)).scraper() as scraper:
+        cache = scraper._cache
+        cache.get("https://example.com", None)
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.get("https://example.com", None)
+
+
+def test_resumed_sharded_run_keeps_its_workers_and_index(tmp_path, monkeypatch):
+    import scrape_agents_simple
+    from scrapers.checkpoint import Checkpoint
+
+    interrupted = Checkpoint.create(tmp_path / "checkpoints", params={"args": {
+        "prompt": False, "category_main": 1, "category_type": 1, "locality": None, "max_pages": 1,
+        "full_scan": False, "incremental": True, "workers": 3, "single_sweep": False, "company_rosters": False,
+    }})
+    calls = []
+
+    def fake_sharded(combinations, max_pages, full_scan, settings, checkpoint, index_dir, **options):
+        calls.append((settings.workers, index_dir))
+        return []
+
+    monkeypatch.setattr(scrape_agents_simple, "scrape_sharded", fake_sharded)
+    monkeypatch.setattr("sys.argv", [
+        "scrape_agents_simple.py", "--no-cache", "--no-seller-index",
+        "--checkpoint-dir", str(tmp_path / "checkpoints"), "--index-dir", str(tmp_path / "index"),
+        "--resume", interrupted.run_id,
+    ])
+
+    scrape_agents_simple.main()
+
+    assert calls == [(3, str(tmp_path / "index"))]
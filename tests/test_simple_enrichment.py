@@ -0,0 +1,99 @@
+import threading
+
+from scrape_agents_simple import scrape_agents_simple
+from scrapers.engine import FetchEngine
+from scrapers.pagination import Paginator
+
+
+class _Scraper:
+    class _config:
+        api_url = "https://www.sreality.cz/api/cs/v2/estates"
+        concurrency = 4
+
+    def __init__(self, estates, rosters):
+        self._engine = FetchEngine(concurrency=4)
+        self.estates = estates
+        self.rosters = rosters
+        self.details = []
+        self.fresh = []
+        self.companies = []
+        self._lock = threading.Lock()
+
+    def _paginate(self, url, params, *, max_pages=None, start_page=1):
+        def fetch_page(page):
+            return {"result_size": len(self.estates), "per_page": 60, "_embedded": {"estates": self.estates}}
+
+        return Paginator(fetch_page, engine=FetchEngine(1), max_pages=max_pages, start_page=start_page)
+
+    def _fetch_estate(self, hash_id, fresh=False):
+        with self._lock:
+            self.details.append(hash_id)
+            if fresh:
+                self.fresh.append(hash_id)
+        user_id = next(e for e in self.estates if e["hash_id"] == hash_id)["_embedded"]["seller"]["user_id"]
+        return {"_embedded": {"seller": {"user_id": user_id, "user_name": f"Detail {user_id}"}, "phones": ["603"]}}
+
+    def _fetch_company(self, company_id, page=1):
+        with self._lock:
+            self.companies.append(company_id)
+        sellers = self.rosters.get(company_id, [])
+        return {"_embedded": {"sellers": {"result_size": len(sellers), "per_page": 20, "sellers": sellers}}}
+
+
+def _estate(hash_id, company_id, user_id):
+    return {
+        "hash_id": hash_id,
+        "locality": "Praha, Hlavní město Praha",
+        "_embedded": {"company": {"id": company_id, "name": f"RK {company_id}"}, "seller": {"user_id": user_id}},
+    }
+
+
+def test_contacts_come_from_company_rosters_and_details_only_for_unknown_agents():
+    estates = [_estate(1, 5, 11), _estate(2, 5, 11), _estate(3, 5, 12), _estate(4, 5, 12), _estate(5, 6, 21)]
+    rosters = {5: [{"id": 11, "name": "Jana", "phones": [{"number": "777"}], "email": "jana@rk5.cz"}], 6: []}
+    scraper = _Scraper(estates, rosters)
+
+    records = scrape_agents_simple(scraper, 1, 1, None, None, True, company_rosters=True)
+
+    by_name = {record["jmeno_maklere"]: record for record in records}
+    assert by_name["Jana"]["telefon"] == "777"
+    assert by_name["Jana"]["pocet_inzeratu"] == 2
+    assert by_name["Detail 12"]["pocet_inzeratu"] == 2
+    assert sorted(scraper.companies) == [5, 6]
+    # Jeden detail na makléře mimo seznam RK, ne na inzerát
+    assert len(scraper.details) == 2
+
+
+def test_category_selection_is_part_of_the_combination_key():
+    from scrape_agents_simple import combination_key
+
+    assert combination_key(1, 1, 10) == "simple:1:1:10"
+    assert combination_key(None, None, 10, {(2, 1), (1, 1)}) == "simple:::10:1/1:2/1"
+    assert combination_key(None, None, 10, {(1, 1), (1, 2)}) != combination_key(None, None, 10, {(1, 1), (2, 1)})
+
+
+def test_reassigned_listing_detail_bypasses_response_cache(tmp_path):
+    from scrapers.delta import SellerIndex
+
+    sellers = SellerIndex(tmp_path)
+    sellers.put(1, {"user_id": "11", "jmeno": "Jana", "telefon": None, "email": None})
+    sellers.put(2, {"user_id": "12", "jmeno": "Petr", "telefon": None, "email": None})
+    scraper = _Scraper([_estate(1, 5, 21), _estate(2, 5, 12)], {})
+
+    records = scrape_agents_simple(scraper, 1, 1, None, None, True, sellers=sellers)
+
+    assert scraper.details == [1] and scraper.fresh == [1]
+    assert sellers.lookup([1])["1"]["user_id"] == "21"
+    assert sorted(record["jmeno_maklere"] for record in records) == ["Detail 21", "Petr"]
+
+
+def test_failed_roster_is_fetched_once_and_agents_fall_back_to_details():
+    estates = [_estate(1, 5, 11), _estate(2, 5, 12), _estate(3, 5, 13), _estate(4, 5, 11)]
+    scraper = _Scraper(estates, {})
+    scraper._fetch_company = lambda company_id, page=1: scraper.companies.append(company_id)
+
+    records = scrape_agents_simple(scraper, 1, 1, None, None, True, company_rosters=True)
+
+    assert scraper.companies == [5]
+    assert sorted(scraper.details) in ([1, 2, 3], [2, 3, 4])
+    assert sorted(record["pocet_inzeratu"] for record in records) == [1, 1, 2]
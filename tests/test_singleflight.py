@@ -0,0 +1,70 @@
+import threading
+import time
+
+from scrapers.engine import FetchEngine
+from scrapers.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            calls.append(1)
+        time.sleep(0.05)
+        return {"hash_id": 1}
+
+    results = FetchEngine(concurrency=4).map(lambda _: flights.do(("estate", "1"), fetch), range(4))
+
+    assert len(calls) == 1
+    assert results == [{"hash_id": 1}] * 4
+    assert (flights.hits, flights.misses) == (3, 1)
+
+
+def test_failed_results_are_not_stored():
+    flights = SingleFlight()
+    answers = iter([None, {"ok": True}])
+
+    assert flights.do("company", lambda: next(answers)) is None
+    assert flights.do("company", lambda: next(answers)) == {"ok": True}
+    assert flights.do("company", lambda: next(answers)) == {"ok": True}
+    assert (flights.hits, flights.misses) == (1, 2)
+
+
+def test_bounded_results_keep_memory_flat():
+    import tracemalloc
+
+    from scrapers.sreality import SrealityScraper
+
+    scraper = SrealityScraper()
+    scraper._flights.max_entries = 50
+    scraper._request = lambda url, **kwargs: {"url": url, "payload": "x" * 10_000}
+
+    def stream(start, count):
+        for hash_id in range(start, start + count):
+            assert scraper._fetch_estate(hash_id)["url"].endswith(str(hash_id))
+
+    tracemalloc.start()
+    try:
+        stream(0, 200)
+        after_few = tracemalloc.get_traced_memory()[0]
+        stream(200, 2000)
+        after_many = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert len(scraper._flights) == 50
+    assert after_many - after_few < 200_000  # 2000 detailů × 10 kB by bylo 20 MB
+
+
+def test_least_recently_used_result_is_evicted():
+    flights = SingleFlight(max_entries=2)
+
+    flights.do("a", lambda: 1)
+    flights.do("b", lambda: 2)
+    flights.do("a", lambda: 1)
+    flights.do("c", lambda: 3)
+
+    assert "a" in flights and "c" in flights and "b" not in flights
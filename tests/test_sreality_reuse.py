@@ -0,0 +1,119 @@
+from scrapers.sreality import SrealityScraper
+
+API = "https://www.sreality.cz/api/cs/v2/estates"
+
+
+def _fake_api(calls):
+    def request_once(url, *, params=None):
+        calls.append(url)
+        if url == API:
+            estates = [{"hash_id": hash_id, "locality": "Praha 1, Praha"} for hash_id in (1, 2, 3)]
+            return {"result_size": len(estates), "_embedded": {"estates": estates}}
+        hash_id = int(url.rsplit("/", 1)[1])
+        return {
+            "hash_id": hash_id,
+            "_embedded": {"seller": {"user_id": 7, "user_name": "Jana"}, "phones": [{"number": "777"}]},
+        }
+
+    return request_once
+
+
+def test_full_profiles_reuse_phase_one_details():
+    calls = []
+    scraper = SrealityScraper(concurrency=2)
+    scraper._rate_control = None
+    scraper._request_once = _fake_api(calls)
+
+    result = scraper.scrape_active_agents_full_profiles(max_pages=1)
+
+    detail_calls = [url for url in calls if url != API]
+    assert sorted(detail_calls) == sorted(set(detail_calls))
+    assert len(detail_calls) == 3
+    assert result.metadata["usetrena_volani_detailu"] == "3"
+
+
+def test_phase_one_details_are_reused_beyond_shared_results():
+    calls = []
+    scraper = SrealityScraper(concurrency=2)
+    scraper._rate_control = None
+    scraper._flights.max_entries = 1
+    scraper._request_once = _fake_api(calls)
+
+    result = scraper.scrape_active_agents_full_profiles(max_pages=1)
+
+    detail_calls = [url for url in calls if url != API]
+    assert len(detail_calls) == 3
+    assert result.metadata["usetrena_volani_detailu"] == "3"
+    assert result.records[0]["telefon"] == "777"
+    assert not scraper._known_details
+
+
+def test_lazy_details_stop_once_contacts_are_found():
+    calls = []
+    scraper = SrealityScraper(concurrency=2)
+    scraper._rate_control = None
+
+    def request_once(url, *, params=None):
+        calls.append(url)
+        if url == API:
+            estates = [
+                {"hash_id": hash_id, "locality": "Praha 1, Praha", "seo": {"category_main_cb": 1, "category_type_cb": 1}}
+                for hash_id in range(1, 41)
+            ]
+            return {"result_size": len(estates), "_embedded": {"estates": estates}}
+        return {"_embedded": {"seller": {"user_name": "Jana"}, "phones": [{"number": "777"}], "emails": [{"value": "j@rk.cz"}]}}
+
+    scraper._request_once = request_once
+    result = scraper.scrape_agent_profiles(agent_urls=["7"], lazy_details=True)
+
+    assert len([url for url in calls if url != API]) == 1
+    record = result.records[0]
+    assert (record["telefon"], record["email"]) == ("777", "j@rk.cz")
+
+
+def test_count_probe_fills_breakdown_without_paging():
+    calls = []
+    scraper = SrealityScraper(concurrency=4)
+    scraper._rate_control = None
+    sizes = {(1, 1): 130, (2, 2): 4}
+
+    def request_once(url, *, params=None):
+        calls.append((url, dict(params or {})))
+        if url == API:
+            size = sizes.get((params["category_main_cb"], params["category_type_cb"]), 0)
+            estates = [{"hash_id": params["category_main_cb"], "locality": "Praha 1, Praha"}][:size]
+            return {"result_size": size, "_embedded": {"estates": estates}}
+        return {"_embedded": {"seller": {"user_name": "Jana"}, "phones": [{"number": "777"}], "emails": [{"value": "j@rk.cz"}]}}
+
+    scraper._request_once = request_once
+    result = scraper.scrape_agent_profiles(agent_urls=["7"], count_probe=True)
+
+    listing_calls = [params for url, params in calls if url == API]
+    assert len(listing_calls) == 15
+    assert all(params["per_page"] == 1 for params in listing_calls)
+    assert len(calls) == 16
+    assert result.records[0]["telefon"] == "777"
+
+    record = scraper._process_agent_data(scraper._probe_agent_listings("7"), "7")
+    assert record["pocet_inzeratu"] == 134
+    assert record["rozlozeni_inzeratu"] == "Byty/Prodej: 130, Domy/Pronájem: 4"
+
+
+def test_failed_phase_one_page_is_an_error():
+    scraper = SrealityScraper(concurrency=2)
+    scraper._rate_control = None
+    fake = _fake_api([])
+
+    def request_once(url, *, params=None):
+        if url == API and params["page"] == 2:
+            return None
+        payload = fake(url, params=params)
+        if url == API:
+            payload["result_size"] = 120  # dvě stránky po 60
+        return payload
+
+    scraper._request_once = request_once
+    result = scraper.scrape_active_agents_full_profiles(max_pages=2)
+
+    assert len(result.records) == 1
+    assert any("stránce 2" in error for error in result.errors)
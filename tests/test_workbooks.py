@@ -0,0 +1,110 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from scrapers.workbooks import WorkbookCache, map_files, table_from_json, table_to_json
+
+
+def _stem(path):
+    return path.stem
+
+
+def test_results_keep_input_order():
+    paths = [Path(f"{index}.xlsx") for index in range(7)]
+
+    results = list(map_files(_stem, paths, workers=2))
+
+    assert results == [(path, path.stem) for path in paths]
+
+
+def test_single_worker_runs_inline():
+    calls = []
+
+    def record(path):  # lokální funkce nejde předat procesu
+        calls.append(path)
+        return len(calls)
+
+    results = list(map_files(record, [Path("a"), Path("b")], workers=1))
+
+    assert results == [(Path("a"), 1), (Path("b"), 2)]
+
+
+def _counting_reader(calls):
+    def read(path):
+        calls.append(path)
+        return pd.read_csv(path)
+
+    return read
+
+
+def test_cache_reuses_table_until_file_changes(tmp_path):
+    path = tmp_path / "export.csv"
+    pd.DataFrame({"telefon": ["777 000 111", 602000000]}).to_csv(path, index=False)
+    cache = WorkbookCache()
+    calls = []
+    read = _counting_reader(calls)
+
+    first, cached_first = cache.read(path, read)
+    second, cached_second = cache.read(path, read)
+
+    assert (cached_first, cached_second) == (False, True)
+    assert second.equals(first)
+    assert len(calls) == 1
+    assert list((tmp_path / WorkbookCache.dirname).glob("export.csv.*.json"))
+
+    # Jen nový čas změny (kopie souboru) - rozhodne obsah
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.read(path, read)[1] is True
+    assert len(calls) == 1
+
+    pd.DataFrame({"telefon": ["777 000 222", 602000000]}).to_csv(path, index=False)
+    changed, cached = cache.read(path, read)
+    assert cached is False
+    assert changed["telefon"][0] == "777 000 222"
+    assert len(calls) == 2
+
+
+def test_cache_keeps_readers_apart(tmp_path):
+    path = tmp_path / "export.csv"
+    pd.DataFrame({"a": [1], "b": [2]}).to_csv(path, index=False)
+    cache = WorkbookCache(tmp_path / "cache")
+
+    whole, _ = cache.read(path, pd.read_csv, kind="whole")
+    only_a, cached = cache.read(path, lambda p: pd.read_csv(p)[["a"]], kind="a")
+
+    assert cached is False
+    assert (list(whole.columns), list(only_a.columns)) == (["a", "b"], ["a"])
+
+
+def test_json_round_trip_keeps_values_and_types():
+    table = pd.DataFrame({
+        "jmeno": ["Jan", None, "Eva"],
+        "telefon": [777000111, "777 000 222", None],
+        "pocet": [1, 2, 3],
+        "cena": [1.5, float("nan"), 2.0],
+        "aktivni": [True, False, True],
+        "stazeno": pd.to_datetime(["2024-01-01 08:00", None, "2024-02-02 10:30"]),
+    })
+
+    restored = table_from_json(table_to_json(table))
+
+    assert restored.equals(table)
+    assert list(restored.dtypes) == list(table.dtypes)
+    assert [type(value) for value in restored["telefon"]] == [int, str, type(None)]
+
+
+def test_unreadable_entry_is_parsed_again(tmp_path):
+    path = tmp_path / "export.csv"
+    pd.DataFrame({"a": [1]}).to_csv(path, index=False)
+    cache = WorkbookCache()
+    cache.read(path, pd.read_csv)
+    entry = next((tmp_path / WorkbookCache.dirname).glob("*.json"))
+    header = entry.read_text(encoding="utf-8").splitlines()[0]
+    entry.write_text(header + "\nnení json\n", encoding="utf-8")
+
+    table, cached = cache.read(path, pd.read_csv)
+
+    assert cached is False
+    assert list(table["a"]) == [1]